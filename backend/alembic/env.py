@@ -0,0 +1,59 @@
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+from sqlmodel import SQLModel
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: F401 (registers the tables)
+from database import DATABASE_URL, build_engine
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+def include_name(name, type_, parent_names):
+    # The role search FTS5 table and its shadow tables aren't models (revision 0007)
+    return not (type_ == "table" and name.startswith("rolehistory_fts"))
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_name=include_name,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite can't ALTER most constraints in place; batch mode rebuilds the table
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # database.run_migrations passes the app's connection in
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    engine = build_engine(config.get_main_option("sqlalchemy.url") or DATABASE_URL)
+    with engine.connect() as connection:
+        _run(connection)
+    engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
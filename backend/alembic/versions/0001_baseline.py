@@ -0,0 +1,231 @@
+"""Baseline schema
+
+The schema as create_db_and_tables built it, plus the columns the old ad-hoc
+scripts (migrate_db.py, migrations/add_labor_v2_fields.py) added. Declared here
+rather than read from models.py, so the revision keeps building the same schema
+as the models change.
+
+Databases created before Alembic already have the tables, so every step here
+checks what exists first and only fills in what is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _baseline_tables():
+    """The tables as create_db_and_tables built them, in dependency order (table name -> create args)."""
+    return {
+        "project": (
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("client", sa.String(), nullable=True),
+            sa.Column("start_date", sa.DateTime(), nullable=True),
+            sa.Column("end_date", sa.DateTime(), nullable=True),
+            sa.Column("id", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "projectphase": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("project_id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("type", sa.String(), nullable=False),
+            sa.Column("start_date", sa.DateTime(), nullable=False),
+            sa.Column("end_date", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "budget": (
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("total_amount", sa.Float(), nullable=False),
+            sa.Column("project_id", sa.String(), nullable=True),
+            sa.Column("id", sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "budgetcategory": (
+            sa.Column("code", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("budget_id", sa.String(), nullable=True),
+            sa.Column("sort_order", sa.Integer(), nullable=False),
+            sa.Column("id", sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(["budget_id"], ["budget.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "budgetgrouping": (
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("code", sa.String(), nullable=False),
+            sa.Column("category_id", sa.String(), nullable=True),
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("calendar_overrides", sa.JSON(), nullable=True),
+            sa.ForeignKeyConstraint(["category_id"], ["budgetcategory.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "lineitem": (
+            sa.Column("description", sa.String(), nullable=False),
+            sa.Column("rate", sa.Float(), nullable=False),
+            sa.Column("quantity", sa.Float(), nullable=False),
+            sa.Column("prep_qty", sa.Float(), nullable=False),
+            sa.Column("shoot_qty", sa.Float(), nullable=False),
+            sa.Column("post_qty", sa.Float(), nullable=False),
+            sa.Column("unit", sa.String(), nullable=False),
+            sa.Column("total", sa.Float(), nullable=False),
+            sa.Column("is_labor", sa.Boolean(), nullable=False),
+            sa.Column("notes", sa.String(), nullable=True),
+            sa.Column("base_hourly_rate", sa.Float(), nullable=False),
+            sa.Column("daily_hours", sa.Float(), nullable=False),
+            sa.Column("days_per_week", sa.Float(), nullable=False),
+            sa.Column("is_casual", sa.Boolean(), nullable=False),
+            sa.Column("overtime_rule_set", sa.String(), nullable=False),
+            sa.Column("crew_member_id", sa.String(), nullable=True),
+            sa.Column("allowances_json", sa.String(), nullable=True),
+            sa.Column("labor_phases_json", sa.String(), nullable=True),
+            sa.Column("calendar_mode", sa.String(), nullable=False),
+            sa.Column("phase_details", sa.JSON(), nullable=True),
+            sa.Column("award_classification_id", sa.String(), nullable=True),
+            sa.Column("role_history_id", sa.String(), nullable=True),
+            sa.Column("breakdown_json", sa.String(), nullable=True),
+            sa.Column("fringes_json", sa.String(), nullable=True),
+            sa.Column("grouping_id", sa.String(), nullable=True),
+            sa.Column("id", sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(["grouping_id"], ["budgetgrouping.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "crewmember": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("role", sa.String(), nullable=False),
+            sa.Column("base_rate", sa.Float(), nullable=False),
+            sa.Column("default_days_per_week", sa.Float(), nullable=False),
+            sa.Column("overtime_rule_set", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "laborallowance": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("frequency", sa.String(), nullable=False),
+            sa.Column("crew_member_id", sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(["crew_member_id"], ["crewmember.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "productioncalendar": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("project_id", sa.String(), nullable=False),
+            sa.Column("phase", sa.String(), nullable=False),
+            sa.Column("default_hours", sa.Float(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "calendarday": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("calendar_id", sa.String(), nullable=False),
+            sa.Column("date", sa.DateTime(), nullable=False),
+            sa.Column("phase", sa.String(), nullable=False),
+            sa.Column("day_type", sa.String(), nullable=False),
+            sa.Column("is_holiday", sa.Boolean(), nullable=False),
+            sa.Column("holiday_name", sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(["calendar_id"], ["productioncalendar.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "laborschedule": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("budget_line_id", sa.String(), nullable=False),
+            sa.Column("phase", sa.String(), nullable=False),
+            sa.Column("mode", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["budget_line_id"], ["lineitem.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "scheduleday": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("schedule_id", sa.String(), nullable=False),
+            sa.Column("calendar_day_id", sa.String(), nullable=False),
+            sa.Column("hours_override", sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(["calendar_day_id"], ["calendarday.id"]),
+            sa.ForeignKeyConstraint(["schedule_id"], ["laborschedule.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "budgettemplate": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("created_by", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("source_budget_id", sa.String(), nullable=True),
+            sa.Column("snapshot", sa.JSON(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+        "rolehistory": (
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("role_name", sa.String(), nullable=False),
+            sa.Column("base_rate", sa.Float(), nullable=False),
+            sa.Column("unit", sa.String(), nullable=False),
+            sa.Column("project_id", sa.String(), nullable=False),
+            sa.Column("project_name", sa.String(), nullable=True),
+            sa.Column("last_used_at", sa.DateTime(), nullable=False),
+            sa.Column("usage_count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        ),
+    }
+
+# (index, table, columns) created with their table
+BASELINE_INDEXES = (
+    ("ix_project_name", "project", ["name"]),
+    ("ix_crewmember_name", "crewmember", ["name"]),
+    ("ix_productioncalendar_project_id", "productioncalendar", ["project_id"]),
+    ("ix_calendarday_calendar_id", "calendarday", ["calendar_id"]),
+    ("ix_laborschedule_budget_line_id", "laborschedule", ["budget_line_id"]),
+    ("ix_scheduleday_calendar_day_id", "scheduleday", ["calendar_day_id"]),
+    ("ix_scheduleday_schedule_id", "scheduleday", ["schedule_id"]),
+    ("ix_budgettemplate_created_by", "budgettemplate", ["created_by"]),
+    ("ix_budgettemplate_name", "budgettemplate", ["name"]),
+    ("ix_rolehistory_role_name", "rolehistory", ["role_name"]),
+)
+
+LEGACY_COLUMNS = {
+    "lineitem": [
+        ("notes", sa.String(), None),
+        ("labor_phases_json", sa.String(), "'[]'"),
+        ("calendar_mode", sa.String(), "'inherit'"),
+        ("phase_details", sa.JSON(), None),
+        ("award_classification_id", sa.String(), None),
+        ("role_history_id", sa.String(), None),
+    ],
+    "budgetgrouping": [
+        ("calendar_overrides", sa.JSON(), None),
+    ],
+}
+
+def upgrade():
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    created = set()
+    for name, args in _baseline_tables().items():
+        if name not in existing:
+            op.create_table(name, *args)
+            created.add(name)
+    for index, table, columns in BASELINE_INDEXES:
+        if table in created:
+            op.create_index(index, table, columns)
+
+    inspector = sa.inspect(bind)
+    for table, columns in LEGACY_COLUMNS.items():
+        present = {c["name"] for c in inspector.get_columns(table)}
+        for name, type_, default in columns:
+            if name not in present:
+                server_default = sa.text(default) if default else None
+                op.add_column(table, sa.Column(name, type_, nullable=True, server_default=server_default))
+
+def downgrade():
+    # Nothing before the baseline
+    pass
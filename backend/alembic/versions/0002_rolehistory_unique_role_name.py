@@ -0,0 +1,56 @@
+"""Unique rolehistory.role_name
+
+Required by the batched role usage upsert.
+Duplicate role names are merged first: the most recently used row is kept
+and the usage counts are summed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_rolehistory_role_name"
+
+def upgrade():
+    bind = op.get_bind()
+    indexes = {ix["name"]: ix for ix in sa.inspect(bind).get_indexes("rolehistory")}
+    if INDEX in indexes and indexes[INDEX]["unique"]:
+        return
+
+    rows = bind.execute(sa.text(
+        "SELECT id, role_name, usage_count FROM rolehistory ORDER BY role_name, last_used_at DESC"
+    )).all()
+    keep = {}
+    totals = {}
+    drop = []
+    for role_id, role_name, usage_count in rows:
+        if role_name in keep:
+            drop.append(role_id)
+        else:
+            keep[role_name] = role_id
+        totals[role_name] = totals.get(role_name, 0) + (usage_count or 0)
+
+    if drop:
+        for role_name, role_id in keep.items():
+            bind.execute(
+                sa.text("UPDATE rolehistory SET usage_count = :count WHERE id = :id"),
+                {"count": totals[role_name], "id": role_id}
+            )
+        bind.execute(sa.text("DELETE FROM rolehistory WHERE id IN :ids").bindparams(
+            sa.bindparam("ids", expanding=True)
+        ), {"ids": drop})
+
+    if INDEX in indexes:
+        op.drop_index(INDEX, table_name="rolehistory")
+    op.create_index(INDEX, "rolehistory", ["role_name"], unique=True)
+
+def downgrade():
+    op.drop_index(INDEX, table_name="rolehistory")
+    op.create_index(INDEX, "rolehistory", ["role_name"], unique=False)
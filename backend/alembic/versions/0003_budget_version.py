@@ -0,0 +1,24 @@
+"""Budget version column
+
+budget.version, the optimistic-concurrency counter for delta saves.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("budget")}
+    if "version" not in columns:
+        op.add_column("budget", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade():
+    with op.batch_alter_table("budget") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,122 @@
+"""Derived and settings tables
+
+Creates budgetrollup, lineitemphasecost and projectfringesettings, and backfills
+phase cost rows for items that have a breakdown but none yet. Rollups are
+rebuilt lazily (budget_rollup.ensure_project_rollups).
+
+The backfill is a copy of phase_costs.phase_cost_rows as of this revision, so
+later changes to the app don't change what the revision writes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TABLES = ("budgetrollup", "lineitemphasecost", "projectfringesettings")
+PHASES = ("preProd", "shoot", "postProd")
+
+def _tables():
+    return {
+        "budgetrollup": (
+            sa.Column("grouping_id", sa.String(), nullable=False),
+            sa.Column("category_id", sa.String(), nullable=True),
+            sa.Column("budget_id", sa.String(), nullable=True),
+            sa.Column("item_count", sa.Integer(), nullable=False),
+            sa.Column("total", sa.Float(), nullable=False),
+            sa.Column("pre_prod", sa.Float(), nullable=False),
+            sa.Column("shoot", sa.Float(), nullable=False),
+            sa.Column("post_prod", sa.Float(), nullable=False),
+            sa.Column("other", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["grouping_id"], ["budgetgrouping.id"]),
+            sa.PrimaryKeyConstraint("grouping_id"),
+        ),
+        "lineitemphasecost": (
+            sa.Column("item_id", sa.String(), nullable=False),
+            sa.Column("phase", sa.String(), nullable=False),
+            sa.Column("days", sa.Float(), nullable=False),
+            sa.Column("gross", sa.Float(), nullable=False),
+            sa.Column("fringes", sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(["item_id"], ["lineitem.id"]),
+            sa.PrimaryKeyConstraint("item_id", "phase"),
+        ),
+        "projectfringesettings": (
+            sa.Column("project_id", sa.String(), nullable=False),
+            sa.Column("superannuation", sa.Float(), nullable=True),
+            sa.Column("holiday_pay", sa.Float(), nullable=True),
+            sa.Column("payroll_tax", sa.Float(), nullable=True),
+            sa.Column("workers_comp", sa.Float(), nullable=True),
+            sa.Column("contingency", sa.Float(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+            sa.PrimaryKeyConstraint("project_id"),
+        ),
+    }
+
+INDEXES = (
+    ("ix_budgetrollup_budget_id", "budgetrollup", ["budget_id"]),
+    ("ix_budgetrollup_category_id", "budgetrollup", ["category_id"]),
+    ("ix_lineitemphasecost_phase", "lineitemphasecost", ["phase"]),
+)
+
+def upgrade():
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    created = set()
+    for name, args in _tables().items():
+        if name not in existing:
+            op.create_table(name, *args)
+            created.add(name)
+    for index, table, columns in INDEXES:
+        if table in created:
+            op.create_index(index, table, columns)
+    _backfill_phase_costs(bind)
+
+def _phase_cost_rows(item_id, breakdown_json, fringes_json):
+    try:
+        breakdown = json.loads(breakdown_json)
+        fringes = json.loads(fringes_json) if fringes_json else {}
+        phases = [(p, float(breakdown[p].get("days", 0) or 0), float(breakdown[p].get("cost", 0) or 0))
+                  for p in PHASES if isinstance(breakdown.get(p), dict)]
+        total_fringes = float(fringes.get("total_fringes", 0) or 0)
+    except Exception:
+        # Unreadable breakdowns get no rows, as in phase_costs
+        return []
+
+    gross_total = sum(gross for _, _, gross in phases)
+    return [
+        {
+            "item_id": item_id,
+            "phase": phase,
+            "days": days,
+            "gross": gross,
+            "fringes": round(total_fringes * gross / gross_total, 2) if gross_total else 0.0
+        }
+        for phase, days, gross in phases
+    ]
+
+def _backfill_phase_costs(bind):
+    items = bind.execute(sa.text(
+        "SELECT id, breakdown_json, fringes_json FROM lineitem "
+        "WHERE breakdown_json IS NOT NULL AND breakdown_json != '' "
+        "AND id NOT IN (SELECT item_id FROM lineitemphasecost)"
+    )).all()
+    rows = [row for item in items for row in _phase_cost_rows(*item)]
+    if rows:
+        bind.execute(sa.text(
+            "INSERT INTO lineitemphasecost (item_id, phase, days, gross, fringes) "
+            "VALUES (:item_id, :phase, :days, :gross, :fringes)"
+        ), rows)
+
+def downgrade():
+    for name in reversed(TABLES):
+        op.drop_table(name)
@@ -0,0 +1,36 @@
+"""Foreign key and calendar date indexes
+
+Indexes on the foreign keys the budget tree is walked by, and on calendarday.date.
+Without them every tree load, rollup refresh and calendar lookup scans the table.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Names match what SQLModel's index=True generates, so create_all and this revision agree
+INDEXES = (
+    ("ix_projectphase_project_id", "projectphase", "project_id"),
+    ("ix_budget_project_id", "budget", "project_id"),
+    ("ix_budgetcategory_budget_id", "budgetcategory", "budget_id"),
+    ("ix_budgetgrouping_category_id", "budgetgrouping", "category_id"),
+    ("ix_lineitem_grouping_id", "lineitem", "grouping_id"),
+    ("ix_calendarday_date", "calendarday", "date"),
+)
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, column in INDEXES:
+        if name not in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,95 @@
+"""Compact stored breakdowns
+
+Rewrites breakdown_json still holding per-day "details" lists in the compact
+day_runs form. Already compact rows are left alone.
+
+The encoder is a copy of breakdown_codec's as of this revision, so what the
+revision writes doesn't change with the app code.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+import json
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+DETAIL_KEYS = ("date", "day_type", "is_holiday", "hours", "base_cost", "total_day_cost", "multiplier")
+RUN_KEYS = DETAIL_KEYS[1:]
+
+def _encode_days(details):
+    try:
+        dates = [date.fromisoformat(d["date"]) for d in details]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not dates or any(set(d) != set(DETAIL_KEYS) for d in details) or any(b <= a for a, b in zip(dates, dates[1:])):
+        return None
+
+    start = dates[0]
+    mask = 0
+    for d in dates:
+        mask |= 1 << (d - start).days
+
+    runs = []
+    for d in details:
+        key = [d[k] for k in RUN_KEYS]
+        if runs and runs[-1][1:] == key:
+            runs[-1][0] += 1
+        else:
+            runs.append([1] + key)
+    return {"start": start.isoformat(), "mask": format(mask, "x"), "runs": runs}
+
+def _decode_days(day_runs):
+    start = date.fromisoformat(day_runs["start"])
+    mask = int(day_runs["mask"], 16)
+    dates = [start + timedelta(days=offset) for offset in range(mask.bit_length()) if mask >> offset & 1]
+    details = []
+    for run in day_runs["runs"]:
+        for _ in range(run[0]):
+            detail = {"date": dates[len(details)].isoformat()}
+            detail.update(zip(RUN_KEYS, run[1:]))
+            details.append(detail)
+    return details
+
+def _compact(breakdown_json):
+    try:
+        breakdown = json.loads(breakdown_json)
+    except ValueError:
+        return breakdown_json
+    if not isinstance(breakdown, dict):
+        return breakdown_json
+
+    compact = {}
+    for phase, entry in breakdown.items():
+        if isinstance(entry, dict) and isinstance(entry.get("details"), list):
+            day_runs = _encode_days(entry["details"])
+            # Only lists that expand back exactly are replaced
+            if day_runs is not None and _decode_days(day_runs) == entry["details"]:
+                entry = {k: v for k, v in entry.items() if k != "details"}
+                entry["day_runs"] = day_runs
+        compact[phase] = entry
+    return json.dumps(compact)
+
+def upgrade():
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, breakdown_json FROM lineitem WHERE breakdown_json LIKE '%\"details\"%'"
+    )).all()
+    for item_id, breakdown_json in rows:
+        compact = _compact(breakdown_json)
+        if compact != breakdown_json:
+            bind.execute(
+                sa.text("UPDATE lineitem SET breakdown_json = :bk WHERE id = :id"),
+                {"bk": compact, "id": item_id}
+            )
+
+def downgrade():
+    # The compact form is what the app reads and writes; nothing to undo
+    pass
@@ -0,0 +1,66 @@
+"""Role search index
+
+SQLite only: the FTS5 table rolehistory_fts over rolehistory.role_name (see
+role_search), populated from the existing rows, and the triggers that keep it in
+sync on insert, update and delete. Uses the trigram tokenizer where the SQLite
+build has it and unicode61 otherwise; without FTS5 nothing is created and role
+search uses its LIKE fallback. Other databases always use the fallback.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+FTS_TABLE = "rolehistory_fts"
+TRIGGERS = {
+    "rolehistory_fts_ai": f"""AFTER INSERT ON rolehistory BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, role_name) VALUES (new.rowid, new.role_name);
+    END""",
+    "rolehistory_fts_ad": f"""AFTER DELETE ON rolehistory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, role_name) VALUES ('delete', old.rowid, old.role_name);
+    END""",
+    "rolehistory_fts_au": f"""AFTER UPDATE OF role_name ON rolehistory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, role_name) VALUES ('delete', old.rowid, old.role_name);
+        INSERT INTO {FTS_TABLE}(rowid, role_name) VALUES (new.rowid, new.role_name);
+    END""",
+}
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+
+    # Databases that ran the app before this revision built the index at startup
+    if FTS_TABLE not in sa.inspect(bind).get_table_names():
+        for tokenizer in ("trigram", "unicode61"):
+            # SQLite rolls back only the failed statement, not the migration's transaction
+            try:
+                bind.execute(sa.text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    f"role_name, content='rolehistory', content_rowid='rowid', tokenize='{tokenizer}')"
+                ))
+                break
+            except OperationalError:
+                continue
+        else:
+            return
+        bind.execute(sa.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    for name, body in TRIGGERS.items():
+        bind.execute(sa.text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    for name in TRIGGERS:
+        bind.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+    bind.execute(sa.text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
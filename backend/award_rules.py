@@ -0,0 +1,162 @@
+"""
+Award Rule Tables
+Loads penalty / overtime bands from data/award_rules.json and compiles each
+(rule set, day class) table into a cumulative piecewise-linear function of hours,
+so costing a day is a table lookup plus a binary search.
+"""
+import json
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Day classes, in the order used by the integer codes in rate_lookup_service
+DAY_CLASSES = ("WEEKDAY", "SATURDAY", "SUNDAY", "HOLIDAY")
+
+def rule_set_key(is_artist: bool, is_casual: bool) -> str:
+    """Name of the rule set for an employment type, e.g. 'crew_casual'."""
+    return f"{'artist' if is_artist else 'crew'}_{'casual' if is_casual else 'permanent'}"
+
+@dataclass(frozen=True)
+class CompiledBands:
+    """
+    Piecewise-linear cost function for one rule set / day class, in units of base hourly rate.
+    Band k starts at breakpoints[k], pays multipliers[k] per hour, and cumulative[k]
+    units have been accrued by the time it starts.
+    """
+    breakpoints: Tuple[float, ...]
+    multipliers: Tuple[float, ...]
+    cumulative: Tuple[float, ...]
+    labels: Tuple[str, ...] = ()
+    min_hours: float = 0.0
+
+    def effective_hours(self, hours: float) -> float:
+        return max(hours, self.min_hours)
+
+    def units(self, hours: float) -> float:
+        """Cost of `hours` (already adjusted for minimum call) in base-rate units."""
+        k = bisect_right(self.breakpoints, hours) - 1
+        if k < 0:
+            return 0.0
+        return self.cumulative[k] + self.multipliers[k] * (hours - self.breakpoints[k])
+
+    def units_array(self, hours: np.ndarray) -> np.ndarray:
+        """Vectorized units() over an array of hours."""
+        breakpoints = np.asarray(self.breakpoints)
+        k = np.searchsorted(breakpoints, hours, side='right') - 1
+        safe_k = np.maximum(k, 0)
+        units = np.asarray(self.cumulative)[safe_k] + np.asarray(self.multipliers)[safe_k] * (hours - breakpoints[safe_k])
+        return np.where(k < 0, 0.0, units)
+
+    def describe(self, hours: float) -> List[str]:
+        """Human readable split of `hours` across the bands, e.g. ['Base (1.0x): 7.6h', 'OT 1.5x: 0.4h']."""
+        details = []
+        for k, start in enumerate(self.breakpoints):
+            if k > 0 and hours <= start:
+                break
+            end = self.breakpoints[k + 1] if k + 1 < len(self.breakpoints) else hours
+            band_hours = min(hours, end) - start
+            label = self.labels[k] if k < len(self.labels) else f"{self.multipliers[k]}x"
+            details.append(f"{label}: {band_hours}h")
+        return details
+
+@lru_cache(maxsize=256)
+def compile_bands(
+    bands: Tuple[Tuple[float, float], ...],
+    labels: Tuple[str, ...] = (),
+    min_hours: float = 0.0
+) -> CompiledBands:
+    """
+    Compile (threshold, multiplier) bands into a CompiledBands function.
+    Bands are sorted by threshold once here (stable, so ties keep their order).
+    Hours below the first threshold cost nothing.
+    """
+    order = sorted(range(len(bands)), key=lambda i: bands[i][0])
+    breakpoints = tuple(float(bands[i][0]) for i in order)
+    multipliers = tuple(float(bands[i][1]) for i in order)
+    sorted_labels = tuple(labels[i] for i in order) if labels else ()
+
+    cumulative = []
+    accrued = 0.0
+    for k, start in enumerate(breakpoints):
+        if k > 0:
+            accrued += multipliers[k - 1] * (start - breakpoints[k - 1])
+        cumulative.append(accrued)
+
+    return CompiledBands(
+        breakpoints=breakpoints,
+        multipliers=multipliers,
+        cumulative=tuple(cumulative),
+        labels=sorted_labels,
+        min_hours=float(min_hours)
+    )
+
+class AwardRuleBook:
+    """Compiled rule tables, addressable by name or by a flat integer table id."""
+
+    def __init__(self, rule_sets: Dict[str, Dict[str, CompiledBands]]):
+        self.rule_sets = rule_sets
+        self.tables: List[CompiledBands] = []
+        self._table_ids: Dict[Tuple[str, str], int] = {}
+        for rule_set, day_classes in rule_sets.items():
+            for day_class in DAY_CLASSES:
+                # Day classes a rule set doesn't list are paid as WEEKDAY
+                bands = day_classes.get(day_class) or day_classes["WEEKDAY"]
+                self._table_ids[(rule_set, day_class)] = len(self.tables)
+                self.tables.append(bands)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AwardRuleBook":
+        rule_sets = {}
+        for rule_set, spec in data.get("rule_sets", {}).items():
+            min_hours = spec.get("min_hours", 0.0)
+            day_classes = {}
+            for day_class, bands in spec.get("day_classes", {}).items():
+                day_classes[day_class.upper()] = compile_bands(
+                    tuple((b["from"], b["multiplier"]) for b in bands),
+                    tuple(b.get("label", "") for b in bands),
+                    min_hours
+                )
+            if "WEEKDAY" not in day_classes:
+                raise ValueError(f"Rule set '{rule_set}' has no WEEKDAY bands")
+            rule_sets[rule_set] = day_classes
+        return cls(rule_sets)
+
+    @classmethod
+    def load(cls, path: str) -> "AwardRuleBook":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def table_id(self, rule_set: str, day_class: str) -> int:
+        return self._table_ids[(rule_set, day_class)]
+
+    def get(self, rule_set: str, day_class: str) -> CompiledBands:
+        return self.tables[self.table_id(rule_set, day_class)]
+
+    def units_batch(self, table_ids: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """
+        Cost in base-rate units for each (table id, hours) pair, applying each table's
+        minimum call. Evaluated one vector pass per distinct table present.
+        """
+        table_ids = np.asarray(table_ids, dtype=np.intp)
+        hours = np.asarray(hours, dtype=float)
+        units = np.zeros(hours.shape)
+        for table_id in np.unique(table_ids):
+            mask = table_ids == table_id
+            bands = self.tables[table_id]
+            units[mask] = bands.units_array(np.maximum(hours[mask], bands.min_hours))
+        return units
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "award_rules.json")
+
+# Singleton instance
+_award_rules: Optional[AwardRuleBook] = None
+
+def get_award_rules() -> AwardRuleBook:
+    global _award_rules
+    if _award_rules is None:
+        _award_rules = AwardRuleBook.load(DEFAULT_RULES_FILE)
+    return _award_rules
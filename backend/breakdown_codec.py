@@ -0,0 +1,155 @@
+"""
+Breakdown Codec
+Compact storage for the per-day `details` list of a costed breakdown.
+
+A detailed breakdown carries one dict per worked day. Stored, each phase's list is
+replaced by `day_runs`: the worked dates as a bitmap relative to the first date
+(hex string, bit i = start + i days) plus run-length groups of consecutive days
+that share day type, holiday flag, hours and costs. Expansion is exact; a list
+that would not round-trip (unsorted, duplicate dates, unexpected keys) is kept as is.
+
+Budget payloads carry only phase totals (summarize_breakdown_json); the per-day
+list is expanded on demand by GET /api/line-items/{id}/breakdown/days.
+"""
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+
+DETAIL_KEYS = ("date", "day_type", "is_holiday", "hours", "base_cost", "total_day_cost", "multiplier")
+# Per-day keys that go into a run, in run order (after the day count)
+RUN_KEYS = DETAIL_KEYS[1:]
+# Phase keys that hold day-level data, dropped from budget payloads
+DAY_KEYS = ("details", "day_runs", "day_classes")
+
+def encode_days(details: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """`day_runs` for a details list, or None if it cannot be encoded exactly."""
+    if not details:
+        return None
+    try:
+        dates = [date.fromisoformat(d["date"]) for d in details]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if any(set(d) != set(DETAIL_KEYS) for d in details) or any(b <= a for a, b in zip(dates, dates[1:])):
+        return None
+
+    start = dates[0]
+    mask = 0
+    for d in dates:
+        mask |= 1 << (d - start).days
+
+    runs = []
+    for d in details:
+        key = [d[k] for k in RUN_KEYS]
+        if runs and runs[-1][1:] == key:
+            runs[-1][0] += 1
+        else:
+            runs.append([1] + key)
+    return {"start": start.isoformat(), "mask": format(mask, "x"), "runs": runs}
+
+def decode_days(day_runs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The details list a `day_runs` entry was encoded from."""
+    start = date.fromisoformat(day_runs["start"])
+    mask = int(day_runs["mask"], 16)
+    dates = []
+    offset = 0
+    while mask:
+        if mask & 1:
+            dates.append(start + timedelta(days=offset))
+        mask >>= 1
+        offset += 1
+
+    details = []
+    for run in day_runs["runs"]:
+        for _ in range(run[0]):
+            detail = {"date": dates[len(details)].isoformat()}
+            detail.update(zip(RUN_KEYS, run[1:]))
+            details.append(detail)
+    return details
+
+def compact_breakdown(breakdown: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a breakdown with every phase's `details` list encoded as `day_runs`."""
+    compact = {}
+    for phase, entry in breakdown.items():
+        if isinstance(entry, dict) and isinstance(entry.get("details"), list):
+            day_runs = encode_days(entry["details"])
+            if day_runs is not None and decode_days(day_runs) == entry["details"]:
+                entry = {k: v for k, v in entry.items() if k != "details"}
+                entry["day_runs"] = day_runs
+        compact[phase] = entry
+    return compact
+
+def compact_breakdown_json(breakdown_json: Optional[str]) -> Optional[str]:
+    """Compacted form of a stored breakdown string (unparseable strings pass through)."""
+    if not breakdown_json or '"details"' not in breakdown_json:
+        return breakdown_json
+    try:
+        breakdown = json.loads(breakdown_json)
+    except ValueError:
+        return breakdown_json
+    if not isinstance(breakdown, dict):
+        return breakdown_json
+    return json.dumps(compact_breakdown(breakdown))
+
+def summarize_breakdown_json(breakdown_json: Optional[str]) -> Optional[str]:
+    """Breakdown with phase totals only (day-level lists dropped), for budget payloads."""
+    if not breakdown_json:
+        return breakdown_json
+    try:
+        breakdown = json.loads(breakdown_json)
+    except ValueError:
+        return breakdown_json
+    if not isinstance(breakdown, dict):
+        return breakdown_json
+    return json.dumps({
+        phase: {k: v for k, v in entry.items() if k not in DAY_KEYS} if isinstance(entry, dict) else entry
+        for phase, entry in breakdown.items()
+    })
+
+def restore_day_data(breakdown_json: Optional[str], stored_json: Optional[str]) -> Optional[str]:
+    """
+    A client sending back the summarized breakdown it was given must not wipe the
+    stored day-level data: phases with no day data whose days and cost match the
+    stored phase get the stored day data back.
+    """
+    if not breakdown_json or not stored_json or breakdown_json == stored_json:
+        return breakdown_json
+    try:
+        incoming, stored = json.loads(breakdown_json), json.loads(stored_json)
+    except ValueError:
+        return breakdown_json
+    if not isinstance(incoming, dict) or not isinstance(stored, dict):
+        return breakdown_json
+
+    restored = False
+    for phase, entry in incoming.items():
+        old = stored.get(phase)
+        if not isinstance(entry, dict) or not isinstance(old, dict) or any(k in entry for k in DAY_KEYS):
+            continue
+        if entry.get("days") == old.get("days") and entry.get("cost") == old.get("cost"):
+            incoming[phase] = {**entry, **{k: old[k] for k in DAY_KEYS if k in old}}
+            restored = True
+    if not restored:
+        return breakdown_json
+    # Unchanged apart from the dropped day data: keep the stored string byte-for-byte
+    return stored_json if incoming == stored else json.dumps(incoming)
+
+def expand_breakdown_days(breakdown_json: Optional[str]) -> Dict[str, Any]:
+    """
+    Per-phase day-level data of a stored breakdown: `details` (one dict per day) when
+    the item was costed day by day, `day_classes` when it was costed by histogram.
+    """
+    if not breakdown_json:
+        return {}
+    breakdown = json.loads(breakdown_json)
+    days = {}
+    for phase, entry in breakdown.items():
+        if not isinstance(entry, dict):
+            continue
+        if "day_runs" in entry:
+            days[phase] = {"details": decode_days(entry["day_runs"])}
+        elif "details" in entry:
+            days[phase] = {"details": entry["details"]}
+        elif "day_classes" in entry:
+            days[phase] = {"day_classes": entry["day_classes"]}
+    return days
@@ -0,0 +1,134 @@
+"""
+Budget Rollups
+Per-grouping totals (overall and per phase) kept in the BudgetRollup table, so
+summaries read one row per grouping instead of loading and json-parsing every item.
+
+Write paths call refresh_grouping_rollups() with the groupings whose items changed;
+only those groupings' items are re-read. Groupings without a rollup row (new, or
+from before the table existed) are filled in lazily by ensure_project_rollups().
+"""
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session, delete, func, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, BudgetRollup, LineItem
+
+# Max ids per IN (...) clause
+IN_CHUNK = 900
+
+def item_phase_costs(total: Optional[float], breakdown_json: Optional[str]) -> Dict[str, float]:
+    """Phase split of one item's cost, as the project summary reports it."""
+    costs = {"pre_prod": 0.0, "shoot": 0.0, "post_prod": 0.0, "other": 0.0}
+    if not breakdown_json:
+        costs["other"] = total or 0.0
+        return costs
+    try:
+        bk = json.loads(breakdown_json)
+        # Standard keys: preProd, shoot, postProd
+        if "preProd" in bk: costs["pre_prod"] = float(bk["preProd"].get("cost", 0) or 0)
+        if "shoot" in bk: costs["shoot"] = float(bk["shoot"].get("cost", 0) or 0)
+        if "postProd" in bk: costs["post_prod"] = float(bk["postProd"].get("cost", 0) or 0)
+    except Exception:
+        costs = {"pre_prod": 0.0, "shoot": 0.0, "post_prod": 0.0, "other": total or 0.0}
+    return costs
+
+def _chunks(ids: List[str]):
+    for start in range(0, len(ids), IN_CHUNK):
+        yield ids[start:start + IN_CHUNK]
+
+def refresh_grouping_rollups(session: Session, grouping_ids: Iterable[Optional[str]]) -> int:
+    """
+    Recompute the rollup rows of the given groupings from their items. Does not commit.
+    Rows of groupings that no longer exist are removed. Returns the number of rows written.
+    """
+    ids = list({g for g in grouping_ids if g})
+    if not ids:
+        return 0
+    session.flush()
+    now = datetime.utcnow()
+
+    written = 0
+    for chunk in _chunks(ids):
+        rows = {
+            grp_id: {
+                "grouping_id": grp_id, "category_id": cat_id, "budget_id": budget_id,
+                "item_count": 0, "total": 0.0,
+                "pre_prod": 0.0, "shoot": 0.0, "post_prod": 0.0, "other": 0.0,
+                "updated_at": now
+            }
+            for grp_id, cat_id, budget_id in session.exec(
+                select(BudgetGrouping.id, BudgetGrouping.category_id, BudgetCategory.budget_id)
+                .outerjoin(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+                .where(BudgetGrouping.id.in_(chunk))
+            ).all()
+        }
+        for grp_id, total, breakdown_json in session.exec(
+            select(LineItem.grouping_id, LineItem.total, LineItem.breakdown_json).where(LineItem.grouping_id.in_(chunk))
+        ).all():
+            row = rows[grp_id]
+            row["item_count"] += 1
+            row["total"] += total or 0.0
+            for phase, cost in item_phase_costs(total, breakdown_json).items():
+                row[phase] += cost
+
+        session.exec(delete(BudgetRollup).where(BudgetRollup.grouping_id.in_(chunk)))
+        if rows:
+            session.bulk_insert_mappings(BudgetRollup, list(rows.values()))
+        written += len(rows)
+    return written
+
+def drop_rollups(session: Session, grouping_ids: Iterable[str] = (), category_ids: Iterable[str] = ()):
+    """Remove rollups of deleted groupings, and of groupings detached from deleted categories."""
+    grouping_ids, category_ids = list(grouping_ids), list(category_ids)
+    for chunk in _chunks(grouping_ids):
+        session.exec(delete(BudgetRollup).where(BudgetRollup.grouping_id.in_(chunk)))
+    for chunk in _chunks(category_ids):
+        session.exec(delete(BudgetRollup).where(BudgetRollup.category_id.in_(chunk)))
+
+def ensure_project_rollups(session: Session, project_id: str) -> int:
+    """Build rollups for any of the project's groupings that have none yet. Returns count built."""
+    missing = session.exec(
+        select(BudgetGrouping.id)
+        .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+        .join(Budget, BudgetCategory.budget_id == Budget.id)
+        .where(Budget.project_id == project_id, BudgetGrouping.id.not_in(select(BudgetRollup.grouping_id)))
+    ).all()
+    if not missing:
+        return 0
+    return refresh_grouping_rollups(session, missing)
+
+def project_category_rollups(session: Session, project_id: str):
+    """
+    (category id, category name, total, pre_prod, shoot, post_prod, other) per category
+    of the project's budgets, summed from the grouping rollups in SQL.
+    Categories without items are included with zero totals.
+    """
+    sums = (
+        select(
+            BudgetRollup.category_id,
+            func.sum(BudgetRollup.total).label("total"),
+            func.sum(BudgetRollup.pre_prod).label("pre_prod"),
+            func.sum(BudgetRollup.shoot).label("shoot"),
+            func.sum(BudgetRollup.post_prod).label("post_prod"),
+            func.sum(BudgetRollup.other).label("other")
+        )
+        .where(BudgetRollup.budget_id.in_(select(Budget.id).where(Budget.project_id == project_id)))
+        .group_by(BudgetRollup.category_id)
+        .subquery()
+    )
+    return session.exec(
+        select(
+            BudgetCategory.id,
+            BudgetCategory.name,
+            func.coalesce(sums.c.total, 0.0),
+            func.coalesce(sums.c.pre_prod, 0.0),
+            func.coalesce(sums.c.shoot, 0.0),
+            func.coalesce(sums.c.post_prod, 0.0),
+            func.coalesce(sums.c.other, 0.0)
+        )
+        .join(Budget, BudgetCategory.budget_id == Budget.id)
+        .outerjoin(sums, sums.c.category_id == BudgetCategory.id)
+        .where(Budget.project_id == project_id)
+    ).all()
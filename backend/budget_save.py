@@ -0,0 +1,478 @@
+"""
+Budget Save
+Set-based persistence for POST /api/budget.
+
+Every category, grouping and item referenced by the request is prefetched with one
+IN query per table; deletions are single DELETE/UPDATE statements; new and changed
+items are written with bulk insert/update mappings. Unchanged rows are not written,
+so the cost of a save follows the number of changed rows, not the size of the tree.
+
+Delta saves (apply_budget_ops) go further: the client sends only the operations it
+made since it loaded the budget, together with the budget version it edited. The
+version is compared-and-bumped in a single UPDATE, so a stale client gets a
+VersionConflict instead of silently overwriting someone else's save.
+"""
+import json
+import uuid
+from typing import Any, Dict, Iterable, List, Literal, Optional, Set, Type, TypeVar
+
+from pydantic import BaseModel
+from sqlmodel import Session, SQLModel, delete, select, update
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem
+from role_history import RoleUsage, upsert_role_history
+from budget_rollup import drop_rollups, refresh_grouping_rollups
+from breakdown_codec import compact_breakdown_json, restore_day_data
+from phase_costs import clear_phase_costs, sync_phase_costs
+
+# Max ids per IN (...) clause
+IN_CHUNK = 900
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+def fetch_by_ids(session: Session, model: Type[ModelT], ids: Iterable[str]) -> Dict[str, ModelT]:
+    """Rows of `model` keyed by id, one IN query per IN_CHUNK ids."""
+    ids = list({i for i in ids if i})
+    rows = {}
+    for start in range(0, len(ids), IN_CHUNK):
+        for row in session.exec(select(model).where(model.id.in_(ids[start:start + IN_CHUNK]))).all():
+            rows[row.id] = row
+    return rows
+
+def delete_rows(session: Session, item_ids: List[str], grouping_ids: List[str], category_ids: List[str]) -> List[str]:
+    """
+    Set-based deletes. Children of deleted groupings/categories are detached
+    (foreign key set to NULL), as the ORM did when deleting parents one by one.
+    Returns the groupings that lost items (their rollups need refreshing).
+    """
+    touched = []
+    if item_ids:
+        touched = session.exec(select(LineItem.grouping_id).where(LineItem.id.in_(item_ids)).distinct()).all()
+        clear_phase_costs(session, item_ids)
+        session.exec(delete(LineItem).where(LineItem.id.in_(item_ids)))
+    if grouping_ids or category_ids:
+        drop_rollups(session, grouping_ids, category_ids)
+    if grouping_ids:
+        session.exec(update(LineItem).where(LineItem.grouping_id.in_(grouping_ids)).values(grouping_id=None))
+        session.exec(delete(BudgetGrouping).where(BudgetGrouping.id.in_(grouping_ids)))
+    if category_ids:
+        session.exec(update(BudgetGrouping).where(BudgetGrouping.category_id.in_(category_ids)).values(category_id=None))
+        session.exec(delete(BudgetCategory).where(BudgetCategory.id.in_(category_ids)))
+    return touched
+
+def item_values(item_data: Dict[str, Any], current: Optional[LineItem]) -> Dict[str, Any]:
+    """Column values of a line item from its save payload (fields missing from the payload keep `current`)."""
+    prep_qty = float(item_data.get("prep_qty", 0))
+    shoot_qty = float(item_data.get("shoot_qty", 0))
+    post_qty = float(item_data.get("post_qty", 0))
+
+    # Handle json lists safe retrieval
+    if "allowances" in item_data and isinstance(item_data["allowances"], list):
+        allowances_json = json.dumps(item_data["allowances"])
+    else:
+        allowances_json = item_data.get("allowances_json", "[]")
+
+    return {
+        "description": item_data.get("description", current.description if current else ""),
+        "rate": float(item_data.get("rate", 0)),
+        "quantity": prep_qty + shoot_qty + post_qty,
+        "total": float(item_data.get("total", 0)),
+        "is_labor": bool(item_data.get("is_labor", False)),
+        "notes": item_data.get("notes", None),
+
+        # Persist Quantities
+        "prep_qty": prep_qty,
+        "shoot_qty": shoot_qty,
+        "post_qty": post_qty,
+
+        # Labor specific
+        "base_hourly_rate": float(item_data.get("base_hourly_rate", 0)),
+        "daily_hours": float(item_data.get("daily_hours", 0)),
+        "days_per_week": float(item_data.get("days_per_week", 0)),
+        "is_casual": bool(item_data.get("is_casual", False)),
+
+        # V2 New Fields Persistence
+        "calendar_mode": item_data.get("calendar_mode", "inherit"),
+        "phase_details": item_data.get("phase_details", {}),
+        "labor_phases_json": item_data.get("labor_phases_json", "[]"), # Expect string from FE
+        "award_classification_id": item_data.get("award_classification_id"),
+        "role_history_id": item_data.get("role_history_id"),
+
+        # Fix for Unit Reset Issue
+        "unit": item_data.get("unit", (current.unit if current else None) or "day"),
+
+        # Persist Calculation Details
+        "breakdown_json": compact_breakdown_json(
+            restore_day_data(item_data.get("breakdown_json", None), current.breakdown_json if current else None)
+        ),
+        "fringes_json": item_data.get("fringes_json", None),
+        "allowances_json": allowances_json
+    }
+
+def _owning_budget_ids(session: Session, item_ids: List[str], grouping_ids: List[str], category_ids: List[str]) -> Set[str]:
+    """Budgets the given rows belong to (read before the rows are deleted)."""
+    budget_ids = set()
+    if category_ids:
+        budget_ids.update(session.exec(
+            select(BudgetCategory.budget_id).where(BudgetCategory.id.in_(category_ids))
+        ).all())
+    if grouping_ids:
+        budget_ids.update(session.exec(
+            select(BudgetCategory.budget_id)
+            .join(BudgetGrouping, BudgetGrouping.category_id == BudgetCategory.id)
+            .where(BudgetGrouping.id.in_(grouping_ids))
+        ).all())
+    if item_ids:
+        budget_ids.update(session.exec(
+            select(BudgetCategory.budget_id)
+            .join(BudgetGrouping, BudgetGrouping.category_id == BudgetCategory.id)
+            .join(LineItem, LineItem.grouping_id == BudgetGrouping.id)
+            .where(LineItem.id.in_(item_ids))
+        ).all())
+    return {b for b in budget_ids if b}
+
+def _changed(row: SQLModel, values: Dict[str, Any]) -> bool:
+    return any(getattr(row, column) != value for column, value in values.items())
+
+def save_budget_tree(
+    session: Session,
+    categories: List[Dict[str, Any]],
+    deleted_item_ids: List[str],
+    deleted_grouping_ids: List[str],
+    deleted_category_ids: List[str]
+) -> Dict[str, int]:
+    """Apply a full-tree save. Does not commit. Returns counts of rows written."""
+    # 1. Process Deletions First (a delete-only save still bumps the budgets it touched)
+    budget_ids = _owning_budget_ids(session, deleted_item_ids, deleted_grouping_ids, deleted_category_ids)
+    rollup_groupings = set(delete_rows(session, deleted_item_ids, deleted_grouping_ids, deleted_category_ids))
+
+    # 2. Prefetch everything the payload references
+    groupings_data = [grp for cat in categories for grp in cat.get("groupings", [])]
+    db_cats = fetch_by_ids(session, BudgetCategory, (cat.get("id") for cat in categories))
+    db_grps = fetch_by_ids(session, BudgetGrouping, (grp.get("id") for grp in groupings_data))
+    db_items = fetch_by_ids(session, LineItem, (
+        item.get("id") for grp in groupings_data for item in grp.get("items", [])
+    ))
+
+    # 3. Diff against the prefetched rows
+    cat_updates, grp_updates, item_updates, item_inserts = [], [], [], []
+    phase_items = set() # items whose breakdown/fringes changed
+    role_usages = [] # (role name, rate, unit, grouping id) of labor items
+    for cat_data in categories:
+        # If passed an ID that doesn't exist, we skip (assume it was a deletion)
+        db_cat = db_cats.get(cat_data.get("id"))
+        if db_cat and db_cat.name != cat_data.get("name", db_cat.name):
+            cat_updates.append({"id": db_cat.id, "name": cat_data["name"]})
+
+        for grp_data in cat_data.get("groupings", []):
+            grp_id = grp_data.get("id")
+            db_grp = db_grps.get(grp_id)
+            if db_grp:
+                values = {"name": grp_data.get("name", db_grp.name)}
+                # Persist valid overrides if present
+                if "calendar_overrides" in grp_data:
+                    values["calendar_overrides"] = grp_data["calendar_overrides"]
+                if _changed(db_grp, values):
+                    grp_updates.append({"id": db_grp.id, **values})
+
+            for item_data in grp_data.get("items", []):
+                item_id = item_data.get("id")
+                db_item = db_items.get(item_id)
+
+                if db_item:
+                    values = item_values(item_data, db_item)
+                    # Changed rows are written whole so they share one UPDATE statement
+                    if _changed(db_item, values):
+                        item_updates.append({"id": db_item.id, **values})
+                        if db_item.total != values["total"] or db_item.breakdown_json != values["breakdown_json"]:
+                            rollup_groupings.add(db_item.grouping_id)
+                        if db_item.breakdown_json != values["breakdown_json"] or db_item.fringes_json != values["fringes_json"]:
+                            phase_items.add(db_item.id)
+                    item_grouping_id = db_item.grouping_id
+                elif db_grp: # Ensure we have a parent grouping
+                    values = item_values(item_data, None)
+                    # If item_id is missing/empty, generate new
+                    item_inserts.append({"id": item_id or str(uuid.uuid4()), "grouping_id": grp_id, **values})
+                    rollup_groupings.add(grp_id)
+                    phase_items.add(item_inserts[-1]["id"])
+                    item_grouping_id = grp_id
+                else:
+                    continue
+
+                # Labor V2: Learn Role History
+                if values["is_labor"] and values["description"]:
+                    role_usages.append((
+                        values["description"],
+                        values["base_hourly_rate"] if values["base_hourly_rate"] > 0 else values["rate"],
+                        values["unit"],
+                        item_grouping_id
+                    ))
+
+    # 4. Bulk writes
+    if cat_updates or grp_updates or item_updates or item_inserts:
+        budget_ids.update(cat.budget_id for cat in db_cats.values() if cat.budget_id)
+    bump_budget_versions(session, budget_ids)
+    if cat_updates:
+        session.bulk_update_mappings(BudgetCategory, cat_updates)
+    if grp_updates:
+        session.bulk_update_mappings(BudgetGrouping, grp_updates)
+    if item_updates:
+        session.bulk_update_mappings(LineItem, item_updates)
+    if item_inserts:
+        session.bulk_insert_mappings(LineItem, item_inserts)
+    refresh_grouping_rollups(session, rollup_groupings)
+    sync_phase_costs(session, phase_items)
+
+    if role_usages:
+        record_role_usages(session, role_usages)
+
+    return {
+        "categories_updated": len(cat_updates),
+        "groupings_updated": len(grp_updates),
+        "items_updated": len(item_updates),
+        "items_inserted": len(item_inserts)
+    }
+
+def record_role_usages(session: Session, role_usages: List[tuple]):
+    """Upsert role history for (role, rate, unit, grouping id) tuples, resolving projects in one query."""
+    try:
+        grouping_ids = {grouping_id for *_, grouping_id in role_usages}
+        project_by_grouping = dict(session.exec(
+            select(BudgetGrouping.id, Budget.project_id)
+            .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+            .join(Budget, BudgetCategory.budget_id == Budget.id)
+            .where(BudgetGrouping.id.in_(grouping_ids))
+        ).all())
+        with session.begin_nested():
+            upsert_role_history(session, [
+                RoleUsage(role_name, base_rate, unit, project_by_grouping.get(grouping_id, "unknown"))
+                for role_name, base_rate, unit, grouping_id in role_usages
+            ])
+    except Exception as e:
+        print(f"Role history update failed: {e}") # Don't block save on history update failure
+
+def bump_budget_versions(session: Session, budget_ids: Iterable[str]):
+    budget_ids = list(budget_ids)
+    if budget_ids:
+        session.exec(update(Budget).where(Budget.id.in_(budget_ids)).values(version=Budget.version + 1))
+
+def bump_grouping_budget_versions(session: Session, grouping_ids: Iterable[Optional[str]]):
+    """
+    Bump the budgets owning the given groupings. Every write to the tree outside
+    save_budget_tree/apply_budget_ops goes through this, so delta saves based on
+    an older version get a VersionConflict instead of undoing it.
+    """
+    grouping_ids = list({g for g in grouping_ids if g})
+    for start in range(0, len(grouping_ids), IN_CHUNK):
+        owners = (
+            select(BudgetCategory.budget_id)
+            .join(BudgetGrouping, BudgetGrouping.category_id == BudgetCategory.id)
+            .where(BudgetGrouping.id.in_(grouping_ids[start:start + IN_CHUNK]))
+        )
+        session.exec(update(Budget).where(Budget.id.in_(owners)).values(version=Budget.version + 1))
+
+# --- Delta saves ---
+
+class VersionConflict(Exception):
+    def __init__(self, current_version: int):
+        super().__init__(f"Budget was modified (current version {current_version})")
+        self.current_version = current_version
+
+class BudgetOp(BaseModel):
+    """
+    One edit to a budget tree.
+      upsert_item:     id (new if missing/unknown), grouping_id (required for new items), fields
+      delete_item:     id
+      add_grouping:    category_id, code, name, optional id / calendar_overrides
+      update_grouping: id, name and/or calendar_overrides
+      delete_grouping: id (its items are detached, as in the full save)
+      rename_category: id, name
+      delete_category: id
+    """
+    op: Literal[
+        "upsert_item", "delete_item",
+        "add_grouping", "update_grouping", "delete_grouping",
+        "rename_category", "delete_category"
+    ]
+    id: Optional[str] = None
+    grouping_id: Optional[str] = None
+    category_id: Optional[str] = None
+    code: Optional[str] = None
+    name: Optional[str] = None
+    calendar_overrides: Optional[Dict[str, Any]] = None
+    fields: Dict[str, Any] = {}
+
+def _claim_version(session: Session, budget_id: str, version: int) -> int:
+    """Compare-and-bump the budget version in one statement. Returns the new version."""
+    result = session.exec(
+        update(Budget)
+        .where(Budget.id == budget_id, Budget.version == version)
+        .values(version=Budget.version + 1)
+    )
+    if result.rowcount != 1:
+        current = session.exec(select(Budget.version).where(Budget.id == budget_id)).first()
+        if current is None:
+            raise LookupError("Budget not found")
+        raise VersionConflict(current)
+    return version + 1
+
+def _budget_rows(session: Session, budget_id: str, ops: List[BudgetOp]):
+    """Categories, groupings and items named by the ops, restricted to this budget (one query each)."""
+    cat_ids = {op.id for op in ops if op.op in ("rename_category", "delete_category")}
+    cat_ids |= {op.category_id for op in ops if op.op == "add_grouping"}
+    grp_ids = {op.id for op in ops if op.op in ("update_grouping", "delete_grouping")}
+    grp_ids |= {op.grouping_id for op in ops if op.op == "upsert_item"}
+    item_ids = {op.id for op in ops if op.op in ("upsert_item", "delete_item")}
+    cat_ids.discard(None)
+    grp_ids.discard(None)
+    item_ids.discard(None)
+
+    cats = {
+        c.id: c for c in session.exec(
+            select(BudgetCategory).where(BudgetCategory.budget_id == budget_id, BudgetCategory.id.in_(cat_ids))
+        ).all()
+    } if cat_ids else {}
+    grps = {
+        g.id: g for g in session.exec(
+            select(BudgetGrouping)
+            .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+            .where(BudgetCategory.budget_id == budget_id, BudgetGrouping.id.in_(grp_ids))
+        ).all()
+    } if grp_ids else {}
+    items = {
+        i.id: i for i in session.exec(
+            select(LineItem)
+            .join(BudgetGrouping, LineItem.grouping_id == BudgetGrouping.id)
+            .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+            .where(BudgetCategory.budget_id == budget_id, LineItem.id.in_(item_ids))
+        ).all()
+    } if item_ids else {}
+    return cats, grps, items
+
+def _row_values(row: SQLModel) -> Dict[str, Any]:
+    return {column: getattr(row, column) for column in type(row).__table__.columns.keys()}
+
+def apply_budget_ops(session: Session, budget_id: str, version: int, ops: List[BudgetOp]) -> Dict[str, Any]:
+    """
+    Apply a delta save to one budget. Does not commit.
+    Raises LookupError for an unknown budget, VersionConflict when `version` is stale,
+    and ValueError for an op that names rows outside this budget.
+    Returns the new version and the ids of created items/groupings (in op order).
+    """
+    new_version = _claim_version(session, budget_id, version)
+    cats, grps, items = _budget_rows(session, budget_id, ops)
+
+    deleted_items, deleted_grps, deleted_cats = [], [], []
+    cat_updates, grp_updates, grp_inserts = {}, {}, []
+    item_updates, item_inserts = {}, {}
+    role_usages = []
+    rollup_groupings = set()
+    phase_items = set()
+    created = []
+
+    for index, op in enumerate(ops):
+        if op.op == "upsert_item":
+            db_item = items.get(op.id)
+            if db_item:
+                # Only the fields sent change; everything else keeps its stored value
+                current = {**_row_values(db_item), **item_updates.get(db_item.id, {})}
+                values = item_values({**current, **op.fields}, db_item)
+                values = {k: v for k, v in values.items() if current.get(k) != v}
+                if values:
+                    item_updates.setdefault(db_item.id, {"id": db_item.id}).update(values)
+                if "total" in values or "breakdown_json" in values:
+                    rollup_groupings.add(db_item.grouping_id)
+                if "breakdown_json" in values or "fringes_json" in values:
+                    phase_items.add(db_item.id)
+                values = {**current, **values}
+                grouping_id = db_item.grouping_id
+            elif op.id in item_inserts:
+                row = item_inserts[op.id] # created earlier in this batch
+                row.update(item_values({**row, **op.fields}, None))
+                values, grouping_id = row, row["grouping_id"]
+            elif op.grouping_id in grps:
+                item_id = op.id or str(uuid.uuid4())
+                values = item_values(op.fields, None)
+                item_inserts[item_id] = {"id": item_id, "grouping_id": op.grouping_id, **values}
+                rollup_groupings.add(op.grouping_id)
+                phase_items.add(item_id)
+                created.append(item_id)
+                grouping_id = op.grouping_id
+            else:
+                raise ValueError(f"Op {index}: grouping {op.grouping_id} is not in this budget")
+
+            # Labor V2: Learn Role History
+            if values["is_labor"] and values["description"]:
+                base_rate = values["base_hourly_rate"] if values["base_hourly_rate"] > 0 else values["rate"]
+                role_usages.append((values["description"], base_rate, values["unit"], grouping_id))
+
+        elif op.op == "delete_item":
+            # Deleting an already-deleted item is a no-op
+            if op.id in items:
+                deleted_items.append(op.id)
+            # An item created earlier in this batch is never inserted
+            if item_inserts.pop(op.id, None):
+                created.remove(op.id)
+            item_updates.pop(op.id, None)
+
+        elif op.op == "add_grouping":
+            if op.category_id not in cats:
+                raise ValueError(f"Op {index}: category {op.category_id} is not in this budget")
+            if not op.code or not op.name:
+                raise ValueError(f"Op {index}: add_grouping needs a code and a name")
+            grp = BudgetGrouping(
+                id=op.id or str(uuid.uuid4()),
+                code=op.code,
+                name=op.name,
+                category_id=op.category_id,
+                calendar_overrides=op.calendar_overrides or {}
+            )
+            grp_inserts.append(grp)
+            grps[grp.id] = grp # later ops may add items to it
+            created.append(grp.id)
+
+        elif op.op == "update_grouping":
+            if op.id not in grps:
+                raise ValueError(f"Op {index}: grouping {op.id} is not in this budget")
+            changes = grp_updates.setdefault(op.id, {"id": op.id})
+            if op.name is not None:
+                changes["name"] = op.name
+            if op.calendar_overrides is not None:
+                changes["calendar_overrides"] = op.calendar_overrides
+
+        elif op.op == "delete_grouping":
+            if grps.pop(op.id, None):
+                deleted_grps.append(op.id)
+                grp_updates.pop(op.id, None)
+                if op.id in created: # added earlier in this batch
+                    created.remove(op.id)
+
+        elif op.op == "rename_category":
+            if op.id not in cats or op.name is None:
+                raise ValueError(f"Op {index}: category {op.id} is not in this budget")
+            cat_updates[op.id] = {"id": op.id, "name": op.name}
+
+        elif op.op == "delete_category":
+            if cats.pop(op.id, None):
+                deleted_cats.append(op.id)
+                cat_updates.pop(op.id, None)
+
+    # New groupings first so new items can reference them
+    session.add_all(grp_inserts)
+    session.flush()
+    if cat_updates:
+        session.bulk_update_mappings(BudgetCategory, list(cat_updates.values()))
+    if grp_updates:
+        session.bulk_update_mappings(BudgetGrouping, list(grp_updates.values()))
+    if item_updates:
+        session.bulk_update_mappings(LineItem, list(item_updates.values()))
+    if item_inserts:
+        session.bulk_insert_mappings(LineItem, list(item_inserts.values()))
+    rollup_groupings.update(delete_rows(session, deleted_items, deleted_grps, deleted_cats))
+    refresh_grouping_rollups(session, rollup_groupings - set(deleted_grps))
+    sync_phase_costs(session, phase_items - set(deleted_items))
+
+    if role_usages:
+        record_role_usages(session, role_usages)
+
+    return {"version": new_version, "created": created}
@@ -0,0 +1,108 @@
+"""
+Budget Summary
+ATL/BTL, fringe and contingency totals of one budget from a single aggregate query:
+category codes are split with CASE, fringe amounts are read from each item's stored
+fringes_json inside the database. No ORM objects are loaded, so the dashboard poll
+costs the same at any budget size. (On PostgreSQL a malformed fringes_json row makes
+the aggregate fail; the fringe sums are then read row by row.)
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import Float, case, cast
+from sqlalchemy.exc import DataError
+from sqlmodel import Session, func, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem
+from fringe_settings import get_fringe_settings
+from labor_calculator_service import FRINGE_COMPONENTS
+
+# Above-the-line categories by code; everything else is below the line
+ATL_CODES = ("A", "B")
+
+def _json_number(session: Session, column, key: str):
+    """SQL expression for a numeric key of a JSON string column (NULL if missing)."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import JSON
+        return cast(cast(column, JSON)[key].astext, Float)
+    return cast(func.json_extract(column, f"$.{key}"), Float)
+
+def empty_summary() -> Dict[str, Any]:
+    return {
+        "grand_total": 0,
+        "atl_total": 0,
+        "btl_total": 0,
+        "fringes_total": 0,
+        "contingency_total": 0,
+        "total_with_contingency": 0,
+        "fringe_breakdown": {}
+    }
+
+def _budget_items(query, budget_id: str):
+    return (
+        query.select_from(LineItem)
+        .join(BudgetGrouping, LineItem.grouping_id == BudgetGrouping.id)
+        .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+        .where(BudgetCategory.budget_id == budget_id)
+    )
+
+def _fringe_sums_by_row(session: Session, budget_id: str, keys: Tuple[str, ...]) -> List[float]:
+    """Sums of `keys` over the budget's fringes_json parsed row by row; unreadable rows are skipped."""
+    sums = dict.fromkeys(keys, 0.0)
+    rows = session.exec(_budget_items(select(LineItem.fringes_json), budget_id).where(LineItem.fringes_json != None)).all()
+    for fringes_json in rows:
+        try:
+            fringes = json.loads(fringes_json)
+            values = {key: float(fringes.get(key) or 0) for key in keys}
+        except (ValueError, TypeError, AttributeError):
+            continue
+        for key, value in values.items():
+            sums[key] += value
+    return [sums[key] for key in keys]
+
+def calculate_budget_summary(session: Session, budget_id: str) -> Dict[str, Any]:
+    """
+    Totals of a budget. Item totals already include their fringes; fringes_total and
+    fringe_breakdown report that part separately. grand_total is ATL + BTL (the sum of
+    item totals); contingency applies to BTL at the project's contingency percentage
+    and total_with_contingency = grand_total + contingency_total.
+    """
+    is_atl = BudgetCategory.code.in_(ATL_CODES)
+    totals = [
+        func.coalesce(func.sum(case((is_atl, LineItem.total), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((is_atl, 0.0), else_=LineItem.total)), 0.0),
+    ]
+    fringe_keys = FRINGE_COMPONENTS + ("total_fringes",)
+
+    if session.get_bind().dialect.name == "postgresql":
+        fringe_sums = [func.coalesce(func.sum(_json_number(session, LineItem.fringes_json, key)), 0.0) for key in fringe_keys]
+        try:
+            with session.begin_nested():
+                row = session.exec(_budget_items(select(*totals, *fringe_sums), budget_id)).one()
+        except DataError:
+            # One malformed fringes_json fails the JSON cast for the whole query: read fringes row by row
+            row = (
+                *session.exec(_budget_items(select(*totals), budget_id)).one(),
+                *_fringe_sums_by_row(session, budget_id, fringe_keys)
+            )
+    else:
+        # Items with unreadable fringes_json are skipped by json_valid
+        fringes_json = case((func.json_valid(LineItem.fringes_json) == 1, LineItem.fringes_json), else_=None)
+        fringe_sums = [func.coalesce(func.sum(_json_number(session, fringes_json, key)), 0.0) for key in fringe_keys]
+        row = session.exec(_budget_items(select(*totals, *fringe_sums), budget_id)).one()
+    atl_total, btl_total = row[0], row[1]
+    fringes = dict(zip(fringe_keys, row[2:]))
+
+    budget = session.get(Budget, budget_id)
+    settings = get_fringe_settings(session, budget.project_id if budget else None)
+    contingency_total = round(btl_total * settings.contingency / 100.0, 2)
+
+    return {
+        "grand_total": atl_total + btl_total,
+        "atl_total": atl_total,
+        "btl_total": btl_total,
+        "fringes_total": fringes.pop("total_fringes"),
+        "contingency_total": contingency_total,
+        "total_with_contingency": atl_total + btl_total + contingency_total,
+        "fringe_breakdown": fringes
+    }
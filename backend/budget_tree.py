@@ -0,0 +1,48 @@
+"""
+Budget Tree
+Loads a budget's category -> grouping -> item tree with three flat queries (one per
+table) and assembles it in memory, instead of one query per category and grouping.
+Rows are read as plain column mappings, so no ORM objects are built or dumped.
+Item breakdowns are sent as phase totals only; day-level detail is fetched per item.
+"""
+from typing import Any, Dict, List
+
+from sqlmodel import Session, select
+
+from breakdown_codec import summarize_breakdown_json
+from models import BudgetCategory, BudgetGrouping, LineItem
+
+def _rows(session: Session, model, *criteria, order_by=None) -> List[Dict[str, Any]]:
+    stmt = select(*model.__table__.columns).where(*criteria)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return [dict(row._mapping) for row in session.exec(stmt).all()]
+
+def load_budget_tree(session: Session, budget_id: str) -> List[Dict[str, Any]]:
+    """
+    Categories (by sort_order) with their groupings and items, as dicts.
+    Each grouping carries `sub_total` and each category `total` (sums of item totals).
+    """
+    cat_ids = select(BudgetCategory.id).where(BudgetCategory.budget_id == budget_id)
+    grp_ids = select(BudgetGrouping.id).where(BudgetGrouping.category_id.in_(cat_ids))
+
+    cats = _rows(session, BudgetCategory, BudgetCategory.budget_id == budget_id, order_by=BudgetCategory.sort_order)
+    grps = _rows(session, BudgetGrouping, BudgetGrouping.category_id.in_(cat_ids))
+    items = _rows(session, LineItem, LineItem.grouping_id.in_(grp_ids))
+
+    items_by_grp: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        item["breakdown_json"] = summarize_breakdown_json(item["breakdown_json"])
+        items_by_grp.setdefault(item["grouping_id"], []).append(item)
+
+    grps_by_cat: Dict[str, List[Dict[str, Any]]] = {}
+    for grp in grps:
+        grp["items"] = items_by_grp.get(grp["id"], [])
+        grp["sub_total"] = sum(i["total"] for i in grp["items"])
+        grps_by_cat.setdefault(grp["category_id"], []).append(grp)
+
+    for cat in cats:
+        cat["groupings"] = grps_by_cat.get(cat["id"], [])
+        cat["total"] = sum(g["sub_total"] for g in cat["groupings"])
+
+    return cats
@@ -0,0 +1,128 @@
+"""
+Project Calendar Cache
+In-process cache of resolved, parsed project calendars.
+
+Entries are keyed by (project_id, calendar version). The version is bumped by
+POST /api/projects/{id}/calendar, which makes every cached entry for the project
+unreachable. Grouping-level calendar_overrides are layered on top of the project
+calendar and cached under a hash of the override content.
+"""
+import hashlib
+import json
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+from models import ProductionCalendar, CalendarDay
+
+# Resolved calendar: {phase_key: (default_hours, sorted dates)}
+ResolvedCalendar = Dict[str, Tuple[float, Tuple[date, ...]]]
+
+# Base defaults used before the project calendar is applied
+DEFAULT_PHASE_HOURS = {"preProd": 8.0, "shoot": 10.0, "postProd": 8.0}
+PHASE_KEY_MAP = {"PRE_PROD": "preProd", "SHOOT": "shoot", "POST_PROD": "postProd"}
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_project_calendars: Dict[Tuple[str, int], ResolvedCalendar] = {}
+_grouping_calendars: Dict[Tuple[str, int, str], ResolvedCalendar] = {}
+
+def parse_dates(date_strings: List[Any]) -> Tuple[date, ...]:
+    """Parse ISO date strings (with/without Z), dropping invalid ones, sorted."""
+    active_dates = []
+    for d_str in date_strings:
+        try:
+            # Handle ISO string with/without Z
+            active_dates.append(datetime.fromisoformat(d_str.replace('Z', '')).date())
+        except (ValueError, AttributeError):
+            continue
+    active_dates.sort()
+    return tuple(active_dates)
+
+def apply_phase_overrides(calendar: ResolvedCalendar, overrides: Optional[Dict[str, Any]]) -> ResolvedCalendar:
+    """
+    Layer sparse phase overrides ({ "shoot": { "inherit": false, "defaultHours": 12, "dates": [...] } })
+    on top of a resolved calendar. Only phases that explicitly disable inheritance take effect.
+    """
+    if not overrides:
+        return calendar
+    result = dict(calendar)
+    for phase, (hours, dates) in calendar.items():
+        ov = overrides.get(phase)
+        if isinstance(ov, dict) and ov.get("inherit") == False:
+            if "defaultHours" in ov:
+                hours = float(ov["defaultHours"])
+            if "dates" in ov:
+                dates = parse_dates(ov["dates"] or [])
+            result[phase] = (hours, dates)
+    return result
+
+def get_calendar_version(project_id: str) -> int:
+    return _versions.get(project_id, 0)
+
+def bump_calendar_version(project_id: str) -> int:
+    """Invalidate every cached calendar of a project. Call after committing calendar changes."""
+    with _lock:
+        version = _versions.get(project_id, 0) + 1
+        _versions[project_id] = version
+        for key in [k for k in _project_calendars if k[0] == project_id]:
+            del _project_calendars[key]
+        for key in [k for k in _grouping_calendars if k[0] == project_id]:
+            del _grouping_calendars[key]
+    return version
+
+def clear_calendar_cache():
+    with _lock:
+        _versions.clear()
+        _project_calendars.clear()
+        _grouping_calendars.clear()
+
+def _load_project_calendar(session: Session, project_id: str) -> ResolvedCalendar:
+    calendar = {phase: (hours, ()) for phase, hours in DEFAULT_PHASE_HOURS.items()}
+    calendars = session.exec(select(ProductionCalendar).where(ProductionCalendar.project_id == project_id)).all()
+    if not calendars:
+        return calendar
+
+    days = session.exec(
+        select(CalendarDay).where(CalendarDay.calendar_id.in_([cal.id for cal in calendars]))
+    ).all()
+    dates_by_calendar: Dict[str, List[date]] = {}
+    for day in days:
+        dates_by_calendar.setdefault(day.calendar_id, []).append(day.date.date())
+
+    for cal in calendars:
+        phase_key = PHASE_KEY_MAP.get(cal.phase, cal.phase.lower())
+        if phase_key in calendar:
+            calendar[phase_key] = (cal.default_hours, tuple(sorted(dates_by_calendar.get(cal.id, []))))
+    return calendar
+
+def get_project_calendar(session: Session, project_id: str) -> ResolvedCalendar:
+    """Resolved project calendar (Global tier), loaded from the DB at most once per version."""
+    key = (project_id, get_calendar_version(project_id))
+    calendar = _project_calendars.get(key)
+    if calendar is None:
+        calendar = _load_project_calendar(session, project_id)
+        with _lock:
+            # Only store if no invalidation happened while loading
+            if get_calendar_version(project_id) == key[1]:
+                _project_calendars[key] = calendar
+    return calendar
+
+def _override_hash(overrides: Dict[str, Any]) -> str:
+    payload = json.dumps(overrides, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def get_grouping_calendar(session: Session, project_id: str, overrides: Optional[Dict[str, Any]]) -> ResolvedCalendar:
+    """Project calendar with a grouping's calendar_overrides applied (Group tier)."""
+    if not overrides:
+        return get_project_calendar(session, project_id)
+
+    key = (project_id, get_calendar_version(project_id), _override_hash(overrides))
+    calendar = _grouping_calendars.get(key)
+    if calendar is None:
+        calendar = apply_phase_overrides(get_project_calendar(session, project_id), overrides)
+        with _lock:
+            if get_calendar_version(project_id) == key[1]:
+                _grouping_calendars[key] = calendar
+    return calendar
@@ -0,0 +1,115 @@
+"""
+Classification Index
+Lookup structures over the payguide classifications, built once at load time:
+- an exact-match dict on normalized classification names
+- an n-gram index (all 1-3 character substrings) for ranked substring search
+The index is immutable, so ranked results are memoized per (query, limit).
+"""
+import heapq
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MAX_GRAM = 3
+
+def normalize_name(name: str) -> str:
+    """Case-insensitive, whitespace-collapsed form used for matching."""
+    return " ".join((name or "").casefold().split())
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + n] for n in range(1, MAX_GRAM + 1) for i in range(len(text) - n + 1)}
+
+class ClassificationIndex:
+    def __init__(self, sections: Iterable[Dict]):
+        self._by_name: Dict[str, Dict] = {}
+        self._names: List[str] = [] # normalized names of search entries
+        self._results: List[Dict] = [] # search result payloads, aligned with _names
+        self._grams: Dict[str, Set[int]] = {}
+        self._ranked = lru_cache(maxsize=2048)(self._ranked_ids)
+
+        seen_keys = set()
+        for section in sections:
+            section_name = section.get("name", "")
+            for cls in section.get("classifications", []):
+                cls_name = cls.get("classification", "")
+                rate = cls.get("hourly_rate", 0)
+
+                # Filter out bad parsing
+                if rate <= 0: continue
+                if not cls_name: continue
+
+                name = normalize_name(cls_name)
+                # First valid entry in file order wins for exact lookups
+                self._by_name.setdefault(name, {
+                    **cls,
+                    "section_name": section.get("name"),
+                    "base_hourly": rate
+                })
+
+                key = f"{cls_name}_{rate}"
+                if key in seen_keys: continue
+                seen_keys.add(key)
+
+                entry_id = len(self._names)
+                self._names.append(name)
+                self._results.append({
+                    "classification": cls_name,
+                    "hourly_rate": rate,
+                    "base_hourly": rate,
+                    "section_name": section_name,
+                    "section": section_name,
+                    "_meta_source": cls.get("_meta_source", ""),
+                    "award": "Broadcasting" # Generic for now
+                })
+                for gram in _grams(name):
+                    self._grams.setdefault(gram, set()).add(entry_id)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def find(self, classification: str) -> Optional[Dict]:
+        entry = self._by_name.get(normalize_name(classification))
+        return dict(entry) if entry else None
+
+    def _candidates(self, query: str) -> Set[int]:
+        if len(query) <= MAX_GRAM:
+            return self._grams.get(query, set())
+        # A substring match must contain every trigram of the query; intersect from the rarest
+        postings = sorted(
+            (self._grams.get(query[i:i + MAX_GRAM], set()) for i in range(len(query) - MAX_GRAM + 1)),
+            key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return candidates
+
+    def _rank(self, name: str, query: str) -> Optional[int]:
+        """0 = exact, 1 = name prefix, 2 = word prefix, 3 = substring, None = no match."""
+        if name == query:
+            return 0
+        if name.startswith(query):
+            return 1
+        pos = name.find(query)
+        if pos < 0:
+            return None
+        if not name[pos - 1].isalnum():
+            return 2
+        return 3
+
+    def _ranked_ids(self, query: str, limit: int) -> Tuple[int, ...]:
+        scored: List[Tuple[int, int, int]] = []
+        for entry_id in self._candidates(query):
+            name = self._names[entry_id]
+            rank = self._rank(name, query)
+            if rank is not None:
+                scored.append((rank, len(name), entry_id))
+        return tuple(entry_id for _, _, entry_id in heapq.nsmallest(limit, scored))
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Classifications containing `query`, best matches first (rank, then shorter names, then file order)."""
+        query = normalize_name(query)
+        if not query or limit <= 0:
+            return []
+        return [dict(self._results[entry_id]) for entry_id in self._ranked(query, limit)]
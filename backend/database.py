@@ -1,14 +1,82 @@
 import os
-from sqlmodel import SQLModel, create_engine, Session
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine, Session
 
 sqlite_file_name = os.path.join(os.path.dirname(__file__), "shortkings.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+# DATABASE_URL selects the backend (docker-compose sets a PostgreSQL URL); default is the local SQLite file
+DATABASE_URL = os.environ.get("DATABASE_URL", sqlite_url)
+SQL_ECHO = os.environ.get("SQL_ECHO", "0") == "1"
+
+# SQLite profile
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_BYTES = int(os.environ.get("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# PostgreSQL profile
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+def _tune_sqlite(engine: Engine, in_memory: bool):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            # WAL lets readers run alongside the writer; NORMAL is durable across app crashes in WAL mode
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+def build_engine(url: str = DATABASE_URL, echo: bool = SQL_ECHO, **kwargs) -> Engine:
+    """
+    Engine for `url` with the profile of its backend:
+    SQLite - WAL, synchronous=NORMAL, mmap, busy timeout (shared across threads);
+    PostgreSQL - sized connection pool with pre-ping and recycling.
+    Extra kwargs go to create_engine (e.g. poolclass for in-memory test databases).
+    """
+    # Heroku-style URLs
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False, **kwargs.pop("connect_args", {})}
+        engine = create_engine(url, echo=echo, connect_args=connect_args, **kwargs)
+        in_memory = url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+        _tune_sqlite(engine, in_memory)
+        return engine
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        **kwargs
+    }
+    return create_engine(url, echo=echo, **options)
+
+engine = build_engine()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "alembic")
+
+def run_migrations(bind: Engine = None, revision: str = "head"):
+    """Upgrade the schema to `revision` through the Alembic chain in alembic/versions."""
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    run_migrations()
 
 def get_session():
     with Session(engine) as session:
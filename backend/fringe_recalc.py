@@ -0,0 +1,75 @@
+"""
+Fringe Recalc
+Fringe-only recompute for when fringe percentages change. A labor item's stored
+total is gross + fringes, so the new fringes follow from the stored gross and the
+casual flag alone: no calendars are resolved and no days are re-priced.
+"""
+import json
+from typing import Any, Optional
+
+from sqlmodel import Session, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem
+from labor_calculator_service import FRINGE_COMPONENTS, calculate_fringes_batch
+from budget_rollup import refresh_grouping_rollups
+from budget_save import bump_grouping_budget_versions
+from phase_costs import sync_phase_costs
+
+FRINGE_FIELDS = ("superannuation", "holiday_pay", "payroll_tax", "workers_comp")
+
+def fringe_rates_changed(old: Any, new: Any) -> bool:
+    return any(getattr(old, f) != getattr(new, f) for f in FRINGE_FIELDS)
+
+def recompute_fringes(session: Session, fringe_settings: Any, project_id: Optional[str] = None) -> int:
+    """
+    Re-apply fringe percentages to every costed labor item (optionally one project's),
+    writing fringes_json and total back in one bulk UPDATE. Does not commit.
+    Returns the number of items updated.
+    """
+    stmt = select(
+        LineItem.id, LineItem.grouping_id, LineItem.total, LineItem.fringes_json, LineItem.is_casual
+    ).where(LineItem.is_labor == True, LineItem.fringes_json != None)
+    if project_id:
+        stmt = (
+            stmt.join(BudgetGrouping, LineItem.grouping_id == BudgetGrouping.id)
+            .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+            .join(Budget, BudgetCategory.budget_id == Budget.id)
+            .where(Budget.project_id == project_id)
+        )
+
+    ids, grouping_ids, gross, casual, old_fringes = [], [], [], [], []
+    for item_id, grouping_id, total, fringes_json, is_casual in session.exec(stmt).all():
+        try:
+            fringes = json.loads(fringes_json)
+            total_fringes = float(fringes["total_fringes"])
+        except Exception:
+            continue # Not a costed item (or unreadable): left for a full recalc
+        ids.append(item_id)
+        grouping_ids.append(grouping_id)
+        # total = round(gross, 2) + fringes, see cost_result_values
+        gross.append(round((total or 0.0) - total_fringes, 2))
+        casual.append(bool(is_casual))
+        old_fringes.append(fringes)
+    if not ids:
+        return 0
+
+    new = calculate_fringes_batch(gross, casual, fringe_settings)
+    totals = (new["total_fringes"] + gross).tolist()
+    columns = {k: v.tolist() for k, v in new.items()}
+
+    mappings = []
+    for i, item_id in enumerate(ids):
+        fringes = {k: columns[k][i] for k in FRINGE_COMPONENTS + ("total_fringes",)}
+        if fringes == {k: old_fringes[i].get(k) for k in fringes}:
+            continue
+        mappings.append({"id": item_id, "total": totals[i], "fringes_json": json.dumps(fringes)})
+    if not mappings:
+        return 0
+
+    session.bulk_update_mappings(LineItem, mappings)
+    changed = {m["id"] for m in mappings}
+    changed_groupings = {g for item_id, g in zip(ids, grouping_ids) if item_id in changed}
+    refresh_grouping_rollups(session, changed_groupings)
+    sync_phase_costs(session, changed)
+    bump_grouping_budget_versions(session, changed_groupings)
+    return len(mappings)
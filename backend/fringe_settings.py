@@ -0,0 +1,110 @@
+"""
+Fringe Settings
+Global defaults (fringe_settings.json) and per-project overrides (ProjectFringeSettings
+table), held in an in-process cache. Writes go through this module and invalidate the
+affected entries, so costing never reads the file or the table on a cache hit.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+from sqlmodel import Session
+
+from models import ProjectFringeSettings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRINGE_SETTINGS_FILE = os.path.join(BASE_DIR, "fringe_settings.json")
+
+class FringeSettings(BaseModel):
+    superannuation: float = 11.5
+    holiday_pay: float = 4.0
+    payroll_tax: float = 4.85
+    workers_comp: float = 1.5
+    contingency: float = 10.0
+
+class FringeOverrides(BaseModel):
+    """Sparse per-project settings; a None field inherits the global default."""
+    superannuation: Optional[float] = None
+    holiday_pay: Optional[float] = None
+    payroll_tax: Optional[float] = None
+    workers_comp: Optional[float] = None
+    contingency: Optional[float] = None
+
+_lock = threading.Lock()
+_global: Optional[FringeSettings] = None
+_projects: Dict[str, FringeSettings] = {}
+
+def _read_file() -> FringeSettings:
+    if os.path.exists(FRINGE_SETTINGS_FILE):
+        try:
+            with open(FRINGE_SETTINGS_FILE, 'r') as f:
+                return FringeSettings(**json.load(f))
+        except Exception as e:
+            print(f"Error reading fringe settings: {e}")
+    return FringeSettings()
+
+def get_global_fringe_settings() -> FringeSettings:
+    global _global
+    settings = _global
+    if settings is None:
+        settings = _read_file()
+        with _lock:
+            _global = settings
+    return settings
+
+def save_global_fringe_settings(settings: FringeSettings):
+    global _global
+    with open(FRINGE_SETTINGS_FILE, 'w') as f:
+        json.dump(settings.model_dump(), f, indent=4)
+    with _lock:
+        # Every project inherits from the globals
+        _global = settings
+        _projects.clear()
+
+def get_project_overrides(session: Session, project_id: str) -> FringeOverrides:
+    row = session.get(ProjectFringeSettings, project_id)
+    if not row:
+        return FringeOverrides()
+    return FringeOverrides(**{k: getattr(row, k) for k in FringeOverrides.model_fields})
+
+def get_fringe_settings(session: Optional[Session] = None, project_id: Optional[str] = None) -> FringeSettings:
+    """Effective settings for a project (its overrides on top of the globals), or the globals."""
+    if not project_id or session is None:
+        return get_global_fringe_settings()
+    settings = _projects.get(project_id)
+    if settings is None:
+        overrides = get_project_overrides(session, project_id).model_dump(exclude_none=True)
+        settings = get_global_fringe_settings().model_copy(update=overrides)
+        with _lock:
+            _projects[project_id] = settings
+    return settings
+
+def save_project_overrides(session: Session, project_id: str, overrides: FringeOverrides) -> FringeSettings:
+    """Replace a project's overrides (all-None removes them). Commits. Returns the effective settings."""
+    row = session.get(ProjectFringeSettings, project_id)
+    values = overrides.model_dump()
+    if all(v is None for v in values.values()):
+        if row:
+            session.delete(row)
+    else:
+        row = row or ProjectFringeSettings(project_id=project_id)
+        for k, v in values.items():
+            setattr(row, k, v)
+        row.updated_at = datetime.utcnow()
+        session.add(row)
+    session.commit()
+    invalidate_project(project_id)
+    return get_fringe_settings(session, project_id)
+
+def invalidate_project(project_id: str):
+    with _lock:
+        _projects.pop(project_id, None)
+
+def clear_fringe_cache():
+    global _global
+    with _lock:
+        _global = None
+        _projects.clear()
@@ -0,0 +1,169 @@
+"""
+Holiday Rules
+Offline, rule-based public holiday generator for any year.
+
+A state is a list of HolidayRule. Each rule gives the holiday's date in a year
+(a fixed date, the nth weekday of a month, or an offset from Easter Sunday) and
+how it is observed when it falls on a weekend:
+  - "none":       no change (e.g. Anzac Day in NSW)
+  - "move":       the holiday moves to the following Monday (e.g. Australia Day)
+  - "additional": the weekend day stays a holiday and the next weekday that isn't
+                  already a holiday is added (e.g. Christmas / Boxing Day)
+Generated years are stored as bitsets (bit n = day n of the year) for O(1) lookups.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous computus, Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+@dataclass(frozen=True)
+class HolidayRule:
+    name: str
+    month: int = 0
+    day: int = 0
+    weekday: Optional[int] = None # 0=Monday, for "nth weekday of month" rules
+    nth: int = 1
+    easter_offset: Optional[int] = None
+    weekend: str = "none" # none | move | additional
+
+    def date_in(self, year: int) -> date:
+        if self.easter_offset is not None:
+            return easter_sunday(year) + timedelta(days=self.easter_offset)
+        if self.weekday is not None:
+            first = date(year, self.month, 1)
+            return first + timedelta(days=(self.weekday - first.weekday()) % 7 + 7 * (self.nth - 1))
+        return date(year, self.month, self.day)
+
+def fixed(name: str, month: int, day: int, weekend: str = "none") -> HolidayRule:
+    return HolidayRule(name=name, month=month, day=day, weekend=weekend)
+
+def nth_weekday(name: str, month: int, weekday: int, nth: int) -> HolidayRule:
+    return HolidayRule(name=name, month=month, weekday=weekday, nth=nth)
+
+def easter(name: str, offset: int) -> HolidayRule:
+    return HolidayRule(name=name, easter_offset=offset)
+
+MONDAY = 0
+
+# Public Holidays Act 2010 (NSW), plus the Bank Holiday listed in the data.gov.au feed
+NSW_RULES = [
+    fixed("New Year's Day", 1, 1, weekend="additional"),
+    fixed("Australia Day", 1, 26, weekend="move"),
+    easter("Good Friday", -2),
+    easter("Easter Saturday", -1),
+    easter("Easter Sunday", 0),
+    easter("Easter Monday", 1),
+    fixed("Anzac Day", 4, 25),
+    nth_weekday("King's Birthday", 6, MONDAY, 2),
+    nth_weekday("Bank Holiday", 8, MONDAY, 1),
+    nth_weekday("Labour Day", 10, MONDAY, 1),
+    fixed("Christmas Day", 12, 25, weekend="additional"),
+    fixed("Boxing Day", 12, 26, weekend="additional"),
+]
+
+# Add other states here as they're needed
+STATE_RULES: Dict[str, List[HolidayRule]] = {
+    "NSW": NSW_RULES,
+}
+
+def generate_holidays(year: int, rules: List[HolidayRule]) -> List[Tuple[date, str]]:
+    """(date, name) of every holiday in a year, sorted by date."""
+    holidays: Dict[date, str] = {}
+    additional = []
+    for rule in rules:
+        day = rule.date_in(year)
+        is_weekend = day.weekday() >= 5
+        if is_weekend and rule.weekend == "move":
+            day += timedelta(days=7 - day.weekday())
+        holidays.setdefault(day, rule.name)
+        if is_weekend and rule.weekend == "additional":
+            additional.append((day, rule.name))
+
+    # Substitute days go to the next free weekday, in date order
+    # (Christmas Sat + Boxing Sun -> Mon 27 + Tue 28)
+    for day, name in sorted(additional):
+        substitute = day + timedelta(days=1)
+        while substitute.weekday() >= 5 or substitute in holidays:
+            substitute += timedelta(days=1)
+        holidays[substitute] = f"{name} (additional day)"
+
+    return sorted(holidays.items())
+
+class HolidayCalendar:
+    """Generated holidays of one state, stored as per-year bitsets plus a date->name map."""
+
+    def __init__(self, state: str = "NSW", years: Iterable[int] = ()):
+        self.state = state.upper()
+        self.rules = STATE_RULES[self.state]
+        self._bitsets: Dict[int, int] = {}
+        self._names: Dict[date, str] = {}
+        self._lock = threading.Lock()
+        for year in years:
+            self._year_bitset(year)
+
+    def _year_bitset(self, year: int) -> int:
+        bitset = self._bitsets.get(year)
+        if bitset is None:
+            holidays = generate_holidays(year, self.rules)
+            jan1 = date(year, 1, 1).toordinal()
+            bitset = 0
+            for day, _ in holidays:
+                bitset |= 1 << (day.toordinal() - jan1)
+            with self._lock:
+                self._names.update(holidays)
+                self._bitsets[year] = bitset
+        return bitset
+
+    def is_holiday(self, check_date: date) -> bool:
+        day_of_year = check_date.toordinal() - date(check_date.year, 1, 1).toordinal()
+        return bool(self._year_bitset(check_date.year) >> day_of_year & 1)
+
+    def holiday_name(self, check_date: date) -> Optional[str]:
+        if not self.is_holiday(check_date):
+            return None
+        return self._names.get(check_date)
+
+    def holidays_in_year(self, year: int) -> List[Tuple[date, str]]:
+        bitset = self._year_bitset(year)
+        jan1 = date(year, 1, 1)
+        result = []
+        while bitset:
+            low = bitset & -bitset
+            day = jan1 + timedelta(days=low.bit_length() - 1)
+            result.append((day, self._names[day]))
+            bitset ^= low
+        return result
+
+    def holidays_in_range(self, start_date: date, end_date: date) -> List[Tuple[date, str]]:
+        return [
+            (day, name)
+            for year in range(start_date.year, end_date.year + 1)
+            for day, name in self.holidays_in_year(year)
+            if start_date <= day <= end_date
+        ]
+
+# Years generated up front when a calendar is created
+PRECOMPUTE_YEARS = range(date.today().year - 10, date.today().year + 21)
+
+_calendars: Dict[str, HolidayCalendar] = {}
+
+def get_holiday_calendar(state: str = "NSW") -> HolidayCalendar:
+    """Get or create the singleton generated calendar for a state"""
+    state = state.upper()
+    if state not in _calendars:
+        _calendars[state] = HolidayCalendar(state, PRECOMPUTE_YEARS)
+    return _calendars[state]
@@ -1,12 +1,61 @@
 """
 NSW Public Holiday Service
-Fetches and caches NSW public holidays from data.gov.au API
+Holidays are generated offline from holiday_rules for any year. The official
+data.gov.au list (cached in nsw_holidays_cache.json) overrides the years it covers;
+fetching it from the API is opt-in via HOLIDAY_API_ENABLED=1 and, apart from an
+explicit force_refresh, happens in a background thread so lookups never wait on it.
 """
 import requests
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 import json
 import os
+import tempfile
+import threading
+
+from holiday_rules import PRECOMPUTE_YEARS, get_holiday_calendar
+
+HOLIDAY_API_ENABLED = os.environ.get("HOLIDAY_API_ENABLED", "0").lower() in ("1", "true", "yes")
+
+# Formats seen in the "Date" field of the data.gov.au records
+DATE_FORMATS = ("%Y-%m-%d", "%Y%%m%d", "%Y%m%d")
+
+def parse_holiday_date(date_str: str) -> Optional[date]:
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except (ValueError, TypeError):
+            continue
+    return None
+
+@dataclass
+class HolidayIndex:
+    """Holidays indexed by date, plus sorted ordinals for range queries with bisect."""
+    names: Dict[date, str] = field(default_factory=dict)
+    ordinals: List[int] = field(default_factory=list)
+    holidays: List[Dict] = field(default_factory=list) # aligned with ordinals, each has "date_obj"
+    years: Set[int] = field(default_factory=set)
+    source_mtime: Optional[float] = None
+    valid_until: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def build(cls, holidays: List[Dict], source_mtime: Optional[float], valid_until: datetime) -> "HolidayIndex":
+        by_date: Dict[date, Dict] = {}
+        for holiday in holidays:
+            holiday_date = parse_holiday_date(holiday.get("date"))
+            if holiday_date and holiday_date not in by_date:
+                by_date[holiday_date] = {**holiday, "date_obj": holiday_date}
+        ordered = sorted(by_date)
+        return cls(
+            names={d: by_date[d].get("name") for d in ordered},
+            ordinals=[d.toordinal() for d in ordered],
+            holidays=[by_date[d] for d in ordered],
+            years={d.year for d in ordered},
+            source_mtime=source_mtime,
+            valid_until=valid_until
+        )
 
 class NSWHolidayService:
     """Service for fetching NSW public holidays"""
@@ -15,12 +64,19 @@ class NSWHolidayService:
     RESOURCE_ID = "33673aca-0857-42e5-b8f0-9981b4755686"
     CACHE_FILE = "nsw_holidays_cache.json"
     CACHE_DURATION_DAYS = 30
+    # How long stale data is served before the API is tried again
+    RETRY_INTERVAL = timedelta(hours=1)
     
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, use_network: Optional[bool] = None):
         self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
         self.cache_path = os.path.join(self.base_dir, self.CACHE_FILE)
+        self.use_network = HOLIDAY_API_ENABLED if use_network is None else use_network
+        self.calendar = get_holiday_calendar("NSW")
+        self._index: Optional[HolidayIndex] = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
     
-    def _load_cache(self) -> Optional[Dict]:
+    def _load_cache(self, allow_expired: bool = False) -> Optional[Dict]:
         """Load cached holiday data if valid"""
         try:
             if not os.path.exists(self.cache_path):
@@ -31,7 +87,7 @@ class NSWHolidayService:
             
             # Check if cache is expired
             cached_date = datetime.fromisoformat(cache_data.get('cached_at', ''))
-            if datetime.now() - cached_date > timedelta(days=self.CACHE_DURATION_DAYS):
+            if not allow_expired and datetime.now() - cached_date > timedelta(days=self.CACHE_DURATION_DAYS):
                 return None
             
             return cache_data
@@ -39,16 +95,21 @@ class NSWHolidayService:
             return None
     
     def _save_cache(self, holidays: List[Dict]) -> None:
-        """Save holiday data to cache"""
+        """Save holiday data to cache. Written to a temp file and renamed, so readers never see a partial file"""
+        tmp_path = None
         try:
             cache_data = {
                 'cached_at': datetime.now().isoformat(),
                 'holidays': holidays
             }
-            with open(self.cache_path, 'w') as f:
+            fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, prefix=".nsw_holidays_", suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
                 json.dump(cache_data, f)
+            os.replace(tmp_path, self.cache_path)
         except Exception as e:
             print(f"Warning: Failed to cache holidays: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def _fetch_from_api(self) -> List[Dict]:
         """Fetch holidays from data.gov.au API"""
@@ -84,46 +145,104 @@ class NSWHolidayService:
         """
         Get all NSW public holidays
         """
-        holidays = []
-        if not force_refresh:
-            cache_data = self._load_cache()
-            if cache_data:
-                holidays = cache_data.get('holidays', [])
-        
-        # If no cache or force refresh, fetch from API
-        if not holidays:
-            holidays = self._fetch_from_api()
-            if holidays:
-                self._save_cache(holidays)
-        
-        # Merge with hardcoded 2026 fallback (since API stops at 2025)
-        fallback_2026 = [
-            {"date": "2026-01-01", "name": "New Year's Day", "jurisdiction": "nsw"},
-            {"date": "2026-01-26", "name": "Australia Day", "jurisdiction": "nsw"},
-            {"date": "2026-04-03", "name": "Good Friday", "jurisdiction": "nsw"},
-            {"date": "2026-04-04", "name": "Day after Good Friday", "jurisdiction": "nsw"},
-            {"date": "2026-04-05", "name": "Easter Sunday", "jurisdiction": "nsw"},
-            {"date": "2026-04-06", "name": "Easter Monday", "jurisdiction": "nsw"},
-            {"date": "2026-04-25", "name": "Anzac Day", "jurisdiction": "nsw"},
-            {"date": "2026-06-08", "name": "King's Birthday", "jurisdiction": "nsw"},
-            {"date": "2026-08-03", "name": "Bank Holiday", "jurisdiction": "nsw"},
-            {"date": "2026-10-05", "name": "Labour Day", "jurisdiction": "nsw"},
-            {"date": "2026-12-25", "name": "Christmas Day", "jurisdiction": "nsw"},
-            {"date": "2026-12-26", "name": "Boxing Day", "jurisdiction": "nsw"},
-            {"date": "2026-12-28", "name": "Boxing Day (Observed)", "jurisdiction": "nsw"},
-        ]
+        return self._load_holidays(force_refresh)[0]
+    
+    def _load_holidays(self, force_refresh: bool = False) -> Tuple[List[Dict], datetime]:
+        """
+        All holidays, and until when they can be used without checking the cache/API again.
+        Generated holidays fill every year the official list doesn't cover.
+        Only force_refresh fetches inline; an expired or missing cache is served as-is
+        while a background refresh runs (stale-while-revalidate).
+        """
+        official = []
+        valid_until = datetime.max
+        # Offline, the cache file is used however old it is and only its mtime matters
+        cache_data = self._load_cache(allow_expired=True)
+        if cache_data:
+            official = cache_data.get('holidays', [])
         
-        # Check if we already have 2026 in API (just in case they updated it)
-        api_has_2026 = any("2026" in h["date"] for h in holidays)
-        if not api_has_2026:
-            # Only add holidays that aren't already there (matching by date)
-            existing_dates = {h["date"] for h in holidays}
-            for fallback in fallback_2026:
-                if fallback["date"] not in existing_dates:
-                    holidays.append(fallback)
+        if self.use_network:
+            expires_at = None
+            if official:
+                expires_at = datetime.fromisoformat(cache_data['cached_at']) + timedelta(days=self.CACHE_DURATION_DAYS)
+            
+            if force_refresh:
+                fetched = self._fetch_from_api()
+                if fetched:
+                    self._save_cache(fetched)
+                    official = fetched
+                    expires_at = datetime.now() + timedelta(days=self.CACHE_DURATION_DAYS)
+            
+            if expires_at and datetime.now() < expires_at:
+                valid_until = expires_at
+            else:
+                self._refresh_in_background()
+                valid_until = datetime.now() + self.RETRY_INTERVAL
         
+        return self._merge_generated(official), valid_until
+    
+    def _refresh_in_background(self) -> None:
+        """Start a refresh from the API unless one is already running"""
+        with self._refresh_lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh, name="holiday-refresh", daemon=True)
+            self._refresh_thread.start()
+    
+    def _refresh(self) -> None:
+        holidays = self._fetch_from_api()
+        if not holidays:
+            # Keep serving what we have; the index is re-checked after RETRY_INTERVAL
+            return
+        self._save_cache(holidays)
+        # Swap in the new index; the mtime matches the file just written, so it isn't re-read
+        self._index = HolidayIndex.build(
+            self._merge_generated(holidays),
+            self._cache_mtime(),
+            datetime.now() + timedelta(days=self.CACHE_DURATION_DAYS)
+        )
+    
+    def _merge_generated(self, official: List[Dict]) -> List[Dict]:
+        """Official holidays plus generated ones for every precomputed year they don't cover"""
+        official_years = {d.year for d in (parse_holiday_date(h.get("date")) for h in official) if d}
+        holidays = list(official)
+        for year in PRECOMPUTE_YEARS:
+            if year not in official_years:
+                holidays.extend(self._generated(day, name) for day, name in self.calendar.holidays_in_year(year))
         return holidays
     
+    @staticmethod
+    def _generated(day: date, name: str) -> Dict:
+        return {"date": day.isoformat(), "name": name, "jurisdiction": "nsw"}
+    
+    def _cache_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.cache_path)
+        except OSError:
+            return None
+    
+    def _get_index(self, force_refresh: bool = False) -> HolidayIndex:
+        """
+        The in-memory holiday index. Rebuilt only when the cache file's mtime changes,
+        the cached data expires, or a refresh is forced.
+        """
+        index = self._index
+        if (
+            force_refresh
+            or index is None
+            or index.source_mtime != self._cache_mtime()
+            or datetime.now() >= index.valid_until
+        ):
+            stale = index
+            holidays, valid_until = self._load_holidays(force_refresh)
+            # Read mtime after loading, so a cache file written by the load isn't re-read
+            index = HolidayIndex.build(holidays, self._cache_mtime(), valid_until)
+            if self._index is not stale:
+                # A background refresh swapped in fresher data while we were loading
+                return self._index
+            self._index = index
+        return index
+    
     def get_holidays_in_range(
         self, 
         start_date: date, 
@@ -141,33 +260,22 @@ class NSWHolidayService:
         Returns:
             List of holidays in the date range, sorted by date
         """
-        all_holidays = self.get_all_holidays(force_refresh=force_refresh)
+        index = self._get_index(force_refresh)
+        lo = bisect_left(index.ordinals, start_date.toordinal())
+        hi = bisect_right(index.ordinals, end_date.toordinal())
+        holidays = [dict(holiday) for holiday in index.holidays[lo:hi]]
         
-        filtered = []
-        for holiday in all_holidays:
-            try:
-                date_str = holiday["date"]
-                # Try multiple formats
-                holiday_date = None
-                for fmt in ("%Y-%m-%d", "%Y%%m%d", "%Y%m%d"):
-                    try:
-                        holiday_date = datetime.strptime(date_str, fmt).date()
-                        break
-                    except ValueError:
-                        continue
-                
-                if holiday_date and start_date <= holiday_date <= end_date:
-                    filtered.append({
-                        **holiday,
-                        "date_obj": holiday_date
-                    })
-            except (ValueError, KeyError, TypeError):
-                continue
-        
-        # Sort by date
-        filtered.sort(key=lambda h: h["date_obj"])
-        
-        return filtered
+        # Years outside the index come straight from the rules
+        extra_years = [y for y in range(start_date.year, end_date.year + 1) if y not in index.years]
+        if extra_years:
+            for year in extra_years:
+                holidays.extend(
+                    {**self._generated(day, name), "date_obj": day}
+                    for day, name in self.calendar.holidays_in_year(year)
+                    if start_date <= day <= end_date
+                )
+            holidays.sort(key=lambda h: h["date_obj"])
+        return holidays
     
     def is_holiday(self, check_date: date, force_refresh: bool = False) -> bool:
         """
@@ -180,12 +288,10 @@ class NSWHolidayService:
         Returns:
             True if the date is a public holiday
         """
-        holidays = self.get_holidays_in_range(
-            check_date, 
-            check_date, 
-            force_refresh=force_refresh
-        )
-        return len(holidays) > 0
+        index = self._get_index(force_refresh)
+        if check_date.year not in index.years:
+            return self.calendar.is_holiday(check_date)
+        return check_date in index.names
     
     def get_holiday_name(self, check_date: date) -> Optional[str]:
         """
@@ -197,10 +303,10 @@ class NSWHolidayService:
         Returns:
             Holiday name if it exists, None otherwise
         """
-        holidays = self.get_holidays_in_range(check_date, check_date)
-        if holidays:
-            return holidays[0]["name"]
-        return None
+        index = self._get_index()
+        if check_date.year not in index.years:
+            return self.calendar.holiday_name(check_date)
+        return index.names.get(check_date)
 
 
 # Singleton instance
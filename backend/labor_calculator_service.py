@@ -1,7 +1,10 @@
-from typing import Dict, Optional, List, Any
-from datetime import datetime, date, timedelta
-from sqlmodel import Session, select
-from models import ProductionCalendar, CalendarDay, BudgetGrouping
+from collections import Counter
+from typing import Dict, Optional, List, Any, Sequence, Set, Tuple
+import numpy as np
+from datetime import date, timedelta
+from sqlmodel import Session
+from models import BudgetGrouping
+from calendar_cache import apply_phase_overrides, get_grouping_calendar
 from rate_lookup_service import get_rate_service
 from holiday_service import get_holiday_service
 from pydantic import BaseModel
@@ -20,76 +23,52 @@ class LaborCostRequest(BaseModel):
     
     # Optional overrides
     award_classification_id: Optional[str] = None
+    
+    # "daily" = price every date and return per-day details
+    # "histogram" = bucket each phase's dates into day classes and price each class once
+    costing_mode: str = "daily"
 
 class LaborCostResponse(BaseModel):
     total_cost: float
     breakdown: Dict[str, Any]
     fringes: Dict[str, float]
+    # Set when this request couldn't be costed (e.g. malformed phase_details); the rest of the batch still is
+    error: Optional[str] = None
 
-def calculate_labor_cost(session: Session, req: LaborCostRequest, fringe_settings: Any) -> LaborCostResponse:
-    rate_service = get_rate_service()
-    holiday_service = get_holiday_service()
-    
-    # 1. Resolve Calendar Configuration (Hierarchy: Line Item > Group > Global)
-    
-    # Base: Defaults
-    effective_calendar = {
-        "preProd": {"defaultHours": 8.0, "dates": []},
-        "shoot": {"defaultHours": 10.0, "dates": []},
-        "postProd": {"defaultHours": 8.0, "dates": []}
-    }
-    
-    # Step A: Load Global Calendar Settings (Foundation)
-    calendars = session.exec(select(ProductionCalendar).where(ProductionCalendar.project_id == req.project_id)).all()
-    global_map = {"PRE_PROD": "preProd", "SHOOT": "shoot", "POST_PROD": "postProd"}
-    
-    for cal in calendars:
-        phase_key = global_map.get(cal.phase, cal.phase.lower())
-        if phase_key in effective_calendar:
-            effective_calendar[phase_key]["defaultHours"] = cal.default_hours
-            days = session.exec(select(CalendarDay).where(CalendarDay.calendar_id == cal.id)).all()
-            effective_calendar[phase_key]["dates"] = [d.date.isoformat() for d in days]
-
-    # Step B: Apply Grouping Overrides (Middle Tier)
+def failed_response(error: str) -> LaborCostResponse:
+    return LaborCostResponse(total_cost=0.0, breakdown={}, fringes={}, error=error)
+
+def resolve_effective_calendar(session: Session, req: LaborCostRequest) -> Dict[str, Dict[str, Any]]:
+    """
+    Resolve the calendar a line item works to (Hierarchy: Line Item > Group > Global).
+    Returns {phase_key: {"defaultHours": float, "dates": [sorted date objects]}}.
+    The Global and Group tiers come from the calendar cache.
+    """
+    # Step A + B: Global Calendar Settings with Grouping Overrides (cached per calendar version)
+    grouping_overrides = None
     if req.grouping_id:
         grouping = session.get(BudgetGrouping, req.grouping_id)
         if grouping and grouping.calendar_overrides:
-            overrides = grouping.calendar_overrides
-            for phase in effective_calendar:
-                if phase in overrides:
-                     ov = overrides[phase]
-                     # If Group has explicitly disabled inheritance for this phase, it takes precedence over Global
-                     if ov.get("inherit") == False:
-                         if "defaultHours" in ov:
-                             effective_calendar[phase]["defaultHours"] = float(ov["defaultHours"])
-                         if "dates" in ov:
-                             effective_calendar[phase]["dates"] = ov["dates"]
+            grouping_overrides = grouping.calendar_overrides
+    calendar = get_grouping_calendar(session, req.project_id, grouping_overrides)
     
     # Step C: Apply Line Item Overrides (Top Tier)
     # We check phase_details provided in the request (passed from UI or stored in LineItem.phase_details)
-    item_overrides = req.phase_details
-    
-    if item_overrides:
-        for phase in effective_calendar:
-            if phase in item_overrides:
-                ov = item_overrides[phase]
-                # If Line Item has explicitly disabled inheritance for this phase, it wins over both Group and Global
-                if ov.get("inherit") == False:
-                    if "defaultHours" in ov:
-                        effective_calendar[phase]["defaultHours"] = float(ov["defaultHours"])
-                    if "dates" in ov:
-                        effective_calendar[phase]["dates"] = ov["dates"]
+    # If Line Item has explicitly disabled inheritance for a phase, it wins over both Group and Global
+    calendar = apply_phase_overrides(calendar, req.phase_details)
     
-    # Special case: If explicitly set to "custom" mode, we should ensure we are using the item_overrides
-    # the above loop already handles this if inherit:false is set in the phase_details.
+    effective_calendar = {
+        phase: {"defaultHours": hours, "dates": list(dates)}
+        for phase, (hours, dates) in calendar.items()
+    }
     
     # helper to generate dates
-    def generate_weekdays(start_date: date, count: int) -> List[str]:
+    def generate_weekdays(start_date: date, count: int) -> List[date]:
         dates = []
         current = start_date
         while len(dates) < count:
             if current.weekday() < 5: # Mon-Fri
-                dates.append(current.isoformat())
+                dates.append(current)
             current += timedelta(days=1)
         return dates
     
@@ -110,109 +89,211 @@ def calculate_labor_cost(session: Session, req: LaborCostRequest, fringe_setting
         post_start = shoot_start + timedelta(days=28) # 20 working days is ~4 weeks
         effective_calendar["postProd"]["dates"] = generate_weekdays(post_start, 10)
 
-    # 2. Calculate Costs per Phase
-    breakdown = {}
-    total_gross = 0.0
-    
-    for phase_key, config in effective_calendar.items():
-        phase_total = 0.0
-        details_list = []
-        days_count = 0
-        
-        hours = config["defaultHours"]
-        date_strings = config["dates"]
-        
-        active_dates = []
-        for d_str in date_strings:
-            try:
-                # Handle ISO string with/without Z
-                d_obj = datetime.fromisoformat(d_str.replace('Z', '')).date()
-                active_dates.append(d_obj)
-            except ValueError:
-                continue
-                
-        # Sort dates
-        active_dates.sort()
-        
-        for d_obj in active_dates:
-            days_count += 1
-            
-            # Determine Day Type
-            weekday = d_obj.weekday() # 0=Mon, 6=Sun
-            day_type = 'WEEKDAY'
-            if weekday == 5: day_type = 'SATURDAY'
-            elif weekday == 6: day_type = 'SUNDAY'
-            
-            # Check Holiday
-            is_holiday = False
-            holidays = holiday_service.get_holidays_in_range(d_obj, d_obj)
-            if holidays:
-                is_holiday = True
-                
-            # Calculate Day Cost
-            cost_res = rate_service.calculate_day_cost(
-                classification="Manual", # We use overrides
-                hours=hours,
-                day_type=day_type,
-                is_holiday=is_holiday,
-                override_base_rate=req.base_hourly_rate,
-                override_is_casual=req.is_casual,
-                override_section_name="Category E" if req.is_artist else "Crew"
-            )
-            
-            day_cost = cost_res["day_cost"]
-            phase_total += day_cost
-            
-            details_list.append({
-                "date": d_obj.isoformat(),
-                "day_type": day_type,
-                "is_holiday": is_holiday,
-                "hours": hours,
-                "base_cost": cost_res.get("base_hourly", 0) * hours, # Approx
-                "total_day_cost": day_cost,
-                "multiplier": 1.0 
-            })
-            
-        total_gross += phase_total
-        breakdown[phase_key] = {
-            "days": days_count,
-            "cost": round(phase_total, 2),
-            "details": details_list
-        }
-
-    # 3. Calculate Fringes
+    return effective_calendar
+
+def _day_type(d_obj: date) -> str:
+    weekday = d_obj.weekday() # 0=Mon, 6=Sun
+    if weekday == 5: return 'SATURDAY'
+    if weekday == 6: return 'SUNDAY'
+    return 'WEEKDAY'
+
+FRINGE_COMPONENTS = ("super", "holiday_pay", "payroll_tax", "workers_comp")
+
+def calculate_fringes_batch(total_gross: Sequence[float], is_casual: Sequence[bool], fringe_settings: Any) -> Dict[str, np.ndarray]:
+    """
+    Fringes for many gross amounts in one vectorized pass. Fringes are linear in gross:
+    super, holiday pay (not for casuals), payroll tax and workers comp.
+    """
     # "apply fringes from settings (Super, Holiday Pay , Payroll Tax, Workers Comp)"
+    gross = np.asarray(total_gross, dtype=float)
+    casual = np.asarray(is_casual, dtype=bool)
     
-    super_amt = total_gross * (fringe_settings.superannuation / 100.0)
-    
-    holiday_pay_amt = 0.0
-    if not req.is_casual:
-        holiday_pay_amt = total_gross * (fringe_settings.holiday_pay / 100.0)
-        
-    payroll_tax_amt = total_gross * (fringe_settings.payroll_tax / 100.0)
-    workers_comp_amt = total_gross * (fringe_settings.workers_comp / 100.0)
-    
-    total_fringes = super_amt + holiday_pay_amt + payroll_tax_amt + workers_comp_amt
+    amounts = {
+        "super": gross * (fringe_settings.superannuation / 100.0),
+        "holiday_pay": np.where(casual, 0.0, gross * (fringe_settings.holiday_pay / 100.0)),
+        "payroll_tax": gross * (fringe_settings.payroll_tax / 100.0),
+        "workers_comp": gross * (fringe_settings.workers_comp / 100.0)
+    }
     
     # To ensure visual consistency in UI (sum of components = total),
     # we round components first then sum them.
-    super_rounded = round(super_amt, 2)
-    holiday_pay_rounded = round(holiday_pay_amt, 2)
-    payroll_tax_rounded = round(payroll_tax_amt, 2)
-    workers_comp_rounded = round(workers_comp_amt, 2)
+    fringes = {k: np.round(v, 2) for k, v in amounts.items()}
+    fringes["total_fringes"] = np.round(sum(fringes[k] for k in FRINGE_COMPONENTS), 2)
+    return fringes
+
+def _calculate_fringes(total_gross: float, is_casual: bool, fringe_settings: Any) -> Dict[str, float]:
+    fringes = calculate_fringes_batch([total_gross], [is_casual], fringe_settings)
+    return {k: float(v[0]) for k, v in fringes.items()}
+
+# Resolved calendar of one request: {phase_key: (hours, sorted dates)}
+ResolvedPhases = Dict[str, Tuple[float, List[date]]]
+
+def resolve_costing_inputs(
+    session: Session, reqs: List[LaborCostRequest]
+) -> Tuple[List[Optional[ResolvedPhases]], Set[date], Dict[int, str]]:
+    """
+    Everything costing needs from the database: each request's effective calendar,
+    plus the holiday dates covering every worked day (one holiday lookup for the batch).
+    A request whose calendar can't be resolved gets None and its error under its index.
+    """
+    holiday_service = get_holiday_service()
     
-    total_fringes_rounded = round(super_rounded + holiday_pay_rounded + payroll_tax_rounded + workers_comp_rounded, 2)
+    # 1. Resolve calendars: per request {phase_key: (hours, sorted dates)}
+    resolved: List[Optional[ResolvedPhases]] = []
+    errors: Dict[int, str] = {}
+    min_date = max_date = None
+    for req_idx, req in enumerate(reqs):
+        try:
+            effective_calendar = resolve_effective_calendar(session, req)
+            phases = {
+                phase_key: (config["defaultHours"], config["dates"])
+                for phase_key, config in effective_calendar.items()
+            }
+        except Exception as e:
+            errors[req_idx] = f"Could not resolve calendar: {e}"
+            resolved.append(None)
+            continue
+        for hours, active_dates in phases.values():
+            if active_dates:
+                min_date = active_dates[0] if min_date is None else min(min_date, active_dates[0])
+                max_date = active_dates[-1] if max_date is None else max(max_date, active_dates[-1])
+        resolved.append(phases)
     
-    fringes = {
-        "super": super_rounded,
-        "holiday_pay": holiday_pay_rounded,
-        "payroll_tax": payroll_tax_rounded,
-        "workers_comp": workers_comp_rounded,
-        "total_fringes": total_fringes_rounded
-    }
+    # One holiday lookup covering every worked day in the batch
+    holiday_dates = set()
+    if min_date is not None:
+        holidays = holiday_service.get_holidays_in_range(min_date, max_date)
+        holiday_dates = {h["date_obj"] for h in holidays}
+    return resolved, holiday_dates, errors
+
+def merge_costed(
+    count: int, costed_idx: List[int], costed: List[LaborCostResponse], errors: Dict[int, str]
+) -> List[LaborCostResponse]:
+    """Responses in request order: costed ones at `costed_idx`, failed_response for the rest."""
+    responses: List[Optional[LaborCostResponse]] = [None] * count
+    for idx, res in zip(costed_idx, costed):
+        responses[idx] = res
+    return [res if res is not None else failed_response(errors.get(idx, "Not costed")) for idx, res in enumerate(responses)]
 
-    return LaborCostResponse(
-        total_cost=round(total_gross, 2),
-        breakdown=breakdown,
-        fringes=fringes
-    )
+def cost_resolved_requests(
+    reqs: List[LaborCostRequest],
+    resolved: List[ResolvedPhases],
+    holiday_dates: Set[date],
+    fringe_settings: Any
+) -> List[LaborCostResponse]:
+    """
+    Cost requests whose calendars are already resolved. Pure CPU, no database access,
+    so it can run in a worker process (see parallel_recalc).
+    """
+    rate_service = get_rate_service()
+    
+    # 2. Build pricing rows: (request index, hours, day_type, is_holiday, day count)
+    rows = []
+    for req_idx, (req, phases) in enumerate(zip(reqs, resolved)):
+        for phase_key, (hours, active_dates) in phases.items():
+            if req.costing_mode == "histogram":
+                day_classes = Counter((_day_type(d), d in holiday_dates) for d in active_dates)
+                for (day_type, is_holiday), count in day_classes.items():
+                    rows.append((req_idx, hours, day_type, is_holiday, count))
+            else:
+                for d_obj in active_dates:
+                    rows.append((req_idx, hours, _day_type(d_obj), d_obj in holiday_dates, 1))
+    
+    # 3. Price every row in one kernel call
+    day_costs = rate_service.calculate_day_costs_batch(
+        hours=[row[1] for row in rows],
+        day_types=[row[2] for row in rows],
+        is_holiday=[row[3] for row in rows],
+        is_casual=[reqs[row[0]].is_casual for row in rows],
+        is_artist=[reqs[row[0]].is_artist for row in rows],
+        base_rates=[reqs[row[0]].base_hourly_rate for row in rows]
+    ).tolist()
+    
+    # 4. Re-assemble per request / per phase breakdowns (rows are grouped by request then phase)
+    responses = []
+    cursor = 0
+    for req, phases in zip(reqs, resolved):
+        breakdown = {}
+        total_gross = 0.0
+        
+        for phase_key, (hours, active_dates) in phases.items():
+            phase_total = 0.0
+            
+            if req.costing_mode == "histogram":
+                class_list = []
+                days_priced = 0
+                while days_priced < len(active_dates):
+                    _, _, day_type, is_holiday, count = rows[cursor]
+                    day_cost = day_costs[cursor]
+                    phase_total += day_cost * count
+                    class_list.append({
+                        "day_type": day_type,
+                        "is_holiday": is_holiday,
+                        "hours": hours,
+                        "days": count,
+                        "day_cost": day_cost,
+                        "total_cost": round(day_cost * count, 2)
+                    })
+                    days_priced += count
+                    cursor += 1
+                phase_entry = {"day_classes": class_list}
+            else:
+                details_list = []
+                for d_obj in active_dates:
+                    day_cost = day_costs[cursor]
+                    phase_total += day_cost
+                    
+                    details_list.append({
+                        "date": d_obj.isoformat(),
+                        "day_type": rows[cursor][2],
+                        "is_holiday": rows[cursor][3],
+                        "hours": hours,
+                        "base_cost": req.base_hourly_rate * hours, # Approx
+                        "total_day_cost": day_cost,
+                        "multiplier": 1.0 
+                    })
+                    cursor += 1
+                phase_entry = {"details": details_list}
+                
+            total_gross += phase_total
+            breakdown[phase_key] = {
+                "days": len(active_dates),
+                "cost": round(phase_total, 2),
+                **phase_entry
+            }
+
+        # 5. Calculate Fringes
+        responses.append(LaborCostResponse(
+            total_cost=round(total_gross, 2),
+            breakdown=breakdown,
+            fringes=_calculate_fringes(total_gross, req.is_casual, fringe_settings)
+        ))
+
+    return responses
+
+def calculate_labor_costs_batch(
+    session: Session,
+    reqs: List[LaborCostRequest],
+    fringe_settings: Any
+) -> List[LaborCostResponse]:
+    """
+    Cost many line items at once.
+
+    Every priced row of every request is flattened into one set of arrays and priced
+    by a single RateLookupService.calculate_day_costs_batch call, so a bulk recalc
+    costs one kernel invocation instead of one scalar call per day per item.
+    A row is a single date ("daily" mode) or a whole day class of a phase
+    ("histogram" mode), whose cost is multiplied by the number of days in it.
+    A request that fails to resolve comes back as a response with `error` set;
+    only the requests that resolved are costed.
+    """
+    resolved, holiday_dates, errors = resolve_costing_inputs(session, reqs)
+    ok = [i for i, phases in enumerate(resolved) if phases is not None]
+    costed = cost_resolved_requests([reqs[i] for i in ok], [resolved[i] for i in ok], holiday_dates, fringe_settings)
+    return merge_costed(len(reqs), ok, costed, errors)
+
+def calculate_labor_cost(session: Session, req: LaborCostRequest, fringe_settings: Any) -> LaborCostResponse:
+    res = calculate_labor_costs_batch(session, [req], fringe_settings)[0]
+    if res.error:
+        raise ValueError(res.error)
+    return res
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
+from award_rules import compile_bands
+
 @dataclass
 class Allowance:
     """
@@ -68,44 +70,15 @@ def calculate_complex_rate(
     
     effective_base = config.base_rate * (1 + config.casual_loading_percent / 100.0)
     
-    total_pay = 0.0
-    
     # 2. Calculate Base vs OT Pay
-    # Sort thresholds just in case
-    sorted_thresholds = sorted(config.ot_thresholds, key=lambda x: x[0])
-    
-    # We need to slice the hours into chunks.
+    # Thresholds are compiled (sorted once, cached) into a cumulative piecewise-linear
+    # function: standard time at 1.0x up to the first threshold, then each multiplier.
     # Example: 12 hours total. Thresholds: [(8, 1.5), (10, 2.0)]
     # 0-8  : 1.0x
     # 8-10 : 1.5x
     # 10-12: 2.0x
-    
-    current_hour_cursor = 0.0
-    remaining_hours = hours
-    
-    # We usually implicitly start with a 0 threshold for 1.0x? No, standard is up to first threshold.
-    # Let's build a set of intervals.
-    
-    previous_threshold = 0.0
-    previous_multiplier = 1.0
-    
-    for threshold_hours, multiplier in sorted_thresholds:
-        if hours <= previous_threshold:
-            break
-            
-        # Hours in this band
-        band_hours = min(hours, threshold_hours) - previous_threshold
-        band_hours = max(0, band_hours) # Safety
-        
-        total_pay += band_hours * effective_base * previous_multiplier
-        
-        previous_threshold = threshold_hours
-        previous_multiplier = multiplier
-        
-    # Handle remaining hours above the last threshold (or if no thresholds)
-    if hours > previous_threshold:
-        band_hours = hours - previous_threshold
-        total_pay += band_hours * effective_base * previous_multiplier
+    bands = compile_bands(((0.0, 1.0),) + tuple((float(t), float(m)) for t, m in config.ot_thresholds))
+    total_pay = bands.units(hours) * effective_base
 
     # 3. Add Allowances
     for allow in allowances:
@@ -1,10 +1,9 @@
 import os
 import json
 import shutil
-import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
-from fastapi import FastAPI, Depends, HTTPException, Body
+from fastapi import FastAPI, Depends, HTTPException, Body, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import Session, select, func
 from contextlib import asynccontextmanager
@@ -13,21 +12,39 @@ from database import create_db_and_tables, get_session
 from models import (
     Project, Budget, BudgetCategory, BudgetGrouping, LineItem, ProjectPhase,
     BudgetCategoryBase, BudgetGroupingBase, LineItemBase,
-    ProductionCalendar, CalendarDay, LaborSchedule, ScheduleDay, RoleHistory
+    ProductionCalendar, CalendarDay, LaborSchedule, ScheduleDay
 )
 from labor_engine import calculate_complex_rate, LaborConfig, Allowance
 from holiday_service import get_holiday_service
+from holiday_rules import get_holiday_calendar
 from rate_lookup_service import get_rate_service
+from calendar_cache import bump_calendar_version, get_project_calendar
+from recalc_engine import PHASES, changed_phases
+from role_search import find_roles
+from budget_tree import load_budget_tree
+from breakdown_codec import compact_breakdown_json, expand_breakdown_days
+from fringe_settings import (
+    FringeOverrides, FringeSettings, get_fringe_settings, get_global_fringe_settings,
+    get_project_overrides, save_global_fringe_settings, save_project_overrides
+)
+from fringe_recalc import fringe_rates_changed
+from phase_costs import clear_phase_costs, project_phase_matrix, sync_phase_costs
+from budget_summary import calculate_budget_summary, empty_summary
+from budget_rollup import ensure_project_rollups, project_category_rollups, refresh_grouping_rollups
+from budget_save import BudgetOp, VersionConflict, apply_budget_ops, bump_grouping_budget_versions, save_budget_tree
+from recalc_jobs import create_job, get_job, run_recalc_job
+from parallel_recalc import RECALC_WORKERS
 
 # --- Configuration & Paths ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RATES_FILE = os.path.join(BASE_DIR, "rates.json")
-FRINGE_SETTINGS_FILE = os.path.join(BASE_DIR, "fringe_settings.json")
 
 # --- Lifecycle ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    # Precompute generated holiday bitsets
+    get_holiday_calendar()
     yield
 
 app = FastAPI(lifespan=lifespan)
@@ -38,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Budget-Version", "X-Budget-Id"],
 )
 
 
@@ -61,13 +79,6 @@ class ShiftInput(BaseModel):
     type: str = "Standard" # Standard, Saturday, Sunday, PublicHoliday
     count: int = 1
 
-class FringeSettings(BaseModel):
-    superannuation: float = 11.5
-    holiday_pay: float = 4.0
-    payroll_tax: float = 4.85
-    workers_comp: float = 1.5
-    contingency: float = 10.0
-
 class CatalogItem(BaseModel):
     description: str
     default_rate: float
@@ -179,56 +190,6 @@ def calculate_weekly_labor_rate(req: LaborCalcRequest) -> float:
     weekly_gross += weekly_extras
     return weekly_gross
 
-def update_role_history(session: Session, role_name: str, base_rate: float, unit: str, project_id: str):
-    """
-    Update or create RoleHistory entry for auto-learning.
-    """
-    if not role_name: 
-        return
-        
-    # Search for existing
-    role = session.exec(select(RoleHistory).where(RoleHistory.role_name == role_name)).first()
-    
-    if role:
-        # Update
-        role.base_rate = base_rate
-        role.unit = unit
-        role.last_used_at = datetime.utcnow()
-        role.usage_count += 1
-        role.project_id = project_id # Update recent project context
-        session.add(role)
-    else:
-        # Create
-        new_role = RoleHistory(
-            role_name=role_name,
-            base_rate=base_rate,
-            unit=unit,
-            project_id=project_id,
-            usage_count=1
-        )
-        session.add(new_role)
-
-def load_fringe_settings() -> FringeSettings:
-    defaults = {
-        "superannuation": 11.5,
-        "holiday_pay": 4.0,
-        "payroll_tax": 4.85,
-        "workers_comp": 1.5,
-        "contingency": 10.0
-    }
-    if os.path.exists(FRINGE_SETTINGS_FILE):
-        try:
-            with open(FRINGE_SETTINGS_FILE, 'r') as f:
-                data = json.load(f)
-                return FringeSettings(**{**defaults, **data})
-        except Exception:
-            pass
-    return FringeSettings(**defaults)
-
-def save_fringe_settings(settings: FringeSettings):
-    with open(FRINGE_SETTINGS_FILE, 'w') as f:
-        json.dump(settings.model_dump(), f, indent=4)
-
 # --- API Endpoints ---
 
 @app.get("/api/projects")
@@ -245,6 +206,7 @@ def get_projects(session: Session = Depends(get_session)):
         default_b = Budget(name="v1.0", project_id=default_p.id)
         session.add(default_b)
         session.commit()
+        session.refresh(default_p)
         return [default_p]
         
     return projects
@@ -369,17 +331,24 @@ class ProductionCalendarInput(BaseModel):
 def create_or_update_production_calendar(
     project_id: str,
     calendar_data: ProductionCalendarInput,
+    background_tasks: BackgroundTasks,
+    full_recalc: bool = False,
     session: Session = Depends(get_session)
 ):
     """
     Create or update production calendar for a project.
     Auto-detects NSW public holidays.
+    Only line items that read a changed phase are recalculated, unless full_recalc is set.
+    Recalculation runs as a background job; poll GET /api/jobs/{job_id} for progress.
     """
     # Verify project exists
     project = session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    # Snapshot the resolved calendar so we can tell which phases changed
+    old_calendar = get_project_calendar(session, project_id)
+    
     # Delete existing calendar for this project
     existing_calendars = session.exec(
         select(ProductionCalendar).where(ProductionCalendar.project_id == project_id)
@@ -460,132 +429,64 @@ def create_or_update_production_calendar(
                 continue
     
     session.commit()
+    # Cached resolved calendars for this project are now stale
+    bump_calendar_version(project_id)
     
-    # --- Bulk Recalculate Labor Costs ---
-    try:
-        # Find all LineItems linked to this project via Budget -> Category -> Grouping (Slow but correct)
-        # Or simplistic assumption: if we have project_id, we can find items if we join tables.
-        # But our LineItem doesn't store project_id directly, it stores grouping_id.
-        # However, calculate_labor_cost requires project_id.
-        # So we can iterate all budgets for this project?
-        
-        budgets = session.exec(select(Budget).where(Budget.project_id == project_id)).all()
-        fringe_settings = load_fringe_settings()
-        
-        count_updated = 0
-        
-        for budget in budgets:
-            cats = session.exec(select(BudgetCategory).where(BudgetCategory.budget_id == budget.id)).all()
-            for cat in cats:
-                # Artist detection: Category E is specifically Artists per pay_rules_reference.md
-                is_artist_category = cat.code == "E"
-                
-                grps = session.exec(select(BudgetGrouping).where(BudgetGrouping.category_id == cat.id)).all()
-                for grp in grps:
-                    items = session.exec(select(LineItem).where(LineItem.grouping_id == grp.id)).all()
-                    for item in items:
-                        # 1. Handle Labor Items (Full Recalculation)
-                        if item.is_labor:
-                            # Re-construct Request with hierarchical awareness
-                            hourly_rate = item.base_hourly_rate
-                            if not hourly_rate or hourly_rate == 0:
-                                hourly_rate = item.rate
-
-                            req = LaborCostRequest(
-                                line_item_id=item.id,
-                                base_hourly_rate=hourly_rate,
-                                is_casual=item.is_casual,
-                                is_artist=is_artist_category, 
-                                calendar_mode=item.calendar_mode or "inherit",
-                                project_id=project_id,
-                                grouping_id=grp.id,
-                                phase_details=item.phase_details or {}
-                            )
-                            
-                            try:
-                                res = calculate_labor_cost(session, req, fringe_settings)
-                                
-                                # Update Item
-                                item.total = res.total_cost + res.fringes.get("total_fringes", 0)
-                                item.breakdown_json = json.dumps(res.breakdown)
-                                item.fringes_json = json.dumps(res.fringes)
-                                
-                                # Update quantities for display
-                                if 'preProd' in res.breakdown: item.prep_qty = float(res.breakdown['preProd']['days'])
-                                if 'shoot' in res.breakdown: item.shoot_qty = float(res.breakdown['shoot']['days'])
-                                if 'postProd' in res.breakdown: item.post_qty = float(res.breakdown['postProd']['days'])
-                                item.quantity = item.prep_qty + item.shoot_qty + item.post_qty
-                                
-                                session.add(item)
-                                count_updated += 1
-                            except Exception as e:
-                                print(f"Failed to auto-recalc labor item {item.id}: {e}")
-                                continue
-                                
-                        # 2. Handle Material Items (Quantity Sync)
-                        elif item.unit in ["day", "week"]:
-                            # Material lines also need to sync quantities if they depend on calendar
-                            # We can use a simplified version of calendar resolution or just reuse calculate_labor_cost 
-                            # but that's overkill. Let's just pull the effective calendar dates.
-                            
-                            # For MVP, we'll use the LaborCostRequest/Service just to get the corrected day counts
-                            # but ignore the cost output.
-                            req = LaborCostRequest(
-                                line_item_id=item.id,
-                                base_hourly_rate=0,
-                                is_casual=False,
-                                is_artist=False,
-                                calendar_mode=item.calendar_mode or "inherit",
-                                project_id=project_id,
-                                grouping_id=grp.id,
-                                phase_details=item.phase_details or {}
-                            )
-                            
-                            try:
-                                res = calculate_labor_cost(session, req, fringe_settings)
-                                
-                                # Extract days
-                                pre_days = float(res.breakdown.get('preProd', {}).get('days', 0))
-                                shoot_days = float(res.breakdown.get('shoot', {}).get('days', 0))
-                                post_days = float(res.breakdown.get('postProd', {}).get('days', 0))
-                                
-                                item.prep_qty = pre_days
-                                item.shoot_qty = shoot_days
-                                item.post_qty = post_days
-                                
-                                # Construct Breakdown for Material (Unified Structure)
-                                # We store preProd/shoot/postProd to match backend standard
-                                mat_breakdown = {
-                                    "preProd": {"days": pre_days, "cost": pre_days * item.rate},
-                                    "shoot": {"days": shoot_days, "cost": shoot_days * item.rate},
-                                    "postProd": {"days": post_days, "cost": post_days * item.rate}
-                                }
-                                item.breakdown_json = json.dumps(mat_breakdown)
-                                
-                                # Recalculate Total
-                                if item.unit == "day":
-                                    item.quantity = item.prep_qty + item.shoot_qty + item.post_qty
-                                    item.total = item.rate * item.quantity
-                                elif item.unit == "week":
-                                    # Use pro-rata weeks based on days_per_week (default 5)
-                                    days_per_week = item.days_per_week if item.days_per_week > 0 else 5.0
-                                    item.quantity = (item.prep_qty + item.shoot_qty + item.post_qty) / days_per_week
-                                    item.total = item.rate * item.quantity
-                                
-                                session.add(item)
-                                count_updated += 1
-                            except Exception as e:
-                                print(f"Failed to sync material item {item.id}: {e}")
-                                continue
+    # --- Incremental Recalculation of Labor & Material Costs ---
+    # Runs after the response as a background job that commits in chunks
+    new_calendar = get_project_calendar(session, project_id)
+    phases_changed = changed_phases(old_calendar, new_calendar)
+    job = create_job(project_id, phases_changed, workers=RECALC_WORKERS)
+    background_tasks.add_task(
+        run_recalc_job, job.id, session.get_bind(), get_fringe_settings(session, project_id), full_recalc
+    )
 
-        session.commit()
-        print(f"Bulk Recalculation Complete: Updated {count_updated} items.")
-        
-    except Exception as e:
-        print(f"Error during bulk recalculation: {e}")
-        # Don't fail the request, just log it.
+    return {
+        "status": "success",
+        "message": "Production calendar updated, budget recalculation queued",
+        "job_id": job.id
+    }
+
+def queue_fringe_job(background_tasks: BackgroundTasks, session: Session, project_id: str):
+    """Re-apply the project's effective fringe percentages after the response, as a recalc job."""
+    job = create_job(project_id, mode="fringes")
+    background_tasks.add_task(run_recalc_job, job.id, session.get_bind(), get_fringe_settings(session, project_id))
+    return job
 
-    return {"status": "success", "message": "Production calendar updated and budget recalculated"}
+@app.post("/api/projects/{project_id}/recalculate")
+def recalculate_project(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    workers: int = RECALC_WORKERS,
+    mode: str = "full",
+    session: Session = Depends(get_session)
+):
+    """
+    Recalculate every calendar-driven line item of a project (all budgets) as a background job.
+    `workers` > 1 shards the costing across that many processes.
+    mode="fringes" only re-applies the current fringe percentages to stored gross.
+    """
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if mode == "fringes":
+        job = queue_fringe_job(background_tasks, session, project_id)
+        return {"status": "success", "message": "Fringe re-application queued", "job_id": job.id}
+    if mode != "full":
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'fringes'")
+
+    job = create_job(project_id, PHASES, workers=max(1, min(workers, os.cpu_count() or 1)))
+    background_tasks.add_task(run_recalc_job, job.id, session.get_bind(), get_fringe_settings(session, project_id), True)
+    return {"status": "success", "message": "Budget recalculation queued", "job_id": job.id}
+
+@app.get("/api/jobs/{job_id}")
+def get_recalc_job(job_id: str):
+    """Status and progress counts of a background recalculation job."""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @app.get("/api/holidays")
 def get_holidays(year: Optional[int] = None, state: str = "NSW"):
@@ -687,7 +588,7 @@ def get_production_calendar(
     }
 
 # --- Labor & Material Calculation Integration ---
-from labor_calculator_service import calculate_labor_cost, LaborCostRequest, LaborCostResponse
+from labor_calculator_service import calculate_labor_cost, calculate_labor_costs_batch, LaborCostRequest, LaborCostResponse
 
 @app.post("/api/calculate-labor-cost", response_model=LaborCostResponse)
 def calculate_labor_cost_endpoint(
@@ -697,7 +598,7 @@ def calculate_labor_cost_endpoint(
     """
     Calculate labor cost with full calendar integration and pay rules.
     """
-    fringe_settings = load_fringe_settings()
+    fringe_settings = get_fringe_settings(session, req.project_id)
     
     # Delegate to service
     try:
@@ -708,6 +609,33 @@ def calculate_labor_cost_endpoint(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/projects/{project_id}/calculate-labor-cost/batch", response_model=List[LaborCostResponse])
+def calculate_labor_cost_batch_endpoint(
+    project_id: str,
+    reqs: List[LaborCostRequest],
+    session: Session = Depends(get_session)
+):
+    """
+    Calculate labor cost for many line items of one project in a single call.
+    Calendar, grouping overrides, holidays and fringe settings are resolved once for the batch.
+    Responses are returned in request order.
+    """
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    fringe_settings = get_fringe_settings(session, project_id)
+    
+    # Every request in the batch is costed against the project in the path
+    reqs = [r if r.project_id == project_id else r.model_copy(update={"project_id": project_id}) for r in reqs]
+    
+    try:
+        return calculate_labor_costs_batch(session, reqs, fringe_settings)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 class ScheduleCostRequest(BaseModel):
     classification: str
     assignedDays: List[str]  # ISO date strings
@@ -833,55 +761,27 @@ def get_project_summary(project_id: str, session: Session = Depends(get_session)
     """
     Get financial summary for the project including department and phase breakdowns.
     """
-    # 1. Fetch all budgets for project
-    budgets = session.exec(select(Budget).where(Budget.project_id == project_id)).all()
+    # 1. Per-category totals from the materialized rollups (built lazily where missing)
+    if ensure_project_rollups(session, project_id):
+        session.commit()
     
     total_cost = 0.0
     # Map name -> { total: float, id: str }
     dept_map = {} 
     phase_map = { "Pre-Production": 0.0, "Shoot": 0.0, "Post-Production": 0.0, "Other": 0.0 }
     
-    for budget in budgets:
-        # Fetch categories
-        cats = session.exec(select(BudgetCategory).where(BudgetCategory.budget_id == budget.id)).all()
-        for cat in cats:
-            cat_total = 0.0
-            
-            # Fetch groupings
-            grps = session.exec(select(BudgetGrouping).where(BudgetGrouping.category_id == cat.id)).all()
-            for grp in grps:
-                # Fetch items
-                items = session.exec(select(LineItem).where(LineItem.grouping_id == grp.id)).all()
-                for item in items:
-                    item_total = item.total or 0.0
-                    cat_total += item_total
-                    
-                    # Phase Breakdown
-                    if item.breakdown_json:
-                        try:
-                            bk = json.loads(item.breakdown_json)
-                            # Standard keys: preProd, shoot, postProd
-                            if "preProd" in bk: phase_map["Pre-Production"] += float(bk["preProd"].get("cost", 0) or 0)
-                            if "shoot" in bk: phase_map["Shoot"] += float(bk["shoot"].get("cost", 0) or 0)
-                            if "postProd" in bk: phase_map["Post-Production"] += float(bk["postProd"].get("cost", 0) or 0)
-                            # Handle leftovers?
-                        except:
-                            phase_map["Other"] += item_total
-                    else:
-                        phase_map["Other"] += item_total
-
-            # Aggregate by name, but capture ID. 
-            # If multiple categories have same name (e.g. across versions), we keep the first/last ID encountered.
-            current = dept_map.get(cat.name, { "total": 0.0, "id": cat.id })
-            current["total"] += cat_total
-            # Update ID if not set (though we default above) or maybe prefer the one with data?
-            # For now, just keeping the ID of the category as we iterate is sufficient for linking.
-            # Ideally we want the ID from the "latest" budget or similar, but this works for single-budget projects.
-            if not current.get("id"):
-                current["id"] = cat.id
-                
-            dept_map[cat.name] = current
-            total_cost += cat_total
+    for cat_id, cat_name, cat_total, pre_prod, shoot, post_prod, other in project_category_rollups(session, project_id):
+        phase_map["Pre-Production"] += pre_prod
+        phase_map["Shoot"] += shoot
+        phase_map["Post-Production"] += post_prod
+        phase_map["Other"] += other
+
+        # Aggregate by name, but capture ID. 
+        # If multiple categories have same name (e.g. across versions), we keep the first ID encountered.
+        current = dept_map.get(cat_name, { "total": 0.0, "id": cat_id })
+        current["total"] += cat_total
+        dept_map[cat_name] = current
+        total_cost += cat_total
 
     # Cleanup format
     depts = []
@@ -910,6 +810,26 @@ def get_project_summary(project_id: str, session: Session = Depends(get_session)
         phase_breakdown=phases
     )
 
+class PhaseCostCell(BaseModel):
+    department: str
+    phase: str
+    days: float
+    gross: float
+    fringes: float
+
+@app.get("/api/projects/{project_id}/phase-costs", response_model=List[PhaseCostCell])
+def get_project_phase_costs(project_id: str, session: Session = Depends(get_session)):
+    """
+    Department x phase matrix of costed line items (gross and apportioned fringes),
+    aggregated in SQL from the normalized phase cost rows.
+    """
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return [
+        PhaseCostCell(department=dept, phase=phase, days=days, gross=gross, fringes=fringes)
+        for dept, phase, days, gross, fringes in project_phase_matrix(session, project_id)
+    ]
+
 @app.get("/api/rates/search")
 def search_rates(q: str, limit: int = 20):
     """
@@ -923,41 +843,20 @@ def search_rates(q: str, limit: int = 20):
     return rate_service.search_classifications(q, limit)
 
 def _build_budget_response(session: Session, budget_id: str):
-    cats = session.exec(select(BudgetCategory).where(BudgetCategory.budget_id == budget_id).order_by(BudgetCategory.sort_order)).all()
-    
-    result = []
-    for cat in cats:
-        cat_dict = cat.model_dump()
-        
-        grps = session.exec(select(BudgetGrouping).where(BudgetGrouping.category_id == cat.id)).all()
-        cat_dict['groupings'] = []
-        
-        total_cat = 0
-        for grp in grps:
-            grp_dict = grp.model_dump()
-            items = session.exec(select(LineItem).where(LineItem.grouping_id == grp.id)).all()
-            grp_dict['items'] = [i.model_dump() for i in items]
-            
-            sub_total = sum(i.total for i in items)
-            grp_dict['sub_total'] = sub_total
-            total_cat += sub_total
-            cat_dict['groupings'].append(grp_dict)
-            
-        cat_dict['total'] = total_cat
-        result.append(cat_dict)
-        
-    return result
+    return load_budget_tree(session, budget_id)
 
 @app.get("/api/budgets/{budget_id}")
-def get_budget(budget_id: str, session: Session = Depends(get_session)):
+def get_budget(budget_id: str, response: Response, session: Session = Depends(get_session)):
     budget = session.get(Budget, budget_id)
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
     
+    # Version the client must send back with delta saves
+    response.headers["X-Budget-Version"] = str(budget.version)
     return _build_budget_response(session, budget_id)
 
 @app.get("/api/projects/{project_id}/budget")
-def get_project_budget(project_id: str, session: Session = Depends(get_session)):
+def get_project_budget(project_id: str, response: Response, session: Session = Depends(get_session)):
     # Find budget for project (assuming single budget for now)
     budget = session.exec(select(Budget).where(Budget.project_id == project_id)).first()
     if not budget:
@@ -994,6 +893,8 @@ def get_project_budget(project_id: str, session: Session = Depends(get_session))
                 session.add(BudgetGrouping(code="B.1", name="Producers", category_id=c.id))
         session.commit()
 
+    response.headers["X-Budget-Version"] = str(budget.version)
+    response.headers["X-Budget-Id"] = budget.id
     return _build_budget_response(session, budget.id)
 
 class BudgetGroupingUpdate(BaseModel):
@@ -1012,6 +913,7 @@ def update_grouping(grouping_id: str, updates: BudgetGroupingUpdate, session: Se
         grp.calendar_overrides = updates.calendar_overrides
         
     session.add(grp)
+    bump_grouping_budget_versions(session, [grp.id])
     session.commit()
     session.refresh(grp)
     return grp
@@ -1026,130 +928,16 @@ class BudgetSaveRequest(BaseModel):
 def save_budget(req: BudgetSaveRequest, session: Session = Depends(get_session)):
     """
     Save the full budget tree with explicit handling for deletions.
+    Only new and changed rows are written (see budget_save).
     """
     try:
-        # 1. Process Deletions First
-        if req.deleted_item_ids:
-            for item_id in req.deleted_item_ids:
-                item = session.get(LineItem, item_id)
-                if item:
-                    session.delete(item)
-        
-        if req.deleted_grouping_ids:
-            for grp_id in req.deleted_grouping_ids:
-                grp = session.get(BudgetGrouping, grp_id)
-                if grp:
-                    session.delete(grp)
-                    
-        if req.deleted_category_ids:
-            for cat_id in req.deleted_category_ids:
-                cat = session.get(BudgetCategory, cat_id)
-                if cat:
-                    session.delete(cat)
-                    
-        # Flush deletions
-        session.flush()
-
-        # 2. Process Upserts (Updates & Inserts)
-        for cat_data in req.categories:
-            # Update Category
-            db_cat = None
-            cat_id = cat_data.get("id")
-            if cat_id:
-                db_cat = session.get(BudgetCategory, cat_id)
-                if db_cat:
-                    db_cat.name = cat_data.get("name", db_cat.name)
-                # If passed an ID that doesn't exist, we skip or handle? 
-                # For now assume sync is correct or it was a deletion.
-                if db_cat:
-                    session.add(db_cat)
-            
-            # Update Groupings
-            for grp_data in cat_data.get("groupings", []):
-                db_grp = None
-                grp_id = grp_data.get("id")
-                if grp_id:
-                    db_grp = session.get(BudgetGrouping, grp_id)
-                    if db_grp:
-                        db_grp.name = grp_data.get("name", db_grp.name)
-                        # Persist valid overrides if present
-                        if "calendar_overrides" in grp_data:
-                            db_grp.calendar_overrides = grp_data["calendar_overrides"]
-                    if db_grp:
-                        session.add(db_grp)
-                
-                # Update Items
-                for item_data in grp_data.get("items", []):
-                    item_id = item_data.get("id")
-                    
-                    db_item = None
-                    if item_id:
-                        db_item = session.get(LineItem, item_id)
-                    
-                    # If not found, Create New
-                    if not db_item and grp_id and db_grp: # Ensure we have a parent grouping
-                        # If item_id is missing/empty, generate new
-                        new_id = item_id if item_id else str(uuid.uuid4())
-                        db_item = LineItem(id=new_id, grouping_id=grp_id)
-                        session.add(db_item)
-
-                    if db_item:
-                        # Update fields
-                        db_item.description = item_data.get("description", db_item.description)
-                        db_item.rate = float(item_data.get("rate", 0))
-                        db_item.quantity = (float(item_data.get("prep_qty", 0)) + 
-                                          float(item_data.get("shoot_qty", 0)) + 
-                                          float(item_data.get("post_qty", 0)))
-                        db_item.total = float(item_data.get("total", 0))
-                        db_item.is_labor = bool(item_data.get("is_labor", False))
-                        db_item.notes = item_data.get("notes", None)
-                        
-                        # Persist Quantities
-                        db_item.prep_qty = float(item_data.get("prep_qty", 0))
-                        db_item.shoot_qty = float(item_data.get("shoot_qty", 0))
-                        db_item.post_qty = float(item_data.get("post_qty", 0))
-                        
-                        # Labor specific
-                        db_item.base_hourly_rate = float(item_data.get("base_hourly_rate", 0))
-                        db_item.daily_hours = float(item_data.get("daily_hours", 0))
-                        db_item.days_per_week = float(item_data.get("days_per_week", 0))
-                        db_item.is_casual = bool(item_data.get("is_casual", False))
-                        
-                        # V2 New Fields Persistence
-                        db_item.calendar_mode = item_data.get("calendar_mode", "inherit")
-                        db_item.phase_details = item_data.get("phase_details", {})
-                        db_item.labor_phases_json = item_data.get("labor_phases_json", "[]") # Expect string from FE
-                        db_item.award_classification_id = item_data.get("award_classification_id")
-                        db_item.role_history_id = item_data.get("role_history_id")
-                        
-                        # Fix for Unit Reset Issue
-                        db_item.unit = item_data.get("unit", db_item.unit or "day")
-                        
-                        # Persist Calculation Details
-                        db_item.breakdown_json = item_data.get("breakdown_json", None)
-                        db_item.fringes_json = item_data.get("fringes_json", None)
-                        
-                        # Handle json lists safe retrieval
-                        if "allowances" in item_data and isinstance(item_data["allowances"], list):
-                             db_item.allowances_json = json.dumps(item_data["allowances"])
-                        else:
-                             db_item.allowances_json = item_data.get("allowances_json", "[]")
-
-                        session.add(db_item)
-                        
-                        # Labor V2: Learn Role History
-                        if db_item.is_labor and db_item.description:
-                            try:
-                                update_role_history(
-                                    session, 
-                                    db_item.description, 
-                                    db_item.base_hourly_rate if db_item.base_hourly_rate > 0 else db_item.rate,
-                                    db_item.unit,
-                                    db_item.grouping.category.budget.project_id if db_item.grouping and db_item.grouping.category and db_item.grouping.category.budget else "unknown"
-                                )
-                            except:
-                                pass # Don't block save on history update failure
-        
+        save_budget_tree(
+            session,
+            req.categories,
+            req.deleted_item_ids,
+            req.deleted_grouping_ids,
+            req.deleted_category_ids
+        )
         session.commit()
     except Exception as e:
         import traceback
@@ -1157,6 +945,35 @@ def save_budget(req: BudgetSaveRequest, session: Session = Depends(get_session))
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "ok"}
 
+class BudgetOpsRequest(BaseModel):
+    version: int
+    ops: List[BudgetOp]
+
+@app.post("/api/budgets/{budget_id}/ops")
+def save_budget_ops(budget_id: str, req: BudgetOpsRequest, session: Session = Depends(get_session)):
+    """
+    Delta save: apply only the listed operations, if the budget is still at `version`.
+    Returns the new version; a stale version gets a 409 with the current one.
+    """
+    try:
+        result = apply_budget_ops(session, budget_id, req.version, req.ops)
+        session.commit()
+    except LookupError:
+        session.rollback()
+        raise HTTPException(status_code=404, detail="Budget not found")
+    except VersionConflict as e:
+        session.rollback()
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current_version})
+    except ValueError as e:
+        session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        session.rollback()
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "ok", **result}
+
 @app.post("/api/budget/items")
 def add_line_item(item: LineItemBase, session: Session = Depends(get_session)):
     # Create new item
@@ -1177,8 +994,12 @@ def add_line_item(item: LineItemBase, session: Session = Depends(get_session)):
             db_item.total = db_item.rate * db_item.quantity
     else:
         db_item.total = db_item.rate * db_item.quantity
+    db_item.breakdown_json = compact_breakdown_json(db_item.breakdown_json)
     
     session.add(db_item)
+    refresh_grouping_rollups(session, [db_item.grouping_id])
+    sync_phase_costs(session, [db_item.id])
+    bump_grouping_budget_versions(session, [db_item.grouping_id])
     session.commit()
     session.refresh(db_item)
     return db_item
@@ -1188,16 +1009,33 @@ def delete_line_item(item_id: str, session: Session = Depends(get_session)):
     item = session.get(LineItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    clear_phase_costs(session, [item.id])
     session.delete(item)
+    refresh_grouping_rollups(session, [item.grouping_id])
+    bump_grouping_budget_versions(session, [item.grouping_id])
     session.commit()
     return {"status": "deleted"}
 
+@app.get("/api/line-items/{item_id}/breakdown/days")
+def get_line_item_breakdown_days(item_id: str, session: Session = Depends(get_session)):
+    """
+    Day-level breakdown of one item, expanded from its compact stored form.
+    Budget payloads only carry phase totals.
+    """
+    breakdown_json = session.exec(select(LineItem.breakdown_json).where(LineItem.id == item_id)).first()
+    if breakdown_json is None and not session.get(LineItem, item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
+    try:
+        return expand_breakdown_days(breakdown_json)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Unreadable breakdown: {e}")
+
 @app.post("/api/calculate-labor")
 def calculate_labor(req: LaborCalcRequest):
     weekly_rate = calculate_weekly_labor_rate(req)
     
     # Calculate Fringes
-    settings = load_fringe_settings()
+    settings = get_global_fringe_settings()
     
     # Simple logic: Fringes on top of Gross Weekly
     # Note: In reality, some fringes might apply to Base only, but sticking to Gross for MVP efficiency
@@ -1216,13 +1054,58 @@ def calculate_labor(req: LaborCalcRequest):
 
 @app.get("/api/settings")
 def get_settings():
-    return load_fringe_settings()
+    return get_global_fringe_settings()
 
 @app.post("/api/settings")
-def update_settings_endpoint(settings: FringeSettings = Body(...)):
-    save_fringe_settings(settings)
+def update_settings_endpoint(
+    background_tasks: BackgroundTasks,
+    settings: FringeSettings = Body(...),
+    session: Session = Depends(get_session)
+):
+    """
+    Global fringe defaults. Projects inherit every percentage they don't override.
+    Stored fringes follow the new percentages through one background fringe job per project.
+    """
+    previous = get_global_fringe_settings()
+    save_global_fringe_settings(settings)
+    
+    if fringe_rates_changed(previous, settings):
+        for project_id in session.exec(select(Project.id)).all():
+            queue_fringe_job(background_tasks, session, project_id)
     return settings
 
+class ProjectSettingsResponse(BaseModel):
+    settings: FringeSettings # Effective values
+    overrides: FringeOverrides
+    job_id: Optional[str] = None # Fringe job queued when the effective percentages changed
+
+@app.get("/api/projects/{project_id}/settings", response_model=ProjectSettingsResponse)
+def get_project_settings(project_id: str, session: Session = Depends(get_session)):
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return ProjectSettingsResponse(
+        settings=get_fringe_settings(session, project_id),
+        overrides=get_project_overrides(session, project_id)
+    )
+
+@app.put("/api/projects/{project_id}/settings", response_model=ProjectSettingsResponse)
+def update_project_settings(
+    project_id: str,
+    overrides: FringeOverrides,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session)
+):
+    """Replace the project's fringe overrides (null fields inherit the global defaults)."""
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    previous = get_fringe_settings(session, project_id)
+    settings = save_project_overrides(session, project_id, overrides)
+    
+    job_id = None
+    if fringe_rates_changed(previous, settings):
+        job_id = queue_fringe_job(background_tasks, session, project_id).id
+    return ProjectSettingsResponse(settings=settings, overrides=overrides, job_id=job_id)
+
 # Removed duplicate search_rates
 
 
@@ -1255,53 +1138,24 @@ def get_catalog(session: Session = Depends(get_session)):
 @app.get("/api/roles/search")
 def search_roles(q: str, limit: int = 10, session: Session = Depends(get_session)):
     """
-    Fuzzy search RoleHistory for auto-complete.
-    Priority: Higher usage count + Recent usage
+    Full-text search RoleHistory for auto-complete (see role_search).
+    Priority: Text relevance + Higher usage count + Recent usage
     """
     if not q:
         return []
-        
-    roles = session.exec(
-        select(RoleHistory)
-        .where(RoleHistory.role_name.ilike(f"%{q}%"))
-        .order_by(RoleHistory.usage_count.desc(), RoleHistory.last_used_at.desc())
-        .limit(limit)
-    ).all()
     
-    return roles
-
-def _calculate_budget_summary(session: Session, budget_id: str):
-    # Calculate simple summary
-    items = session.exec(select(LineItem).join(BudgetGrouping).join(BudgetCategory).where(BudgetCategory.budget_id == budget_id)).all()
-    
-    total = sum(i.total for i in items)
-    # Placeholder for sophisticated calc logic
-    return {
-        "grand_total": total,
-        "atl_total": 0, # Need to filter by Category Code "A", "B"
-        "btl_total": total,
-        "fringes_total": 0,
-        "contingency_total": 0,
-        "fringe_breakdown": {}
-    }
+    return find_roles(session, q, limit)
 
 @app.get("/api/summary/{budget_id}")
 def get_summary(budget_id: str, session: Session = Depends(get_session)):
-    return _calculate_budget_summary(session, budget_id)
+    return calculate_budget_summary(session, budget_id)
 
 @app.get("/api/summary")
 def get_default_summary(session: Session = Depends(get_session)):
-    budget = session.exec(select(Budget)).first()
-    if not budget:
-        return {
-            "grand_total": 0,
-            "atl_total": 0,
-            "btl_total": 0,
-            "fringes_total": 0,
-            "contingency_total": 0,
-            "fringe_breakdown": {}
-        }
-    return _calculate_budget_summary(session, budget.id)
+    budget_id = session.exec(select(Budget.id)).first()
+    if not budget_id:
+        return empty_summary()
+    return calculate_budget_summary(session, budget_id)
 
 if __name__ == "__main__":
     import uvicorn
@@ -16,7 +16,7 @@ class ProjectBase(SQLModel):
 
 class ProjectPhase(SQLModel, table=True):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    project_id: str = Field(foreign_key="project.id")
+    project_id: str = Field(foreign_key="project.id", index=True)
     name: str # e.g. "Main Block", "Pre-Prod"
     type: str # PREP, SHOOT, POST
     start_date: datetime
@@ -33,7 +33,8 @@ class BudgetBase(SQLModel):
     name: str
     status: str = "DRAFT" # DRAFT, APPROVED, LOCKED
     total_amount: float = 0.0
-    project_id: Optional[str] = Field(default=None, foreign_key="project.id")
+    project_id: Optional[str] = Field(default=None, foreign_key="project.id", index=True)
+    version: int = 0 # Bumped on every save; delta saves must name the version they edited
 
 class Budget(BudgetBase, table=True):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
@@ -43,7 +44,7 @@ class Budget(BudgetBase, table=True):
 class BudgetCategoryBase(SQLModel):
     code: str # A, B, C
     name: str # Above the Line
-    budget_id: Optional[str] = Field(default=None, foreign_key="budget.id")
+    budget_id: Optional[str] = Field(default=None, foreign_key="budget.id", index=True)
     sort_order: int = 0
 
 class BudgetCategory(BudgetCategoryBase, table=True):
@@ -54,7 +55,7 @@ class BudgetCategory(BudgetCategoryBase, table=True):
 class BudgetGroupingBase(SQLModel):
     name: str
     code: str
-    category_id: Optional[str] = Field(default=None, foreign_key="budgetcategory.id")
+    category_id: Optional[str] = Field(default=None, foreign_key="budgetcategory.id", index=True)
 
 class BudgetGrouping(BudgetGroupingBase, table=True):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
@@ -109,12 +110,50 @@ class LineItemBase(SQLModel):
     breakdown_json: Optional[str] = None # Stores { "preProd": { "days": 10, "cost": 5000 } }
     fringes_json: Optional[str] = None   # Stores { "super": 11.5 ... }
 
-    grouping_id: Optional[str] = Field(default=None, foreign_key="budgetgrouping.id")
+    grouping_id: Optional[str] = Field(default=None, foreign_key="budgetgrouping.id", index=True)
 
 class LineItem(LineItemBase, table=True):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     grouping: Optional[BudgetGrouping] = Relationship(back_populates="items")
 
+class ProjectFringeSettings(SQLModel, table=True):
+    """Per-project fringe percentages; None inherits the global default (see fringe_settings)."""
+    project_id: str = Field(primary_key=True, foreign_key="project.id")
+    superannuation: Optional[float] = None
+    holiday_pay: Optional[float] = None
+    payroll_tax: Optional[float] = None
+    workers_comp: Optional[float] = None
+    contingency: Optional[float] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class LineItemPhaseCost(SQLModel, table=True):
+    """
+    One phase of a line item's costed breakdown, normalized out of breakdown_json
+    (see phase_costs) so per-phase aggregation can run as SQL.
+    """
+    item_id: str = Field(primary_key=True, foreign_key="lineitem.id")
+    phase: str = Field(primary_key=True, index=True) # preProd, shoot, postProd
+    days: float = 0.0
+    gross: float = 0.0
+    fringes: float = 0.0 # Item fringes apportioned by this phase's share of gross
+
+class BudgetRollup(SQLModel, table=True):
+    """
+    Materialized totals of one grouping's items, maintained on write (see budget_rollup).
+    Category and budget totals are sums over these rows.
+    """
+    grouping_id: str = Field(primary_key=True, foreign_key="budgetgrouping.id")
+    category_id: Optional[str] = Field(default=None, index=True)
+    budget_id: Optional[str] = Field(default=None, index=True)
+    item_count: int = 0
+    total: float = 0.0
+    # Phase costs from breakdown_json; items without a breakdown count as "other"
+    pre_prod: float = 0.0
+    shoot: float = 0.0
+    post_prod: float = 0.0
+    other: float = 0.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 # --- Crew / API Data Layer ---
 
 
@@ -153,7 +192,7 @@ class CalendarDay(SQLModel, table=True):
     """Individual day in the production calendar"""
     id: Optional[str] = Field(default_factory=generate_uuid, primary_key=True)
     calendar_id: str = Field(foreign_key="productioncalendar.id", index=True)
-    date: datetime  # The actual date
+    date: datetime = Field(index=True)  # The actual date
     phase: str  # 'PRE_PROD', 'SHOOT', 'POST_PROD'
     day_type: str  # 'WEEKDAY', 'WEEKEND', 'HOLIDAY'
     is_holiday: bool = False
@@ -203,7 +242,7 @@ class BudgetTemplate(SQLModel, table=True):
 class RoleHistory(SQLModel, table=True):
     """Stores historical rates for auto-completion suggestions"""
     id: Optional[str] = Field(default_factory=generate_uuid, primary_key=True)
-    role_name: str = Field(index=True)
+    role_name: str = Field(index=True, unique=True)
     base_rate: float
     unit: str
     project_id: str
@@ -0,0 +1,100 @@
+"""
+Parallel Recalculation
+Shards the costing of a large recalculation across a process pool.
+
+Everything that needs the database (effective calendars, holidays) is resolved once
+in the parent; workers only run the pure-CPU cost_resolved_requests on their shard,
+and the results are written back with bulk UPDATEs instead of per-object flushes.
+"""
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set
+
+from sqlmodel import Session
+
+from models import LineItem
+from labor_calculator_service import (
+    LaborCostRequest, LaborCostResponse, ResolvedPhases, cost_resolved_requests, merge_costed, resolve_costing_inputs
+)
+from recalc_engine import RecalcNode, build_cost_request, cost_result_values
+
+# Worker processes used by recalculation jobs; 1 keeps costing in-process
+RECALC_WORKERS = int(os.environ.get("RECALC_WORKERS", "1"))
+# Below this many items the pool start-up costs more than it saves
+PARALLEL_MIN_ITEMS = int(os.environ.get("RECALC_PARALLEL_MIN_ITEMS", "200"))
+
+logger = logging.getLogger(__name__)
+
+def _fringe_values(fringe_settings: Any) -> Dict[str, float]:
+    if hasattr(fringe_settings, "model_dump"):
+        return fringe_settings.model_dump()
+    return dict(vars(fringe_settings))
+
+def _cost_shard(
+    reqs: List[LaborCostRequest],
+    resolved: List[ResolvedPhases],
+    holiday_dates: Set[date],
+    fringe_values: Dict[str, float]
+) -> List[LaborCostResponse]:
+    # Runs in a worker process; only plain data crosses the process boundary
+    return cost_resolved_requests(reqs, resolved, holiday_dates, SimpleNamespace(**fringe_values))
+
+def cost_nodes_parallel(
+    session: Session,
+    project_id: str,
+    nodes: List[RecalcNode],
+    fringe_settings: Any,
+    workers: int = RECALC_WORKERS,
+    min_items: int = PARALLEL_MIN_ITEMS,
+    pool: Optional[Executor] = None
+) -> List[LaborCostResponse]:
+    """
+    Cost the given nodes, split into `workers` shards. Results are in node order;
+    nodes whose calendar can't be resolved get a result with `error` set.
+    Pass `pool` to reuse one process pool across calls (e.g. every chunk of a job).
+    """
+    all_reqs = [build_cost_request(node, project_id) for node in nodes]
+    all_resolved, holiday_dates, errors = resolve_costing_inputs(session, all_reqs)
+    ok = [i for i, phases in enumerate(all_resolved) if phases is not None]
+    reqs = [all_reqs[i] for i in ok]
+    resolved = [all_resolved[i] for i in ok]
+    if workers <= 1 or len(reqs) < max(min_items, 2):
+        return merge_costed(len(nodes), ok, cost_resolved_requests(reqs, resolved, holiday_dates, fringe_settings), errors)
+
+    fringe_values = _fringe_values(fringe_settings)
+    shard_size = -(-len(reqs) // workers)
+    with nullcontext(pool) if pool is not None else ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_cost_shard, reqs[i:i + shard_size], resolved[i:i + shard_size], holiday_dates, fringe_values)
+            for i in range(0, len(reqs), shard_size)
+        ]
+        costed = [res for future in futures for res in future.result()]
+    return merge_costed(len(nodes), ok, costed, errors)
+
+def bulk_write_results(
+    session: Session,
+    nodes: List[RecalcNode],
+    results: List[LaborCostResponse],
+    errors: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Write costing results back with one bulk UPDATE. Returns count updated.
+    Items that couldn't be costed or written are logged and added to `errors` (item id -> message).
+    """
+    mappings = []
+    for node, res in zip(nodes, results):
+        try:
+            if res.error:
+                raise ValueError(res.error)
+            mappings.append({"id": node.item.id, **cost_result_values(node.item, res)})
+        except Exception as e:
+            logger.warning("Failed to auto-recalc item %s: %s", node.item.id, e)
+            if errors is not None:
+                errors[node.item.id] = str(e)
+    if mappings:
+        session.bulk_update_mappings(LineItem, mappings)
+    return len(mappings)
@@ -0,0 +1,84 @@
+"""
+Phase Costs
+Keeps LineItemPhaseCost rows in step with LineItem.breakdown_json. Every write path
+that changes an item's breakdown or fringes calls sync_phase_costs() with those item
+ids; the JSON is parsed once there, so readers can aggregate per phase with GROUP BY.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlmodel import Session, delete, func, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem, LineItemPhaseCost
+from recalc_engine import PHASES
+
+# Max ids per IN (...) clause
+IN_CHUNK = 900
+
+def phase_cost_rows(item_id: str, breakdown_json: Optional[str], fringes_json: Optional[str]) -> List[Dict[str, Any]]:
+    """LineItemPhaseCost mappings for one item. Items without a (valid) breakdown have none."""
+    if not breakdown_json:
+        return []
+    try:
+        breakdown = json.loads(breakdown_json)
+        fringes = json.loads(fringes_json) if fringes_json else {}
+        phases = [(p, float(breakdown[p].get("days", 0) or 0), float(breakdown[p].get("cost", 0) or 0))
+                  for p in PHASES if isinstance(breakdown.get(p), dict)]
+        total_fringes = float(fringes.get("total_fringes", 0) or 0)
+    except Exception as e:
+        print(f"Unreadable breakdown on item {item_id}: {e}")
+        return []
+
+    gross_total = sum(gross for _, _, gross in phases)
+    return [
+        {
+            "item_id": item_id,
+            "phase": phase,
+            "days": days,
+            "gross": gross,
+            "fringes": round(total_fringes * gross / gross_total, 2) if gross_total else 0.0
+        }
+        for phase, days, gross in phases
+    ]
+
+def clear_phase_costs(session: Session, item_ids: Iterable[str]):
+    ids = list(item_ids)
+    for start in range(0, len(ids), IN_CHUNK):
+        session.exec(delete(LineItemPhaseCost).where(LineItemPhaseCost.item_id.in_(ids[start:start + IN_CHUNK])))
+
+def sync_phase_costs(session: Session, item_ids: Iterable[Optional[str]]) -> int:
+    """Rewrite the phase rows of the given items from their stored breakdown. Does not commit."""
+    ids = list({i for i in item_ids if i})
+    if not ids:
+        return 0
+    session.flush()
+
+    rows = []
+    for start in range(0, len(ids), IN_CHUNK):
+        chunk = ids[start:start + IN_CHUNK]
+        for item_id, breakdown_json, fringes_json in session.exec(
+            select(LineItem.id, LineItem.breakdown_json, LineItem.fringes_json).where(LineItem.id.in_(chunk))
+        ).all():
+            rows.extend(phase_cost_rows(item_id, breakdown_json, fringes_json))
+    clear_phase_costs(session, ids)
+    if rows:
+        session.bulk_insert_mappings(LineItemPhaseCost, rows)
+    return len(rows)
+
+def project_phase_matrix(session: Session, project_id: str):
+    """(category name, phase, days, gross, fringes) summed over the project's budgets."""
+    return session.exec(
+        select(
+            BudgetCategory.name,
+            LineItemPhaseCost.phase,
+            func.sum(LineItemPhaseCost.days),
+            func.sum(LineItemPhaseCost.gross),
+            func.sum(LineItemPhaseCost.fringes)
+        )
+        .join(LineItem, LineItemPhaseCost.item_id == LineItem.id)
+        .join(BudgetGrouping, LineItem.grouping_id == BudgetGrouping.id)
+        .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+        .join(Budget, BudgetCategory.budget_id == Budget.id)
+        .where(Budget.project_id == project_id)
+        .group_by(BudgetCategory.name, LineItemPhaseCost.phase)
+    ).all()
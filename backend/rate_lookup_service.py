@@ -1,19 +1,44 @@
 """
 Rate Lookup Service
-Queries award_rates.json for classification rates based on day type and hours worked.
+Queries award_rates.json for classification rates and prices days worked
+using the compiled award rule tables (see award_rules.py).
 """
 import json
 import os
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Sequence, Union
+
+import numpy as np
+
+from award_rules import AwardRuleBook, DAY_CLASSES, get_award_rules, rule_set_key
+from classification_index import ClassificationIndex
+
+# Day classes used by the batch kernel. Public holidays override the weekday.
+DAY_CLASS_WEEKDAY = DAY_CLASSES.index('WEEKDAY')
+DAY_CLASS_SATURDAY = DAY_CLASSES.index('SATURDAY')
+DAY_CLASS_SUNDAY = DAY_CLASSES.index('SUNDAY')
+DAY_CLASS_HOLIDAY = DAY_CLASSES.index('HOLIDAY')
+DAY_TYPE_TO_CLASS = {'WEEKDAY': DAY_CLASS_WEEKDAY, 'SATURDAY': DAY_CLASS_SATURDAY, 'SUNDAY': DAY_CLASS_SUNDAY}
+
+ArrayLike = Union[Sequence, np.ndarray, float, bool, int]
 
 class RateLookupService:
     """Service for looking up rates from payguide data"""
     
-    def __init__(self, payguide_file: str = "data/award_rates.json"):
+    def __init__(self, payguide_file: str = "data/award_rates.json", rules: Optional[AwardRuleBook] = None):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.payguide_path = os.path.join(self.base_dir, payguide_file)
         self._data = None
         self._load_data()
+        self._set_rules(rules or get_award_rules())
+
+    def _set_rules(self, rules: AwardRuleBook):
+        """Use a compiled rule book, and index its tables by [is_artist][is_casual][day_class]"""
+        self.rules = rules
+        self._table_ids = np.array([
+            [[rules.table_id(rule_set_key(is_artist, is_casual), day_class) for day_class in DAY_CLASSES]
+             for is_casual in (False, True)]
+            for is_artist in (False, True)
+        ], dtype=np.intp)
     
     def _load_data(self):
         """Load payguide data from JSON file"""
@@ -23,59 +48,15 @@ class RateLookupService:
         except Exception as e:
             print(f"Error loading payguide data: {e}")
             self._data = {"sections": []}
+        self._index = ClassificationIndex(self._data.get("sections", []))
     
     def _find_classification(self, classification: str) -> Optional[Dict]:
-        """Find a classification entry in the payguide data"""
-        for section in self._data.get("sections", []):
-            for cls in section.get("classifications", []):
-                 # Exact match preferred, but could be loose
-                 if classification.lower() == cls.get("classification", "").lower():
-                     # Filter out bad parsing
-                     if cls.get("hourly_rate", 0) <= 0: continue
-                     
-                     return {
-                         **cls,
-                         "section_name": section.get("name"),
-                         "base_hourly": cls.get("hourly_rate", 0)
-                     }
-        return None
+        """Find a classification entry in the payguide data (case-insensitive exact match)"""
+        return self._index.find(classification)
 
     def search_classifications(self, query: str, limit: int = 20) -> List[Dict]:
-        """Search for classifications matching a query"""
-        results = []
-        query_lower = query.lower()
-        
-        seen_keys = set()
-        
-        for section in self._data.get("sections", []):
-            section_name = section.get("name", "")
-            for cls in section.get("classifications", []):
-                cls_name = cls.get("classification", "")
-                rate = cls.get("hourly_rate", 0)
-                
-                if rate <= 0: continue
-                if not cls_name: continue
-                
-                if query_lower in cls_name.lower():
-                    key = f"{cls_name}_{rate}"
-                    if key in seen_keys: continue
-                    seen_keys.add(key)
-                    
-                    results.append({
-                        "classification": cls_name,
-                        "hourly_rate": rate,
-                        "base_hourly": rate,
-                        "section_name": section_name,
-                        "section": section_name,
-                        "_meta_source": cls.get("_meta_source", ""),
-                        "award": "Broadcasting" # Generic for now
-                    })
-                    if len(results) >= limit:
-                        break
-            if len(results) >= limit:
-                break
-                
-        return results
+        """Search for classifications matching a query, ranked by relevance"""
+        return self._index.search(query, limit)
 
     def calculate_day_cost(
         self,
@@ -88,7 +69,7 @@ class RateLookupService:
         override_section_name: Optional[str] = None
     ) -> Dict:
         """
-        Calculate total cost for a single day using HARDCODED rules (Spec 4.2)
+        Calculate total cost for a single day using the award rule tables (Spec 4.2)
         """
         if override_base_rate is not None:
             base_hourly = override_base_rate
@@ -115,192 +96,14 @@ class RateLookupService:
             # Hardcode casual logic detection for now (e.g. if classification contains "Casual")
             is_casual = "casual" in classification.lower()
 
-        # Calculate Cost
-        total_cost = 0.0
-        details = []
-        
+        # Calculate Cost from the compiled rule table (Spec 4.2)
         # Enforce 4h min call? (Spec says "Enforce 4h Minimum Call")
         # For budgeting purposes, we often stick to what's scheduled, but let's be safe.
-        effective_hours = max(hours, 4.0)
-
-        # 1. ARTIST RULES (Category E)
-        if is_artist:
-            if is_casual:
-                # 2. Casual Artists
-                if is_holiday:
-                   # Public Holiday: All Hours 2.5x
-                   rate = base_hourly * 2.5
-                   total_cost = effective_hours * rate
-                   details.append(f"Casual PH (2.5x): {effective_hours}h")
-                elif day_type == 'SUNDAY':
-                   # Sunday: All Hours 2.0x
-                   rate = base_hourly * 2.0
-                   total_cost = effective_hours * rate
-                   details.append(f"Casual Sun (2.0x): {effective_hours}h")
-                else: 
-                   # Mon-Sat (includes Saturday for Artists according to spec?)
-                   # Spec says "Monday – Saturday" for Artists
-                   # 0 - 7.6h: 1.25x Base
-                   block1 = min(effective_hours, 7.6)
-                   total_cost += block1 * base_hourly * 1.25
-                   details.append(f"Casual Base (1.25x): {block1}h")
-                   
-                   remaining = effective_hours - block1
-                   if remaining > 0:
-                       # 7.6 – 9.6h: 1.875x Base
-                       block2 = min(remaining, 2.0)
-                       total_cost += block2 * base_hourly * 1.875
-                       details.append(f"Casual OT 1.5x+Load (1.875x): {block2}h")
-                       remaining -= block2
-                   
-                   if remaining > 0:
-                       # 9.6h+: 2.5x Base
-                       total_cost += remaining * base_hourly * 2.5
-                       details.append(f"Casual OT 2.0x+Load? (2.5x): {remaining}h")
-            else:
-                # 1. Full-Time & Part-Time Artists
-                if is_holiday:
-                    # All Hours: 2.5x Base
-                    total_cost = effective_hours * base_hourly * 2.5
-                    details.append(f"PH (2.5x): {effective_hours}h")
-                elif day_type == 'SUNDAY':
-                     # All Hours: 2.0x Base
-                     total_cost = effective_hours * base_hourly * 2.0
-                     details.append(f"Sunday (2.0x): {effective_hours}h")
-                else:
-                     # Monday – Saturday
-                     # 0 – 7.6h: 1.0x Base
-                     block1 = min(effective_hours, 7.6)
-                     total_cost += block1 * base_hourly
-                     details.append(f"Base (1.0x): {block1}h")
-                     
-                     remaining = effective_hours - block1
-                     if remaining > 0:
-                         # 7.6 – 9.6h: 1.5x Base
-                         block2 = min(remaining, 2.0)
-                         total_cost += block2 * base_hourly * 1.5
-                         details.append(f"OT 1.5x: {block2}h")
-                         remaining -= block2
-                     
-                     if remaining > 0:
-                         # 9.6h+: 2.0x Base
-                         total_cost += remaining * base_hourly * 2.0
-                         details.append(f"OT 2.0x: {remaining}h")
-
-        # 2. CREW RULES (All other labour lines)
-        else:
-            if is_casual:
-                 # 2. Casual Crew
-                if is_holiday:
-                     # All Hours: 3.125x Base
-                     total_cost = effective_hours * base_hourly * 3.125
-                     details.append(f"Casual PH (3.125x): {effective_hours}h")
-                elif day_type == 'SUNDAY':
-                    # 0 – 7.6h: 2x Base
-                    # 7.6h+: 2.5x Base
-                    block1 = min(effective_hours, 7.6)
-                    total_cost += block1 * base_hourly * 2.0
-                    details.append(f"Casual Sun Base (2.0x): {block1}h")
-                    
-                    remaining = effective_hours - block1
-                    if remaining > 0:
-                        total_cost += remaining * base_hourly * 2.5
-                        details.append(f"Casual Sun OT (2.5x): {remaining}h")
-                
-                elif day_type == 'SATURDAY':
-                     # 0 – 7.6h: 1.75x Base
-                     # 7.6 – 9.6h: 2.1875x Base
-                     # 9.6h+: 2.5x Base
-                     block1 = min(effective_hours, 7.6)
-                     total_cost += block1 * base_hourly * 1.75
-                     details.append(f"Casual Sat Base (1.75x): {block1}h")
-                     
-                     remaining = effective_hours - block1
-                     if remaining > 0:
-                         block2 = min(remaining, 2.0)
-                         total_cost += block2 * base_hourly * 2.1875
-                         details.append(f"Casual Sat OT (2.1875x): {block2}h")
-                         remaining -= block2
-                         
-                     if remaining > 0:
-                         total_cost += remaining * base_hourly * 2.5
-                         details.append(f"Casual Sat OT (2.5x): {remaining}h")
-                
-                else: 
-                     # Monday – Friday (Casual)
-                     # 0 – 7.6h: 1.25x Base (Standard Casual Rate)
-                     block1 = min(effective_hours, 7.6)
-                     total_cost += block1 * base_hourly * 1.25
-                     details.append(f"Casual Base (1.25x): {block1}h")
-                     
-                     remaining = effective_hours - block1
-                     if remaining > 0:
-                         # 7.6 – 9.6h: 1.875x Base
-                         block2 = min(remaining, 2.0)
-                         total_cost += block2 * base_hourly * 1.875
-                         details.append(f"Casual OT (1.875x): {block2}h")
-                         remaining -= block2
-                         
-                     if remaining > 0:
-                         # 9.6h+: 2.5x Base
-                         total_cost += remaining * base_hourly * 2.5
-                         details.append(f"Casual OT (2.5x): {remaining}h")
-
-            else:
-                # 1. Full-Time & Part-Time Crew
-                if is_holiday:
-                    # All Hours: 2.5x Base
-                    total_cost = effective_hours * base_hourly * 2.5
-                    details.append(f"Pub Hol (2.5x): {effective_hours}h")
-                elif day_type == 'SUNDAY':
-                    # 0 – 7.6h: 1.75x Base (Ordinary Penalty)
-                    # 7.6h+: 2.0x Base
-                    block1 = min(effective_hours, 7.6)
-                    total_cost += block1 * base_hourly * 1.75
-                    details.append(f"Sun Base (1.75x): {block1}h")
-                    
-                    remaining = effective_hours - block1
-                    if remaining > 0:
-                        total_cost += remaining * base_hourly * 2.0
-                        details.append(f"Sun OT (2.0x): {remaining}h")
-                
-                elif day_type == 'SATURDAY': 
-                     # 0 – 7.6h: 1.5x Base (Ordinary Penalty)
-                     # 7.6 – 9.6h: 1.75x Base
-                     # 9.6h+: 2.0x Base
-                     block1 = min(effective_hours, 7.6)
-                     total_cost += block1 * base_hourly * 1.5
-                     details.append(f"Sat Base (1.5x): {block1}h")
-                     
-                     remaining = effective_hours - block1
-                     if remaining > 0:
-                         block2 = min(remaining, 2.0)
-                         total_cost += block2 * base_hourly * 1.75
-                         details.append(f"Sat OT (1.75x): {block2}h")
-                         remaining -= block2
-                         
-                     if remaining > 0:
-                         total_cost += remaining * base_hourly * 2.0
-                         details.append(f"Sat OT (2.0x): {remaining}h")
-                
-                else: # Mon-Fri (Standard Crew)
-                     # 0 – 7.6h: 1.0x Base
-                     block1 = min(effective_hours, 7.6)
-                     total_cost += block1 * base_hourly
-                     details.append(f"Base (1.0x): {block1}h")
-                     
-                     remaining = effective_hours - block1
-                     if remaining > 0:
-                         # 7.6 – 9.6h: 1.5x Base
-                         block2 = min(remaining, 2.0)
-                         total_cost += block2 * base_hourly * 1.5
-                         details.append(f"OT 1.5x: {block2}h")
-                         remaining -= block2
-                         
-                     if remaining > 0:
-                         # 9.6h+: 2.0x Base
-                         total_cost += remaining * base_hourly * 2.0
-                         details.append(f"OT 2.0x: {remaining}h")
+        day_class = 'HOLIDAY' if is_holiday else (day_type if day_type in DAY_TYPE_TO_CLASS else 'WEEKDAY')
+        bands = self.rules.get(rule_set_key(is_artist, is_casual), day_class)
+        effective_hours = bands.effective_hours(hours)
+        total_cost = bands.units(effective_hours) * base_hourly
+        details = bands.describe(effective_hours)
 
         return {
             "day_cost": round(total_cost, 2),
@@ -310,6 +113,49 @@ class RateLookupService:
             "source": section_name
         }
 
+    def calculate_day_costs_batch(
+        self,
+        hours: ArrayLike,
+        day_types: ArrayLike,
+        is_holiday: ArrayLike,
+        is_casual: ArrayLike,
+        is_artist: ArrayLike,
+        base_rates: ArrayLike
+    ) -> np.ndarray:
+        """
+        Vectorized equivalent of calculate_day_cost for rate overrides.
+
+        All arguments are broadcast against each other, so per-item values (casual,
+        artist, base rate) can be passed as scalars alongside per-day arrays.
+        day_types accepts 'WEEKDAY' / 'SATURDAY' / 'SUNDAY' strings or DAY_CLASS_* codes.
+
+        Returns an array of day costs rounded to cents.
+        """
+        day_types = np.asarray(day_types)
+        if day_types.dtype.kind in ('U', 'S', 'O'):
+            day_classes = np.array([DAY_TYPE_TO_CLASS.get(str(t), DAY_CLASS_WEEKDAY) for t in day_types.ravel()],
+                                   dtype=np.intp).reshape(day_types.shape)
+        else:
+            day_classes = day_types.astype(np.intp)
+
+        hours, day_classes, is_holiday, is_casual, is_artist, base_rates = np.broadcast_arrays(
+            np.asarray(hours, dtype=float),
+            day_classes,
+            np.asarray(is_holiday, dtype=bool),
+            np.asarray(is_casual, dtype=bool),
+            np.asarray(is_artist, dtype=bool),
+            np.asarray(base_rates, dtype=float)
+        )
+        if hours.size == 0:
+            return np.zeros(hours.shape)
+
+        day_classes = np.where(is_holiday, DAY_CLASS_HOLIDAY, day_classes)
+        table_ids = self._table_ids[is_artist.astype(np.intp), is_casual.astype(np.intp), day_classes]
+
+        # Minimum call is applied per rule table inside units_batch
+        units = self.rules.units_batch(table_ids.ravel(), hours.ravel()).reshape(hours.shape)
+        return np.round(units * base_rates, 2)
+
 # Singleton instance
 _rate_service = None
 
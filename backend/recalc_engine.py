@@ -0,0 +1,223 @@
+"""
+Recalculation Engine
+Incremental recalculation of calendar-driven line items.
+
+Dependencies form a graph: project calendar phases -> grouping calendar_overrides
+-> line items. A phase of the project calendar only reaches an item if neither the
+item's phase_details nor its grouping's calendar_overrides shadow that phase, so a
+calendar change marks only the items that actually read the changed phases dirty.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from sqlmodel import Session, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem
+from calendar_cache import ResolvedCalendar
+from labor_calculator_service import LaborCostRequest, LaborCostResponse, calculate_labor_costs_batch
+from breakdown_codec import compact_breakdown
+
+PHASES = ("preProd", "shoot", "postProd")
+
+logger = logging.getLogger(__name__)
+
+def _phase_override(overrides: Optional[Dict[str, Any]], phase: str) -> Optional[Dict[str, Any]]:
+    """The override for a phase if it disables inheritance, else None."""
+    if not overrides:
+        return None
+    ov = overrides.get(phase)
+    if isinstance(ov, dict) and ov.get("inherit") == False:
+        return ov
+    return None
+
+def project_phase_dependencies(
+    calendar_mode: str,
+    item_overrides: Optional[Dict[str, Any]],
+    grouping_overrides: Optional[Dict[str, Any]]
+) -> FrozenSet[str]:
+    """
+    Project calendar phases an item's cost depends on (mirrors resolve_effective_calendar).
+    A phase is read from the project unless the item or grouping overrides both its hours and its dates.
+    """
+    depends = set()
+    any_override_dates = False
+    for phase in PHASES:
+        tiers = [ov for ov in (_phase_override(item_overrides, phase), _phase_override(grouping_overrides, phase)) if ov]
+        hours_overridden = any("defaultHours" in ov for ov in tiers)
+        dates_tier = next((ov for ov in tiers if "dates" in ov), None)
+
+        if dates_tier is not None and dates_tier["dates"]:
+            any_override_dates = True
+        if not hours_overridden or dates_tier is None:
+            depends.add(phase)
+
+    # Inherit-mode items fall back to default dates when no tier has any dates,
+    # so whether that happens depends on every project phase.
+    if calendar_mode == "inherit" and not any_override_dates:
+        return frozenset(PHASES)
+    return frozenset(depends)
+
+def changed_phases(old: ResolvedCalendar, new: ResolvedCalendar) -> Set[str]:
+    return {phase for phase in PHASES if old.get(phase) != new.get(phase)}
+
+@dataclass
+class RecalcNode:
+    item: LineItem
+    grouping_id: str
+    is_artist: bool
+    project_phases: FrozenSet[str]
+
+class RecalcGraph:
+    """Calendar-driven line items of a project, indexed by the project phases they read."""
+
+    def __init__(self, project_id: str, nodes: List[RecalcNode]):
+        self.project_id = project_id
+        self.nodes = nodes
+        self.dependents: Dict[str, List[RecalcNode]] = {phase: [] for phase in PHASES}
+        for node in nodes:
+            for phase in node.project_phases:
+                self.dependents[phase].append(node)
+
+    @classmethod
+    def build(cls, session: Session, project_id: str) -> "RecalcGraph":
+        rows = session.exec(
+            select(LineItem, BudgetGrouping, BudgetCategory)
+            .join(BudgetGrouping, LineItem.grouping_id == BudgetGrouping.id)
+            .join(BudgetCategory, BudgetGrouping.category_id == BudgetCategory.id)
+            .join(Budget, BudgetCategory.budget_id == Budget.id)
+            .where(Budget.project_id == project_id)
+        ).all()
+
+        nodes = []
+        for item, grp, cat in rows:
+            if not (item.is_labor or item.unit in ["day", "week"]):
+                continue
+            nodes.append(RecalcNode(
+                item=item,
+                grouping_id=grp.id,
+                # Artist detection: Category E is specifically Artists per pay_rules_reference.md
+                is_artist=item.is_labor and cat.code == "E",
+                project_phases=project_phase_dependencies(
+                    item.calendar_mode or "inherit", item.phase_details, grp.calendar_overrides
+                )
+            ))
+        return cls(project_id, nodes)
+
+    def dirty_nodes(self, phases: Iterable[str]) -> List[RecalcNode]:
+        """Nodes reachable from the given changed project phases, in graph order."""
+        seen = set()
+        for phase in phases:
+            for node in self.dependents.get(phase, []):
+                seen.add(id(node))
+        return [node for node in self.nodes if id(node) in seen]
+
+def build_cost_request(node: RecalcNode, project_id: str) -> LaborCostRequest:
+    item = node.item
+    if item.is_labor:
+        # Re-construct Request with hierarchical awareness
+        hourly_rate = item.base_hourly_rate
+        if not hourly_rate or hourly_rate == 0:
+            hourly_rate = item.rate
+        is_casual = item.is_casual
+    else:
+        # Material lines only need the corrected day counts, the cost output is ignored
+        hourly_rate = 0
+        is_casual = False
+
+    return LaborCostRequest(
+        line_item_id=item.id,
+        base_hourly_rate=hourly_rate,
+        is_casual=is_casual,
+        is_artist=node.is_artist,
+        calendar_mode=item.calendar_mode or "inherit",
+        project_id=project_id,
+        grouping_id=node.grouping_id,
+        phase_details=item.phase_details or {},
+        costing_mode="histogram"
+    )
+
+def cost_result_values(item: LineItem, res: LaborCostResponse) -> Dict[str, Any]:
+    """Column values a costing result writes onto a labor item, or a material item's synced quantities."""
+    if item.is_labor:
+        values = {
+            "total": res.total_cost + res.fringes.get("total_fringes", 0),
+            "breakdown_json": json.dumps(compact_breakdown(res.breakdown)),
+            "fringes_json": json.dumps(res.fringes),
+            "prep_qty": item.prep_qty,
+            "shoot_qty": item.shoot_qty,
+            "post_qty": item.post_qty
+        }
+
+        # Update quantities for display
+        if 'preProd' in res.breakdown: values["prep_qty"] = float(res.breakdown['preProd']['days'])
+        if 'shoot' in res.breakdown: values["shoot_qty"] = float(res.breakdown['shoot']['days'])
+        if 'postProd' in res.breakdown: values["post_qty"] = float(res.breakdown['postProd']['days'])
+        values["quantity"] = values["prep_qty"] + values["shoot_qty"] + values["post_qty"]
+        return values
+
+    # Extract days
+    pre_days = float(res.breakdown.get('preProd', {}).get('days', 0))
+    shoot_days = float(res.breakdown.get('shoot', {}).get('days', 0))
+    post_days = float(res.breakdown.get('postProd', {}).get('days', 0))
+
+    # Construct Breakdown for Material (Unified Structure)
+    # We store preProd/shoot/postProd to match backend standard
+    mat_breakdown = {
+        "preProd": {"days": pre_days, "cost": pre_days * item.rate},
+        "shoot": {"days": shoot_days, "cost": shoot_days * item.rate},
+        "postProd": {"days": post_days, "cost": post_days * item.rate}
+    }
+    values = {
+        "prep_qty": pre_days,
+        "shoot_qty": shoot_days,
+        "post_qty": post_days,
+        "breakdown_json": json.dumps(mat_breakdown)
+    }
+
+    # Recalculate Total
+    if item.unit == "day":
+        values["quantity"] = pre_days + shoot_days + post_days
+        values["total"] = item.rate * values["quantity"]
+    elif item.unit == "week":
+        # Use pro-rata weeks based on days_per_week (default 5)
+        days_per_week = item.days_per_week if item.days_per_week > 0 else 5.0
+        values["quantity"] = (pre_days + shoot_days + post_days) / days_per_week
+        values["total"] = item.rate * values["quantity"]
+    return values
+
+def apply_cost_result(item: LineItem, res: LaborCostResponse):
+    """Write a costing result onto a labor item, or sync a material item's quantities."""
+    for column, value in cost_result_values(item, res).items():
+        setattr(item, column, value)
+
+def recalculate_nodes(
+    session: Session,
+    project_id: str,
+    nodes: List[RecalcNode],
+    fringe_settings: Any,
+    errors: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Cost the given nodes in one batch and stage the updated items on the session. Returns count updated.
+    Items that couldn't be costed are logged and added to `errors` (item id -> message).
+    """
+    if not nodes:
+        return 0
+    results = calculate_labor_costs_batch(session, [build_cost_request(n, project_id) for n in nodes], fringe_settings)
+
+    count_updated = 0
+    for node, res in zip(nodes, results):
+        try:
+            if res.error:
+                raise ValueError(res.error)
+            apply_cost_result(node.item, res)
+            session.add(node.item)
+            count_updated += 1
+        except Exception as e:
+            logger.warning("Failed to auto-recalc item %s: %s", node.item.id, e)
+            if errors is not None:
+                errors[node.item.id] = str(e)
+            continue
+    return count_updated
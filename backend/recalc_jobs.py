@@ -0,0 +1,174 @@
+"""
+Recalculation Jobs
+Runs calendar-triggered recalculations outside the request, committing in bounded
+chunks so interactive saves can interleave with a long recalc on SQLite.
+Progress is tracked in-process and exposed through GET /api/jobs/{id}.
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from models import LineItem
+from recalc_engine import RecalcGraph, recalculate_nodes
+from parallel_recalc import PARALLEL_MIN_ITEMS, bulk_write_results, cost_nodes_parallel
+from budget_rollup import refresh_grouping_rollups
+from budget_save import bump_grouping_budget_versions, fetch_by_ids
+from fringe_recalc import recompute_fringes
+from phase_costs import sync_phase_costs
+
+RECALC_CHUNK_SIZE = int(os.environ.get("RECALC_CHUNK_SIZE", "50"))
+MAX_FINISHED_JOBS = 100
+# Per-item failures kept on a job for GET /api/jobs/{id}
+MAX_ITEM_ERRORS = 100
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RecalcJob:
+    id: str
+    project_id: str
+    status: str = "queued" # queued, running, completed, failed
+    mode: str = "costs" # costs: re-cost dirty items; fringes: re-apply fringe percentages only
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    chunks_committed: int = 0
+    phases_changed: List[str] = field(default_factory=list)
+    workers: int = 1
+    error: Optional[str] = None
+    item_errors: Dict[str, str] = field(default_factory=dict) # item id -> why it wasn't updated
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def progress(self) -> float:
+        if self.status == "completed":
+            return 1.0
+        return self.processed / self.total if self.total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "progress": round(self.progress, 4)}
+
+_jobs: Dict[str, RecalcJob] = {}
+_jobs_lock = threading.Lock()
+# One running recalc per project; later jobs wait so they see the newest calendar
+_project_locks: Dict[str, threading.Lock] = {}
+
+def create_job(project_id: str, phases_changed: Iterable[str] = (), workers: int = 1, mode: str = "costs") -> RecalcJob:
+    job = RecalcJob(
+        id=str(uuid.uuid4()), project_id=project_id, phases_changed=sorted(phases_changed), workers=workers, mode=mode
+    )
+    with _jobs_lock:
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.status in ("completed", "failed")]
+        for old in sorted(finished, key=lambda j: j.created_at)[:-MAX_FINISHED_JOBS]:
+            del _jobs[old.id]
+    return job
+
+def get_job(job_id: str) -> Optional[RecalcJob]:
+    return _jobs.get(job_id)
+
+def _project_lock(project_id: str) -> threading.Lock:
+    with _jobs_lock:
+        return _project_locks.setdefault(project_id, threading.Lock())
+
+def run_recalc_job(
+    job_id: str,
+    bind: Engine,
+    fringe_settings: Any,
+    full_recalc: bool = False,
+    chunk_size: int = RECALC_CHUNK_SIZE
+):
+    """
+    Recalculate the project's dirty items in chunks of `chunk_size`, committing after each.
+    Runs in a worker thread with its own session on `bind`.
+    With job.workers > 1 and at least PARALLEL_MIN_ITEMS dirty items, a chunk is
+    `chunk_size` items per worker, costed across a process pool and written back as
+    bulk UPDATEs; smaller jobs are costed in-process.
+    Each chunk is costed from its items as re-read in the transaction that writes it,
+    so edits saved between chunks are never overwritten with stale costs.
+    A "fringes" job only re-applies `fringe_settings` to stored gross (see fringe_recalc),
+    in one transaction.
+    """
+    job = _jobs[job_id]
+    with _project_lock(job.project_id), Session(bind) as session, ExitStack() as stack:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            if job.mode == "fringes":
+                job.updated = job.processed = job.total = recompute_fringes(session, fringe_settings, job.project_id)
+                session.commit()
+                job.chunks_committed = 1
+                job.status = "completed"
+                logger.info("Fringe job %s: re-applied fringes to %d items", job.id, job.updated)
+                return
+
+            graph = RecalcGraph.build(session, job.project_id)
+            dirty = graph.nodes if full_recalc else graph.dirty_nodes(job.phases_changed)
+            job.total = len(dirty)
+            # Read before the first commit expires the items
+            dirty_ids = [node.item.id for node in dirty]
+
+            pool = None
+            if job.workers > 1 and len(dirty) >= PARALLEL_MIN_ITEMS:
+                chunk_size *= job.workers
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=job.workers))
+
+            for start in range(0, len(dirty), chunk_size):
+                # Items deleted since an earlier chunk committed are skipped and counted as failed
+                chunk_ids = dirty_ids[start:start + chunk_size]
+                live = fetch_by_ids(session, LineItem, chunk_ids)
+                chunk = []
+                for node, node_id in zip(dirty[start:start + chunk_size], chunk_ids):
+                    if node_id in live:
+                        node.item = live[node_id]
+                        chunk.append(node)
+                missing = len(chunk_ids) - len(chunk)
+
+                errors: Dict[str, str] = {}
+                if pool is None:
+                    updated = recalculate_nodes(session, job.project_id, chunk, fringe_settings, errors)
+                else:
+                    # The job already decided to go parallel; every chunk uses the pool
+                    results = cost_nodes_parallel(
+                        session, job.project_id, chunk, fringe_settings, job.workers, min_items=0, pool=pool
+                    )
+                    updated = bulk_write_results(session, chunk, results, errors)
+                refresh_grouping_rollups(session, [node.item.grouping_id for node in chunk])
+                sync_phase_costs(session, [node.item.id for node in chunk])
+                if updated:
+                    bump_grouping_budget_versions(session, [node.item.grouping_id for node in chunk])
+                session.commit()
+
+                for item_id, error in errors.items():
+                    if len(job.item_errors) >= MAX_ITEM_ERRORS:
+                        break
+                    job.item_errors[item_id] = error
+                job.updated += updated
+                job.failed += len(chunk) - updated + missing
+                job.processed += len(chunk_ids)
+                job.chunks_committed += 1
+
+            job.status = "completed"
+            logger.info(
+                "Recalc job %s: updated %d of %d items (phases changed: %s)",
+                job.id, job.updated, len(graph.nodes), job.phases_changed
+            )
+        except Exception as e:
+            session.rollback()
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception("Recalc job %s failed", job.id)
+        finally:
+            job.finished_at = datetime.utcnow()
@@ -0,0 +1,92 @@
+"""
+Role History
+Auto-learning of role rates for autocomplete. A budget save records every labor
+role it contains in one set-based upsert keyed by the unique index on role_name,
+instead of a SELECT + INSERT/UPDATE per line item.
+"""
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlmodel import Session, select
+
+from models import RoleHistory
+
+# Rows per INSERT statement (keeps well under SQLite's bound-parameter limit)
+UPSERT_CHUNK = 500
+
+class RoleUsage(NamedTuple):
+    role_name: str
+    base_rate: float
+    unit: str
+    project_id: str
+
+def _merge_usages(usages: Iterable[RoleUsage], now: datetime) -> List[Dict]:
+    """One row per role name: the last usage's rate/unit/project, usage_count = times seen."""
+    rows: Dict[str, Dict] = {}
+    for usage in usages:
+        if not usage.role_name:
+            continue
+        row = rows.get(usage.role_name)
+        count = row["usage_count"] + 1 if row else 1
+        rows[usage.role_name] = {
+            "id": row["id"] if row else str(uuid.uuid4()),
+            "role_name": usage.role_name,
+            "base_rate": usage.base_rate,
+            "unit": usage.unit,
+            "project_id": usage.project_id,
+            "last_used_at": now,
+            "usage_count": count
+        }
+    return list(rows.values())
+
+def _upsert_orm(session: Session, rows: List[Dict]):
+    """Fallback for databases without INSERT .. ON CONFLICT: one SELECT for all names."""
+    existing = {
+        role.role_name: role
+        for role in session.exec(select(RoleHistory).where(RoleHistory.role_name.in_([r["role_name"] for r in rows]))).all()
+    }
+    for row in rows:
+        role = existing.get(row["role_name"])
+        if role:
+            role.base_rate = row["base_rate"]
+            role.unit = row["unit"]
+            role.project_id = row["project_id"] # Update recent project context
+            role.last_used_at = row["last_used_at"]
+            role.usage_count += row["usage_count"]
+            session.add(role)
+        else:
+            session.add(RoleHistory(**row))
+
+def upsert_role_history(session: Session, usages: Iterable[RoleUsage], now: Optional[datetime] = None) -> int:
+    """
+    Record role usages: insert new roles, and for known ones update rate/unit/project,
+    bump last_used_at and add to usage_count. Returns the number of distinct roles.
+    """
+    rows = _merge_usages(usages, now or datetime.utcnow())
+    if not rows:
+        return 0
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        _upsert_orm(session, rows)
+        return len(rows)
+
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        stmt = insert(RoleHistory).values(rows[start:start + UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RoleHistory.role_name],
+            set_={
+                "base_rate": stmt.excluded.base_rate,
+                "unit": stmt.excluded.unit,
+                "project_id": stmt.excluded.project_id,
+                "last_used_at": stmt.excluded.last_used_at,
+                "usage_count": RoleHistory.usage_count + stmt.excluded.usage_count
+            }
+        )
+        session.exec(stmt)
+    return len(rows)
@@ -0,0 +1,127 @@
+"""
+Role Search
+Full-text search over RoleHistory for the description-cell autocomplete.
+
+On SQLite the role names are indexed in an FTS5 virtual table (rolehistory_fts,
+created by migration 0007 with its sync triggers), using the trigram tokenizer
+where the SQLite build has it (substring matching) and unicode61 with prefix
+queries otherwise. Other databases, a database without the FTS table, and
+queries the index can't answer fall back to an ILIKE scan.
+
+Matches are ranked by a combined score of text relevance (bm25), usage_count
+and recency of last use.
+"""
+import math
+import re
+import weakref
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, and_, select, text
+
+from models import RoleHistory
+
+FTS_TABLE = "rolehistory_fts"
+# Matches fetched from the index before re-ranking by usage / recency
+CANDIDATE_LIMIT = 200
+# Score weights (each component is scaled to 0..1)
+W_TEXT = 0.5
+W_USAGE = 0.3
+W_RECENCY = 0.2
+RECENCY_HALF_LIFE_DAYS = 90.0
+
+# Tokenizer of the FTS table per engine (None = no FTS index, use the fallback)
+_tokenizers: "weakref.WeakKeyDictionary[Engine, Optional[str]]" = weakref.WeakKeyDictionary()
+
+def _tokenizer_for(session: Session) -> Optional[str]:
+    engine = session.get_bind()
+    if engine not in _tokenizers:
+        tokenizer = None
+        if engine.dialect.name == "sqlite":
+            row = session.exec(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name").bindparams(name=FTS_TABLE)
+            ).first()
+            if row:
+                tokenizer = "trigram" if "trigram" in row[0] else "unicode61"
+        _tokenizers[engine] = tokenizer
+    return _tokenizers[engine]
+
+def build_match_query(q: str, tokenizer: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression requiring every token of `q`, or None if the index can't
+    answer it (no tokens; with trigram, a token under 3 chars, which trigrams can't match).
+    Trigram: each token is a substring phrase. unicode61: each token is a prefix query.
+    """
+    tokens = re.findall(r"\w+", q.lower())
+    if not tokens:
+        return None
+    if tokenizer == "trigram":
+        if any(len(t) < 3 for t in tokens):
+            return None
+        return " AND ".join(f'"{t}"' for t in tokens)
+    return " AND ".join(f'"{t}"*' for t in tokens)
+
+def _fts_candidates(session: Session, match: str) -> List[Tuple[str, float]]:
+    """(role id, text relevance) of the best matches; bm25 is negated so higher is better."""
+    rows = session.exec(
+        text(
+            f"SELECT r.id, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+            f"JOIN rolehistory r ON r.rowid = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit"
+        ).bindparams(match=match, limit=CANDIDATE_LIMIT)
+    ).all()
+    return [(role_id, -rank) for role_id, rank in rows]
+
+def _like_candidates(session: Session, q: str) -> List[Tuple[str, float]]:
+    """
+    Fallback: ILIKE scan requiring every token of `q` (or `q` itself if it has none),
+    with text relevance from exact / prefix / substring match.
+    """
+    tokens = re.findall(r"\w+", q) or [q]
+    roles = session.exec(
+        select(RoleHistory.id, RoleHistory.role_name)
+        .where(and_(*[RoleHistory.role_name.ilike(f"%{t}%") for t in tokens]))
+        .order_by(RoleHistory.usage_count.desc(), RoleHistory.last_used_at.desc())
+        .limit(CANDIDATE_LIMIT)
+    ).all()
+    q_lower = q.lower()
+    candidates = []
+    for role_id, role_name in roles:
+        name = role_name.lower()
+        relevance = 3.0 if name == q_lower else 2.0 if name.startswith(q_lower) else 1.0
+        candidates.append((role_id, relevance))
+    return candidates
+
+def _score(relevance: float, max_relevance: float, role: RoleHistory, max_usage: int, now: datetime) -> float:
+    text_score = relevance / max_relevance if max_relevance > 0 else 0.0
+    usage_score = math.log1p(role.usage_count or 0) / math.log1p(max_usage) if max_usage > 0 else 0.0
+    age_days = max((now - role.last_used_at).total_seconds() / 86400.0, 0.0) if role.last_used_at else float("inf")
+    recency_score = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+    return W_TEXT * text_score + W_USAGE * usage_score + W_RECENCY * recency_score
+
+def find_roles(session: Session, q: str, limit: int = 10) -> List[RoleHistory]:
+    """Roles matching `q`, best combined score first."""
+    q = q.strip()
+    if not q:
+        return []
+
+    tokenizer = _tokenizer_for(session)
+    match = build_match_query(q, tokenizer) if tokenizer else None
+    candidates = _fts_candidates(session, match) if match else _like_candidates(session, q)
+    if not candidates:
+        return []
+
+    relevance: Dict[str, float] = dict(candidates)
+    roles = session.exec(select(RoleHistory).where(RoleHistory.id.in_(list(relevance)))).all()
+
+    max_relevance = max(relevance.values())
+    max_usage = max(role.usage_count or 0 for role in roles)
+    now = datetime.utcnow()
+    # Exact name matches always come first
+    q_lower = q.lower()
+    roles.sort(key=lambda role: (
+        role.role_name.lower() != q_lower,
+        -_score(relevance[role.id], max_relevance, role, max_usage, now)
+    ))
+    return roles[:limit]
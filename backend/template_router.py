@@ -6,6 +6,8 @@ import json
 import uuid
 
 from database import get_session
+from budget_tree import load_budget_tree
+from budget_rollup import refresh_grouping_rollups
 from models import (
     BudgetTemplate, Budget, BudgetCategory, BudgetGrouping, LineItem, Project
 )
@@ -38,36 +40,9 @@ class InitializeBudgetRequest(BaseModel):
 # --- Helpers ---
 
 def serialize_budget_tree(session: Session, budget_id: str) -> Dict[str, Any]:
-    categories = session.exec(
-        select(BudgetCategory)
-        .where(BudgetCategory.budget_id == budget_id)
-        .order_by(BudgetCategory.sort_order)
-    ).all()
+    cat_list = load_budget_tree(session, budget_id)
+    total_items = sum(len(grp["items"]) for cat in cat_list for grp in cat["groupings"])
     
-    cat_list = []
-    total_items = 0
-    
-    for cat in categories:
-        cat_data = cat.model_dump()
-        groupings = session.exec(
-            select(BudgetGrouping).where(BudgetGrouping.category_id == cat.id)
-        ).all()
-        
-        grp_list = []
-        for grp in groupings:
-            grp_data = grp.model_dump()
-            items = session.exec(
-                select(LineItem).where(LineItem.grouping_id == grp.id)
-            ).all()
-            
-            item_list = [item.model_dump() for item in items]
-            grp_data['items'] = item_list
-            total_items += len(item_list)
-            grp_list.append(grp_data)
-            
-        cat_data['groupings'] = grp_list
-        cat_list.append(cat_data)
-        
     return {
         "categories": cat_list,
         "category_count": len(cat_list),
@@ -125,6 +100,7 @@ def clone_structure_to_budget(
                     grouping_id=new_grp.id
                 )
                 session.add(new_item)
+            refresh_grouping_rollups(session, [new_grp.id])
 
 # --- Endpoints ---
 
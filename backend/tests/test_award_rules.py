@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from award_rules import AwardRuleBook, compile_bands, get_award_rules
+from rate_lookup_service import RateLookupService
+
+def test_compile_bands_cumulative():
+    # 0-7.6 @ 1.0, 7.6-9.6 @ 1.5, 9.6+ @ 2.0 (thresholds given out of order)
+    bands = compile_bands(((9.6, 2.0), (0.0, 1.0), (7.6, 1.5)))
+    assert bands.breakpoints == (0.0, 7.6, 9.6)
+    assert bands.cumulative == pytest.approx((0.0, 7.6, 10.6))
+    # 12h: 7.6 + 3.0 + 4.8 = 15.4 units
+    assert bands.units(12.0) == pytest.approx(15.4)
+    assert bands.units(5.0) == pytest.approx(5.0)
+
+def test_units_array_matches_scalar():
+    import numpy as np
+    bands = compile_bands(((0.0, 1.25), (7.6, 1.875), (9.6, 2.5)))
+    hours = np.array([0.0, 4.0, 7.6, 8.0, 9.6, 14.0])
+    assert bands.units_array(hours).tolist() == pytest.approx([bands.units(h) for h in hours])
+
+def test_default_rule_book_has_all_rule_sets():
+    rules = get_award_rules()
+    assert set(rules.rule_sets) == {"crew_permanent", "crew_casual", "artist_permanent", "artist_casual"}
+    # Minimum call is part of the table
+    assert rules.get("crew_permanent", "WEEKDAY").effective_hours(2.0) == 4.0
+
+def test_custom_rule_book_variation():
+    # A variation where crew Saturdays are paid flat 2.0x, other day classes fall back to WEEKDAY
+    rules = AwardRuleBook.from_dict({
+        "rule_sets": {
+            name: {
+                "min_hours": 4.0,
+                "day_classes": {
+                    "WEEKDAY": [{"from": 0, "multiplier": 1.0, "label": "Base"}],
+                    "SATURDAY": [{"from": 0, "multiplier": 2.0, "label": "Sat"}]
+                }
+            }
+            for name in ("crew_permanent", "crew_casual", "artist_permanent", "artist_casual")
+        }
+    })
+    service = RateLookupService(rules=rules)
+
+    cost = service.calculate_day_cost("Dummy", 8.0, day_type="SATURDAY", override_base_rate=10.0,
+                                      override_is_casual=False, override_section_name="Crew")
+    assert cost["day_cost"] == 160.0
+    assert cost["breakdown"] == ["Sat: 8.0h"]
+
+    costs = service.calculate_day_costs_batch([8.0, 8.0, 8.0], ["WEEKDAY", "SATURDAY", "SUNDAY"],
+                                              False, False, False, 10.0)
+    assert costs.tolist() == [80.0, 160.0, 80.0]
+
+def test_rule_set_requires_weekday():
+    with pytest.raises(ValueError):
+        AwardRuleBook.from_dict({"rule_sets": {"crew_permanent": {"day_classes": {"SUNDAY": []}}}})
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from datetime import date, timedelta
+
+from sqlmodel import Session
+
+from models import LineItem
+from breakdown_codec import compact_breakdown, decode_days, encode_days, restore_day_data
+
+def _details(start: date, weeks: int):
+    """Mon-Fri working days, Saturdays every other week, one public holiday."""
+    details = []
+    for offset in range(weeks * 7):
+        d = start + timedelta(days=offset)
+        if d.weekday() == 6 or (d.weekday() == 5 and (offset // 7) % 2):
+            continue
+        holiday = offset == 10
+        day_type = "SATURDAY" if d.weekday() == 5 else "WEEKDAY"
+        cost = 900.0 if holiday else (600.0 if day_type == "SATURDAY" else 400.0)
+        details.append({
+            "date": d.isoformat(), "day_type": day_type, "is_holiday": holiday, "hours": 10,
+            "base_cost": 400.0, "total_day_cost": cost, "multiplier": 1.0
+        })
+    return details
+
+def test_day_runs_round_trip():
+    details = _details(date(2025, 3, 3), 8)
+    day_runs = encode_days(details)
+    assert decode_days(day_runs) == details
+    assert len(json.dumps(day_runs)) * 5 < len(json.dumps(details))
+
+    # Lists that cannot be encoded exactly are kept
+    assert encode_days(list(reversed(details))) is None
+    assert encode_days([{**details[0], "note": "x"}]) is None
+    breakdown = {"shoot": {"days": 1, "cost": 1, "details": [{"date": "bad"}]}}
+    assert compact_breakdown(breakdown) == breakdown
+
+def test_summary_payload_and_lazy_days(budget_env):
+    client, engine = budget_env.client, budget_env.engine
+    cat_id, grp_id, budget_id = budget_env.category_id, budget_env.grouping_id, budget_env.budget_id
+    details = _details(date(2025, 3, 3), 4)
+    cost = sum(d["total_day_cost"] for d in details)
+    breakdown = {"shoot": {"days": len(details), "cost": cost, "details": details}}
+    item = {"id": "dop", "description": "DOP", "is_labor": True, "total": cost,
+            "breakdown_json": json.dumps(breakdown)}
+    tree = {"categories": [{"id": cat_id, "name": "Crew", "groupings": [{"id": grp_id, "name": "Camera", "items": [item]}]}]}
+    assert client.post("/api/budget", json=tree).status_code == 200
+
+    with Session(engine) as session:
+        stored = session.get(LineItem, "dop").breakdown_json
+    assert "day_runs" in stored and len(stored) < len(item["breakdown_json"]) / 3
+
+    payload = client.get(f"/api/budgets/{budget_id}").json()
+    sent = payload[0]["groupings"][0]["items"][0]["breakdown_json"]
+    assert json.loads(sent) == {"shoot": {"days": len(details), "cost": cost}}
+
+    res = client.get("/api/line-items/dop/breakdown/days")
+    assert res.json() == {"shoot": {"details": details}}
+    assert client.get("/api/line-items/missing/breakdown/days").status_code == 404
+
+    # Saving back the summary the client was given keeps the stored days
+    item["breakdown_json"] = sent
+    assert client.post("/api/budget", json=tree).status_code == 200
+    with Session(engine) as session:
+        assert session.get(LineItem, "dop").breakdown_json == stored
+    assert restore_day_data(sent, stored) == stored
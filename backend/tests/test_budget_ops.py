@@ -0,0 +1,148 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlmodel import Session, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem, RoleHistory
+
+@pytest.fixture
+def env(budget_env):
+    with Session(budget_env.engine) as session:
+        # A second budget of the same project, which ops on the first must not reach
+        other = Budget(name="other", project_id=budget_env.project_id)
+        session.add(other)
+        session.flush()
+        other_cat = BudgetCategory(code="C", name="Crew", budget_id=other.id)
+        session.add(other_cat)
+        session.flush()
+        other_grp = BudgetGrouping(code="C.1", name="Camera", category_id=other_cat.id)
+        session.add(other_grp)
+        item = LineItem(description="Tape", rate=10, unit="allow", notes="keep", grouping_id=budget_env.grouping_id)
+        session.add(item)
+        session.commit()
+        ids = {
+            "budget": budget_env.budget_id, "cat": budget_env.category_id, "grp": budget_env.grouping_id,
+            "item": item.id, "other_grp": other_grp.id
+        }
+    return budget_env.client, budget_env.engine, ids
+
+def test_ops_apply_and_bump_version(env):
+    client, engine, ids = env
+    res = client.get(f"/api/budgets/{ids['budget']}")
+    assert res.headers["X-Budget-Version"] == "0"
+
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": [
+        {"op": "upsert_item", "id": ids["item"], "fields": {"rate": 12, "total": 12}},
+        {"op": "upsert_item", "grouping_id": ids["grp"], "fields": {
+            "description": "Focus Puller", "is_labor": True, "base_hourly_rate": 60, "unit": "day"}},
+        {"op": "update_grouping", "id": ids["grp"], "name": "Camera Dept"},
+        {"op": "add_grouping", "category_id": ids["cat"], "code": "C.2", "name": "Grip"},
+    ]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["version"] == 1
+    new_item_id, new_grp_id = body["created"]
+
+    with Session(engine) as session:
+        item = session.get(LineItem, ids["item"])
+        # Only the sent fields change
+        assert (item.rate, item.total, item.notes, item.unit) == (12, 12, "keep", "allow")
+        assert session.get(LineItem, new_item_id).grouping_id == ids["grp"]
+        assert session.get(BudgetGrouping, ids["grp"]).name == "Camera Dept"
+        assert session.get(BudgetGrouping, new_grp_id).code == "C.2"
+        assert session.exec(select(RoleHistory)).one().role_name == "Focus Puller"
+
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 1, "ops": [
+        {"op": "delete_item", "id": ids["item"]},
+    ]})
+    assert res.json()["version"] == 2
+    with Session(engine) as session:
+        assert session.get(LineItem, ids["item"]) is None
+
+def test_ops_insert_then_delete_in_one_batch(env):
+    client, engine, ids = env
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": [
+        {"op": "upsert_item", "id": "temp", "grouping_id": ids["grp"], "fields": {"description": "Temp", "total": 5}},
+        {"op": "upsert_item", "id": "kept", "grouping_id": ids["grp"], "fields": {"description": "Kept", "total": 7}},
+        {"op": "delete_item", "id": "temp"},
+        {"op": "add_grouping", "id": "scratch", "category_id": ids["cat"], "code": "C.9", "name": "Scratch"},
+        {"op": "delete_grouping", "id": "scratch"},
+    ]})
+    assert res.status_code == 200
+    assert res.json()["created"] == ["kept"]
+    with Session(engine) as session:
+        assert session.get(LineItem, "temp") is None
+        assert session.get(LineItem, "kept").total == 7
+        assert session.get(BudgetGrouping, "scratch") is None
+
+def test_stale_version_conflicts(env):
+    client, engine, ids = env
+    ops = [{"op": "upsert_item", "id": ids["item"], "fields": {"rate": 99}}]
+    assert client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": ops}).status_code == 200
+
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": [
+        {"op": "upsert_item", "id": ids["item"], "fields": {"rate": 1}},
+    ]})
+    assert res.status_code == 409
+    assert res.json()["detail"]["version"] == 1
+    with Session(engine) as session:
+        assert session.get(LineItem, ids["item"]).rate == 99
+
+def test_stale_delta_cannot_undo_item_delete(env):
+    client, engine, ids = env
+    assert client.delete(f"/api/budget/items/{ids['item']}").status_code == 200
+    assert client.get(f"/api/budgets/{ids['budget']}").headers["X-Budget-Version"] == "1"
+
+    # A client still at version 0 re-sends the deleted item
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": [
+        {"op": "upsert_item", "id": ids["item"], "grouping_id": ids["grp"], "fields": {"description": "Tape", "rate": 10}},
+    ]})
+    assert res.status_code == 409
+    assert res.json()["detail"]["version"] == 1
+    with Session(engine) as session:
+        assert session.get(LineItem, ids["item"]) is None
+
+def test_tree_writes_outside_ops_bump_version(env):
+    client, engine, ids = env
+    assert client.patch(f"/api/budget/groupings/{ids['grp']}", json={"name": "Camera Dept"}).status_code == 200
+    res = client.post("/api/budget/items", json={"description": "Gaffer Tape", "rate": 5, "quantity": 2, "grouping_id": ids["grp"]})
+    assert res.status_code == 200
+    with Session(engine) as session:
+        versions = {b.name: b.version for b in session.exec(select(Budget)).all()}
+    assert versions == {"v1": 2, "other": 0}
+
+def test_full_save_bumps_version(env):
+    client, engine, ids = env
+    res = client.post("/api/budget", json={"categories": [{"id": ids["cat"], "name": "Crew Renamed", "groupings": []}]})
+    assert res.status_code == 200
+    with Session(engine) as session:
+        assert session.get(Budget, ids["budget"]).version == 1
+
+def test_delete_only_save_bumps_version(env):
+    client, engine, ids = env
+    res = client.post("/api/budget", json={"categories": [], "deleted_item_ids": [ids["item"]]})
+    assert res.status_code == 200
+    with Session(engine) as session:
+        versions = {b.name: b.version for b in session.exec(select(Budget)).all()}
+    assert versions == {"v1": 1, "other": 0}
+
+    res = client.post("/api/budget", json={"categories": [], "deleted_grouping_ids": [ids["other_grp"]]})
+    assert res.status_code == 200
+    with Session(engine) as session:
+        versions = {b.name: b.version for b in session.exec(select(Budget)).all()}
+    assert versions == {"v1": 1, "other": 1}
+
+def test_ops_cannot_touch_other_budgets(env):
+    client, engine, ids = env
+    res = client.post(f"/api/budgets/{ids['budget']}/ops", json={"version": 0, "ops": [
+        {"op": "upsert_item", "grouping_id": ids["other_grp"], "fields": {"description": "Sneaky"}},
+    ]})
+    assert res.status_code == 400
+    with Session(engine) as session:
+        # Rolled back: version unchanged, nothing inserted
+        assert session.get(Budget, ids["budget"]).version == 0
+        assert session.exec(select(LineItem).where(LineItem.description == "Sneaky")).first() is None
+
+    assert client.post("/api/budgets/missing/ops", json={"version": 0, "ops": []}).status_code == 404
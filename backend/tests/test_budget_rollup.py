@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+from models import BudgetCategory, BudgetGrouping, BudgetRollup, LineItem
+from budget_rollup import item_phase_costs
+
+def _breakdown(pre, shoot, post):
+    return json.dumps({"preProd": {"cost": pre}, "shoot": {"cost": shoot}, "postProd": {"cost": post}})
+
+@pytest.fixture
+def env(budget_env):
+    camera = budget_env.grouping_id
+    with Session(budget_env.engine) as session:
+        equip = BudgetCategory(code="D", name="Equipment", budget_id=budget_env.budget_id)
+        session.add(equip)
+        session.flush()
+        lenses = BudgetGrouping(code="D.1", name="Lenses", category_id=equip.id)
+        session.add(lenses)
+        session.flush()
+        # Written directly: no rollups exist yet, the summary builds them
+        session.add_all([
+            LineItem(description="DOP", total=600, breakdown_json=_breakdown(100, 400, 100), grouping_id=camera),
+            LineItem(description="Focus", total=300, breakdown_json="not json", grouping_id=camera),
+            LineItem(description="Primes", total=200, grouping_id=lenses.id),
+        ])
+        session.commit()
+        ids = {"project": budget_env.project_id, "camera": camera, "lenses": lenses.id, "crew": budget_env.category_id}
+    return budget_env.client, budget_env.engine, ids
+
+def _summary(client, project_id):
+    res = client.get(f"/api/projects/{project_id}/summary")
+    assert res.status_code == 200
+    body = res.json()
+    return (
+        body["total_cost"],
+        {d["name"]: d["total"] for d in body["department_breakdown"]},
+        {p["name"]: p["total"] for p in body["phase_breakdown"]},
+    )
+
+def test_item_phase_costs():
+    assert item_phase_costs(50, None)["other"] == 50
+    assert item_phase_costs(50, "{bad")["other"] == 50
+    assert item_phase_costs(50, _breakdown(1, 2, 3)) == {"pre_prod": 1, "shoot": 2, "post_prod": 3, "other": 0}
+
+def test_summary_built_from_rollups(env):
+    client, engine, ids = env
+    total, depts, phases = _summary(client, ids["project"])
+    assert total == 1100
+    assert depts == {"Crew": 900, "Equipment": 200}
+    assert phases == {"Pre-Production": 100, "Shoot": 400, "Post-Production": 100, "Other": 500}
+    with Session(engine) as session:
+        assert len(session.exec(select(BudgetRollup)).all()) == 2
+
+def test_rollups_follow_item_writes(env):
+    client, engine, ids = env
+    _summary(client, ids["project"])
+
+    res = client.post("/api/budget/items", json={"description": "Zoom", "rate": 50, "quantity": 2, "grouping_id": ids["lenses"]})
+    item_id = res.json()["id"]
+    assert _summary(client, ids["project"])[1]["Equipment"] == 300
+
+    client.delete(f"/api/budget/items/{item_id}")
+    assert _summary(client, ids["project"])[1]["Equipment"] == 200
+
+    with Session(engine) as session:
+        dop = session.exec(select(LineItem).where(LineItem.description == "DOP")).one()
+    client.post("/api/budget", json={"categories": [{"id": ids["crew"], "name": "Crew", "groupings": [
+        {"id": ids["camera"], "name": "Camera", "items": [
+            {"id": dop.id, "description": "DOP", "total": 800, "breakdown_json": _breakdown(100, 600, 100)}
+        ]}
+    ]}]})
+    total, depts, phases = _summary(client, ids["project"])
+    assert depts["Crew"] == 1100 and phases["Shoot"] == 600
+
+    client.post("/api/budget", json={"categories": [], "deleted_grouping_ids": [ids["camera"]]})
+    total, depts, _ = _summary(client, ids["project"])
+    assert total == 200 and depts["Crew"] == 0
@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from models import Budget, BudgetCategory, BudgetGrouping, LineItem
+
+@pytest.fixture
+def env(budget_env):
+    with Session(budget_env.engine) as session:
+        second = BudgetGrouping(code="C.2", name="Grip", category_id=budget_env.category_id)
+        session.add(second)
+        session.flush()
+        grp_ids = [budget_env.grouping_id, second.id]
+        for grp_id in grp_ids:
+            session.add_all([
+                LineItem(description=f"Item {i}", rate=10, unit="day", grouping_id=grp_id) for i in range(100)
+            ])
+        session.commit()
+    return budget_env.client, budget_env.engine, (budget_env.category_id, grp_ids)
+
+def _payload(engine, cat_id):
+    """The tree as the frontend would send it back."""
+    with Session(engine) as session:
+        groupings = []
+        for grp in session.exec(select(BudgetGrouping).order_by(BudgetGrouping.code)).all():
+            items = session.exec(select(LineItem).where(LineItem.grouping_id == grp.id)).all()
+            groupings.append({"id": grp.id, "name": grp.name, "items": [
+                {"id": i.id, "description": i.description, "rate": i.rate, "unit": i.unit,
+                 "total": i.total, "labor_phases_json": i.labor_phases_json,
+                 "daily_hours": i.daily_hours, "days_per_week": i.days_per_week} for i in items
+            ]})
+        return {"categories": [{"id": cat_id, "name": "Crew", "groupings": groupings}]}
+
+def _post(client, engine, payload):
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.post("/api/budget", json=payload)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 200
+    return statements
+
+def test_unchanged_save_only_reads(env):
+    client, engine, (cat_id, _) = env
+    statements = _post(client, engine, _payload(engine, cat_id))
+    assert not [s for s in statements if s.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE"))]
+    # One prefetch per table, independent of the number of items
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 3
+
+def test_changes_are_written_in_bulk(env):
+    client, engine, (cat_id, grp_ids) = env
+    payload = _payload(engine, cat_id)
+    items = payload["categories"][0]["groupings"][0]["items"]
+    for item in items[:10]:
+        item["rate"] = 99
+    deleted = [i["id"] for i in items[10:20]]
+    del items[10:20]
+    items.append({"description": "New Item", "rate": 5})
+    payload["deleted_item_ids"] = deleted
+
+    statements = _post(client, engine, payload)
+    writes = [s for s in statements if s.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE"))]
+    # Derived tables (rollups, phase costs) are maintained alongside
+    writes = [s for s in writes if "budgetrollup" not in s and "lineitemphasecost" not in s]
+    assert len(writes) == 4 # one DELETE, version bump, one executemany UPDATE, one INSERT
+
+    with Session(engine) as session:
+        rows = session.exec(select(LineItem).where(LineItem.grouping_id == grp_ids[0])).all()
+        assert len(rows) == 91
+        assert sum(1 for r in rows if r.rate == 99) == 10
+        new = next(r for r in rows if r.description == "New Item")
+        assert new.unit == "day"
+
+def test_deleted_grouping_detaches_items(env):
+    client, engine, (cat_id, grp_ids) = env
+    res = client.post("/api/budget", json={"categories": [], "deleted_grouping_ids": [grp_ids[1]]})
+    assert res.status_code == 200
+    with Session(engine) as session:
+        assert session.get(BudgetGrouping, grp_ids[1]) is None
+        orphans = session.exec(select(LineItem).where(LineItem.grouping_id == None)).all()
+        assert len(orphans) == 100
+
+def test_budget_tree_uses_constant_queries(env):
+    client, engine, (cat_id, grp_ids) = env
+    with Session(engine) as session:
+        budget_id = session.get(BudgetCategory, cat_id).budget_id
+        expected = [g.model_dump() for g in session.exec(select(BudgetGrouping)).all()]
+        item = session.exec(select(LineItem)).first().model_dump()
+        project_id = session.get(Budget, budget_id).project_id
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.get(f"/api/projects/{project_id}/budget")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 200
+    assert len(statements) == 4 # budget lookup + one query per table
+
+    tree = res.json()
+    groupings = tree[0]["groupings"]
+    assert [g["id"] for g in groupings] == [g["id"] for g in expected]
+    assert groupings[0]["items"][0].keys() == item.keys()
+    assert groupings[0]["sub_total"] == 0 and tree[0]["total"] == 0
+    assert sum(len(g["items"]) for g in groupings) == 200
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from models import BudgetCategory, BudgetGrouping, LineItem, ProjectFringeSettings
+from fringe_settings import clear_fringe_cache
+from budget_summary import _fringe_sums_by_row
+
+@pytest.fixture
+def env(budget_env):
+    clear_fringe_cache()
+    engine = budget_env.engine
+    with Session(engine) as session:
+        session.add(ProjectFringeSettings(project_id=budget_env.project_id, contingency=5.0))
+        grouping_ids = {"C": budget_env.grouping_id}
+        for code in ("A", "B", "D"):
+            cat = BudgetCategory(code=code, name=code, budget_id=budget_env.budget_id)
+            session.add(cat)
+            session.flush()
+            grp = BudgetGrouping(code=f"{code}.1", name=code, category_id=cat.id)
+            session.add(grp)
+            session.flush()
+            grouping_ids[code] = grp.id
+        for code, grp_id in sorted(grouping_ids.items()):
+            fringes = {"super": 10.0, "holiday_pay": 4.0, "payroll_tax": 5.0, "workers_comp": 1.0, "total_fringes": 20.0}
+            session.add(LineItem(description=f"{code} labor", is_labor=True, total=120, fringes_json=json.dumps(fringes), grouping_id=grp_id))
+            session.add(LineItem(description=f"{code} gear", total=80, grouping_id=grp_id))
+        # Unreadable fringes are skipped
+        session.add(LineItem(description="bad", total=0, fringes_json="{oops", grouping_id=grouping_ids["D"]))
+        session.commit()
+    yield budget_env.client, engine, budget_env.budget_id
+    clear_fringe_cache()
+
+def test_summary_in_one_aggregate(env):
+    client, engine, budget_id = env
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.get(f"/api/summary/{budget_id}")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 200
+    assert len([s for s in statements if "lineitem" in s]) == 1
+
+    summary = res.json()
+    assert summary["atl_total"] == 400
+    assert summary["btl_total"] == 400
+    assert summary["fringes_total"] == 80
+    assert summary["fringe_breakdown"] == {"super": 40, "holiday_pay": 16, "payroll_tax": 20, "workers_comp": 4}
+    assert summary["contingency_total"] == 20 # 5% of BTL
+    assert summary["grand_total"] == 800 # item totals, as before contingency was applied
+    assert summary["total_with_contingency"] == 820
+
+    assert client.get("/api/summary").json()["total_with_contingency"] == 820
+
+def test_fringe_sums_by_row_skip_unreadable_rows(env):
+    _, engine, budget_id = env
+    with Session(engine) as session:
+        grp_id = session.exec(select(BudgetGrouping.id)).first()
+        session.add(LineItem(description="list", total=0, fringes_json="[1, 2]", grouping_id=grp_id))
+        session.add(LineItem(description="text", total=0, fringes_json='{"super": "n/a"}', grouping_id=grp_id))
+        session.commit()
+        # The PostgreSQL fallback when the JSON cast fails
+        sums = _fringe_sums_by_row(session, budget_id, ("super", "total_fringes"))
+    assert sums == [40.0, 80.0]
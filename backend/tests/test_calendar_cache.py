@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import date, datetime
+from sqlmodel import Session
+
+from models import Project, ProductionCalendar, CalendarDay
+import calendar_cache
+from calendar_cache import (
+    bump_calendar_version, clear_calendar_cache, get_grouping_calendar, get_project_calendar
+)
+
+@pytest.fixture
+def session(db_engine):
+    clear_calendar_cache()
+    with Session(db_engine) as session:
+        yield session
+
+def _add_shoot_day(session, project_id, day: date, hours: float = 10.0):
+    cal = ProductionCalendar(project_id=project_id, phase="SHOOT", default_hours=hours)
+    session.add(cal)
+    session.flush()
+    session.add(CalendarDay(calendar_id=cal.id, date=datetime.combine(day, datetime.min.time()),
+                            phase="SHOOT", day_type="WEEKDAY"))
+    session.commit()
+
+def test_project_calendar_cached_until_version_bump(session):
+    project = Project(name="Cache Test")
+    session.add(project)
+    session.commit()
+    _add_shoot_day(session, project.id, date(2026, 5, 11))
+
+    first = get_project_calendar(session, project.id)
+    assert first["shoot"] == (10.0, (date(2026, 5, 11),))
+    assert first["preProd"] == (8.0, ())
+
+    # A DB change without a version bump is not seen (served from cache)
+    _add_shoot_day(session, project.id, date(2026, 5, 12), hours=12.0)
+    assert get_project_calendar(session, project.id) is first
+
+    bump_calendar_version(project.id)
+    assert get_project_calendar(session, project.id) is not first
+
+def test_grouping_overrides_cached_by_content(session):
+    project = Project(name="Override Test")
+    session.add(project)
+    session.commit()
+    _add_shoot_day(session, project.id, date(2026, 5, 11))
+
+    overrides = {"shoot": {"inherit": False, "defaultHours": 12, "dates": ["2026-05-13", "2026-05-12Z"]}}
+    a = get_grouping_calendar(session, project.id, overrides)
+    b = get_grouping_calendar(session, project.id, {"shoot": dict(overrides["shoot"])})
+    assert a is b
+    assert a["shoot"] == (12.0, (date(2026, 5, 12), date(2026, 5, 13)))
+
+    # Inheriting phases are left untouched
+    inherited = get_grouping_calendar(session, project.id, {"shoot": {"inherit": True, "defaultHours": 6}})
+    assert inherited["shoot"] == (10.0, (date(2026, 5, 11),))
+
+    bump_calendar_version(project.id)
+    assert not any(key[0] == project.id for key in calendar_cache._grouping_calendars)
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from classification_index import ClassificationIndex
+
+SECTIONS = [
+    {"name": "Crew", "classifications": [
+        {"classification": "Senior Camera Operator", "hourly_rate": 55.0},
+        {"classification": "Camera Operator", "hourly_rate": 48.0},
+        {"classification": "Camera Operator", "hourly_rate": 48.0}, # duplicate row
+        {"classification": "Operator Assistant", "hourly_rate": 35.0},
+        {"classification": "Broken Row", "hourly_rate": 0},
+    ]},
+    {"name": "Category E - Artists", "classifications": [
+        {"classification": "camera operator", "hourly_rate": 60.0},
+        {"classification": "Cooperative Lead", "hourly_rate": 40.0},
+    ]},
+]
+
+def test_exact_lookup_is_case_insensitive_and_first_wins():
+    index = ClassificationIndex(SECTIONS)
+    found = index.find("  CAMERA   operator ")
+    assert found["base_hourly"] == 48.0
+    assert found["section_name"] == "Crew"
+    assert index.find("Broken Row") is None
+    assert index.find("Gaffer") is None
+
+def test_search_ranks_exact_then_prefix_then_word_then_substring():
+    index = ClassificationIndex(SECTIONS)
+    names = [(r["classification"], r["hourly_rate"]) for r in index.search("operat")]
+    # Prefix, then word matches (shorter first), then the in-word match
+    assert names == [
+        ("Operator Assistant", 35.0),
+        ("Camera Operator", 48.0),
+        ("camera operator", 60.0),
+        ("Senior Camera Operator", 55.0),
+        ("Cooperative Lead", 40.0),
+    ]
+    assert index.search("camera operator", limit=1)[0]["hourly_rate"] == 48.0
+    assert index.search("op", limit=2)[0]["classification"] == "Operator Assistant"
+    assert index.search("xyz") == []
+
+def test_search_large_payguide_is_fast():
+    roles = ["camera operator", "sound recordist", "grip", "gaffer", "editor"]
+    sections = [{"name": f"Section {s}", "classifications": [
+        {"classification": f"Grade {i} {role} level {s}", "hourly_rate": 30 + i % 40}
+        for i, role in enumerate(roles * 200)
+    ]} for s in range(5)]
+    index = ClassificationIndex(sections)
+    assert len(index) > 4000
+
+    # Every query is distinct, so none is answered from the ranked-results cache
+    queries = [f"grade {i} {roles[i % 5]}" for i in range(100)]
+    start = time.perf_counter()
+    for query in queries:
+        assert index.search(query)
+    per_query = (time.perf_counter() - start) / len(queries)
+    assert per_query < 0.01
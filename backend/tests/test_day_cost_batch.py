@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import itertools
+import pytest
+from rate_lookup_service import RateLookupService
+
+@pytest.fixture
+def service():
+    return RateLookupService()
+
+def test_batch_matches_scalar_rules(service):
+    # Every rule set x day type x holiday flag over a spread of hours (incl. < 4h minimum call)
+    combos = list(itertools.product(
+        [2.0, 4.0, 7.6, 8.0, 9.6, 10.0, 12.5],
+        ["WEEKDAY", "SATURDAY", "SUNDAY"],
+        [False, True],
+        [False, True],
+        [False, True]
+    ))
+
+    batch = service.calculate_day_costs_batch(
+        hours=[c[0] for c in combos],
+        day_types=[c[1] for c in combos],
+        is_holiday=[c[2] for c in combos],
+        is_casual=[c[3] for c in combos],
+        is_artist=[c[4] for c in combos],
+        base_rates=50.0
+    )
+
+    for (hours, day_type, is_holiday, is_casual, is_artist), cost in zip(combos, batch):
+        expected = service.calculate_day_cost(
+            classification="Manual",
+            hours=hours,
+            day_type=day_type,
+            is_holiday=is_holiday,
+            override_base_rate=50.0,
+            override_is_casual=is_casual,
+            override_section_name="Category E" if is_artist else "Crew"
+        )["day_cost"]
+        assert cost == pytest.approx(expected), (hours, day_type, is_holiday, is_casual, is_artist)
+
+def test_batch_broadcasts_item_scalars(service):
+    # Crew casual Sat 8h @ $50 -> $708.75, Sun 8h -> $810.0
+    costs = service.calculate_day_costs_batch(
+        hours=[8.0, 8.0],
+        day_types=["SATURDAY", "SUNDAY"],
+        is_holiday=False,
+        is_casual=True,
+        is_artist=False,
+        base_rates=50.0
+    )
+    assert costs.tolist() == [708.75, 810.0]
+
+def test_batch_empty(service):
+    costs = service.calculate_day_costs_batch([], [], [], [], [], [])
+    assert costs.shape == (0,)
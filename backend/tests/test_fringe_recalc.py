@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+import fringe_settings
+from fringe_settings import FringeSettings, clear_fringe_cache
+from models import BudgetRollup, LineItem
+from labor_calculator_service import _calculate_fringes
+
+@pytest.fixture
+def env(budget_env, tmp_path, monkeypatch):
+    monkeypatch.setattr(fringe_settings, "FRINGE_SETTINGS_FILE", str(tmp_path / "fringe_settings.json"))
+    clear_fringe_cache()
+    grp_id = budget_env.grouping_id
+    defaults = FringeSettings()
+    with Session(budget_env.engine) as session:
+        for name, gross, casual in [("DOP", 5321.37, False), ("Runner", 1234.55, True)]:
+            fringes = _calculate_fringes(gross, casual, defaults)
+            session.add(LineItem(
+                id=name, description=name, is_labor=True, is_casual=casual, grouping_id=grp_id,
+                total=gross + fringes["total_fringes"], fringes_json=json.dumps(fringes)
+            ))
+        # Uncosted labor and material lines are left alone
+        session.add(LineItem(id="Quote", description="Quote", is_labor=True, total=500, grouping_id=grp_id))
+        session.add(LineItem(id="Tape", description="Tape", total=80, grouping_id=grp_id))
+        session.commit()
+    yield budget_env.client, budget_env.engine, budget_env.project_id
+    clear_fringe_cache()
+
+def test_settings_change_reapplies_fringes(env):
+    client, engine, _ = env
+    new = FringeSettings(superannuation=12.0, holiday_pay=5.0)
+    assert client.post("/api/settings", json=new.model_dump()).status_code == 200
+
+    with Session(engine) as session:
+        items = {i.id: i for i in session.exec(select(LineItem)).all()}
+        for name, gross, casual in [("DOP", 5321.37, False), ("Runner", 1234.55, True)]:
+            expected = _calculate_fringes(gross, casual, new)
+            assert json.loads(items[name].fringes_json) == expected
+            assert items[name].total == pytest.approx(gross + expected["total_fringes"])
+        assert json.loads(items["Runner"].fringes_json)["holiday_pay"] == 0
+        assert (items["Quote"].total, items["Tape"].total) == (500, 80)
+        assert session.exec(select(BudgetRollup)).one().total == pytest.approx(sum(i.total for i in items.values()))
+
+def test_unchanged_rates_are_a_no_op(env):
+    client, engine, project_id = env
+    res = client.post(f"/api/projects/{project_id}/recalculate", params={"mode": "fringes"})
+    assert res.status_code == 200
+    job = client.get(f"/api/jobs/{res.json()['job_id']}").json()
+    assert (job["status"], job["mode"], job["updated"]) == ("completed", "fringes", 0)
+    assert client.post(f"/api/projects/{project_id}/recalculate", params={"mode": "bogus"}).status_code == 400
+
+def test_project_overrides(env):
+    client, engine, project_id = env
+    res = client.put(f"/api/projects/{project_id}/settings", json={"workers_comp": 3.0})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["settings"]["workers_comp"] == 3.0
+    assert body["settings"]["superannuation"] == FringeSettings().superannuation
+    assert body["overrides"]["superannuation"] is None
+    # The recompute runs as a background job (TestClient runs it before returning)
+    assert client.get(f"/api/jobs/{body['job_id']}").json()["updated"] == 2
+
+    with Session(engine) as session:
+        dop = session.get(LineItem, "DOP")
+        assert json.loads(dop.fringes_json) == _calculate_fringes(5321.37, False, FringeSettings(workers_comp=3.0))
+
+    # A global change keeps the project's override and updates what it inherits
+    client.post("/api/settings", json=FringeSettings(superannuation=12.0).model_dump())
+    settings = client.get(f"/api/projects/{project_id}/settings").json()["settings"]
+    assert (settings["superannuation"], settings["workers_comp"]) == (12.0, 3.0)
+    with Session(engine) as session:
+        dop = session.get(LineItem, "DOP")
+        expected = _calculate_fringes(5321.37, False, FringeSettings(superannuation=12.0, workers_comp=3.0))
+        assert json.loads(dop.fringes_json) == expected
+
+    # Clearing the overrides falls back to the globals
+    client.put(f"/api/projects/{project_id}/settings", json={})
+    settings = client.get(f"/api/projects/{project_id}/settings").json()["settings"]
+    assert settings["workers_comp"] == FringeSettings().workers_comp
@@ -0,0 +1,126 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+from datetime import date, datetime
+
+import pytest
+from holiday_service import NSWHolidayService
+from holiday_rules import HolidayCalendar, easter_sunday
+
+def _write_cache(path, holidays):
+    with open(path, 'w') as f:
+        json.dump({"cached_at": datetime.now().isoformat(), "holidays": holidays}, f)
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    svc = NSWHolidayService(base_dir=str(tmp_path))
+    monkeypatch.setattr(svc, "_fetch_from_api", lambda: pytest.fail("API should not be called"))
+    _write_cache(svc.cache_path, [
+        {"date": "20250101", "name": "New Year's Day", "jurisdiction": "nsw"},
+        {"date": "2025-04-25", "name": "Anzac Day", "jurisdiction": "nsw"},
+        {"date": "20251225", "name": "Christmas Day", "jurisdiction": "nsw"},
+    ])
+    return svc
+
+def test_range_and_point_lookups(service):
+    in_range = service.get_holidays_in_range(date(2025, 1, 1), date(2025, 4, 25))
+    assert [h["name"] for h in in_range] == ["New Year's Day", "Anzac Day"]
+    assert in_range[1]["date_obj"] == date(2025, 4, 25)
+
+    assert service.is_holiday(date(2025, 12, 25))
+    assert not service.is_holiday(date(2025, 12, 24))
+    # 2026 is outside the cached feed, so the name comes from the HolidayCalendar rules
+    assert service.get_holiday_name(date(2026, 1, 26)) == "Australia Day"
+    assert service.get_holidays_in_range(date(2025, 5, 1), date(2025, 5, 31)) == []
+
+def test_index_reloads_only_when_cache_file_changes(service, monkeypatch):
+    loads = []
+    original = service._load_cache
+    monkeypatch.setattr(service, "_load_cache", lambda **kw: loads.append(1) or original(**kw))
+
+    for _ in range(3):
+        service.is_holiday(date(2025, 1, 1))
+    assert len(loads) == 1
+
+    _write_cache(service.cache_path, [{"date": "20250127", "name": "Australia Day", "jurisdiction": "nsw"}])
+    os.utime(service.cache_path, (0, 12345))
+    assert service.get_holiday_name(date(2025, 1, 27)) == "Australia Day"
+    assert not service.is_holiday(date(2025, 1, 1))
+    assert len(loads) == 2
+
+def test_easter_computus():
+    assert easter_sunday(2000) == date(2000, 4, 23)
+    assert easter_sunday(2024) == date(2024, 3, 31)
+    assert easter_sunday(2038) == date(2038, 4, 25)
+
+def test_generated_years_match_official_feed():
+    # The bundled data.gov.au cache covers 2021-2025
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nsw_holidays_cache.json")) as f:
+        official = json.load(f)["holidays"]
+    calendar = HolidayCalendar("NSW")
+    for year in range(2021, 2026):
+        expected = {h["date"] for h in official if h["date"].startswith(str(year))}
+        assert {d.strftime("%Y%m%d") for d, _ in calendar.holidays_in_year(year)} == expected
+
+def test_weekend_observance_rules():
+    calendar = HolidayCalendar("NSW")
+    # 2027: Christmas Sat, Boxing Day Sun -> Mon 27 and Tue 28
+    assert calendar.holiday_name(date(2027, 12, 27)) == "Christmas Day (additional day)"
+    assert calendar.holiday_name(date(2027, 12, 28)) == "Boxing Day (additional day)"
+    # 2031: Australia Day is a Sunday and moves to Monday
+    assert not calendar.is_holiday(date(2031, 1, 26))
+    assert calendar.holiday_name(date(2031, 1, 27)) == "Australia Day"
+    # Anzac Day on a Saturday gets no substitute
+    assert calendar.holidays_in_range(date(2026, 4, 25), date(2026, 4, 27)) == [(date(2026, 4, 25), "Anzac Day")]
+
+def test_offline_service_uses_rules_beyond_feed(service):
+    assert service.get_holiday_name(date(2031, 1, 27)) == "Australia Day"
+    # Far outside the precomputed window
+    far = service.get_holidays_in_range(date(2090, 12, 24), date(2091, 1, 2))
+    assert [h["date"] for h in far] == ["2090-12-25", "2090-12-26", "2091-01-01"]
+
+def test_network_source_is_opt_in(tmp_path, monkeypatch):
+    svc = NSWHolidayService(base_dir=str(tmp_path), use_network=True)
+    release = threading.Event()
+    def slow_fetch():
+        release.wait(5)
+        return [{"date": "20270301", "name": "One-off Holiday", "jurisdiction": "nsw"}]
+    monkeypatch.setattr(svc, "_fetch_from_api", slow_fetch)
+    # Cold cache: generated holidays are served while the fetch runs in the background
+    assert svc.is_holiday(date(2027, 1, 1))
+    release.set()
+    svc._refresh_thread.join()
+
+    assert svc.get_holiday_name(date(2027, 3, 1)) == "One-off Holiday"
+    # The official list replaces the generated year it covers
+    assert not svc.is_holiday(date(2027, 1, 1))
+    assert os.path.exists(svc.cache_path)
+
+def test_expired_cache_is_served_while_refreshing(tmp_path, monkeypatch):
+    svc = NSWHolidayService(base_dir=str(tmp_path), use_network=True)
+    with open(svc.cache_path, 'w') as f:
+        json.dump({"cached_at": "2020-01-01T00:00:00", "holidays": [
+            {"date": "20250303", "name": "Stale Holiday", "jurisdiction": "nsw"}
+        ]}, f)
+
+    release = threading.Event()
+    def slow_fetch():
+        release.wait(5)
+        return [{"date": "20250304", "name": "Fresh Holiday", "jurisdiction": "nsw"}]
+    monkeypatch.setattr(svc, "_fetch_from_api", slow_fetch)
+
+    # Answered from the stale cache without waiting for the API
+    assert svc.get_holiday_name(date(2025, 3, 3)) == "Stale Holiday"
+    assert svc._refresh_thread.is_alive()
+    svc.is_holiday(date(2025, 3, 3)) # no second refresh while one is running
+
+    release.set()
+    svc._refresh_thread.join()
+    assert svc.get_holiday_name(date(2025, 3, 4)) == "Fresh Holiday"
+    assert not svc.is_holiday(date(2025, 3, 3))
+    with open(svc.cache_path) as f:
+        assert json.load(f)["holidays"][0]["name"] == "Fresh Holiday"
+    assert [p for p in os.listdir(tmp_path) if p.endswith(".tmp")] == []
@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from main import app, get_session
+from models import Project
+from calendar_cache import clear_calendar_cache
+
+@pytest.fixture
+def client(db_engine):
+    engine = db_engine
+    clear_calendar_cache()
+
+    def override_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    with Session(engine) as session:
+        project = Project(name="Batch Test")
+        session.add(project)
+        session.commit()
+        project_id = project.id
+    yield TestClient(app), project_id
+    app.dependency_overrides.clear()
+
+def test_batch_matches_single_calls(client):
+    client, project_id = client
+    res = client.post(f"/api/projects/{project_id}/calendar", json={
+        "phases": {"shoot": {"defaultHours": 10, "dates": ["2026-05-08", "2026-05-09", "2026-05-10", "2026-05-11"]}}
+    })
+    assert res.status_code == 200
+
+    reqs = [
+        {"base_hourly_rate": 40 + i, "is_casual": i % 2 == 0, "is_artist": i % 3 == 0, "project_id": project_id}
+        for i in range(6)
+    ]
+    batch = client.post(f"/api/projects/{project_id}/calculate-labor-cost/batch", json=reqs)
+    assert batch.status_code == 200
+    results = batch.json()
+    assert len(results) == len(reqs)
+
+    for req, result in zip(reqs, results):
+        single = client.post("/api/calculate-labor-cost", json=req).json()
+        assert result == single
+
+def test_batch_uses_path_project(client):
+    client, project_id = client
+    res = client.post(f"/api/projects/{project_id}/calculate-labor-cost/batch",
+                      json=[{"base_hourly_rate": 50, "is_casual": False, "project_id": "other"}])
+    assert res.status_code == 200
+    # No calendar on the project -> inherit-mode defaults (10 prep / 20 shoot / 10 post days)
+    assert res.json()[0]["breakdown"]["shoot"]["days"] == 20
+
+def test_batch_unknown_project(client):
+    client, _ = client
+    res = client.post("/api/projects/missing/calculate-labor-cost/batch", json=[])
+    assert res.status_code == 404
+
+def test_batch_malformed_item_fails_alone(client):
+    client, project_id = client
+    reqs = [
+        {"base_hourly_rate": 50, "is_casual": False, "project_id": project_id},
+        {"base_hourly_rate": 50, "is_casual": False, "project_id": project_id, "calendar_mode": "custom",
+         "phase_details": {"shoot": {"inherit": False, "defaultHours": "ten"}}},
+        {"base_hourly_rate": 60, "is_casual": True, "project_id": project_id},
+    ]
+    res = client.post(f"/api/projects/{project_id}/calculate-labor-cost/batch", json=reqs)
+    assert res.status_code == 200
+    good, bad, other = res.json()
+
+    assert bad["error"] and bad["total_cost"] == 0 and bad["breakdown"] == {}
+    assert good["error"] is None and good["breakdown"]["shoot"]["days"] == 20
+    assert other["error"] is None
+    assert good == client.post("/api/calculate-labor-cost", json=reqs[0]).json()
+    assert client.post("/api/calculate-labor-cost", json=reqs[1]).status_code == 500
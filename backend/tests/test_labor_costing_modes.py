@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import date, timedelta
+from sqlmodel import Session
+
+import models  # noqa: F401 - registers tables
+from calendar_cache import clear_calendar_cache
+from labor_calculator_service import LaborCostRequest, calculate_labor_cost, calculate_labor_costs_batch
+from main import FringeSettings
+
+@pytest.fixture
+def session(db_engine):
+    clear_calendar_cache()
+    with Session(db_engine) as session:
+        yield session
+
+def _dates(start: date, count: int):
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+def _request(mode: str, is_casual: bool = False, is_artist: bool = False) -> LaborCostRequest:
+    # Four months of post plus an Easter shoot week (weekends + public holidays)
+    return LaborCostRequest(
+        base_hourly_rate=45.0,
+        is_casual=is_casual,
+        is_artist=is_artist,
+        project_id="no-project",
+        calendar_mode="custom",
+        costing_mode=mode,
+        phase_details={
+            "shoot": {"inherit": False, "defaultHours": 11, "dates": _dates(date(2026, 3, 30), 9)},
+            "postProd": {"inherit": False, "defaultHours": 8, "dates": _dates(date(2026, 6, 1), 120)}
+        }
+    )
+
+@pytest.mark.parametrize("is_casual,is_artist", [(False, False), (True, False), (False, True), (True, True)])
+def test_histogram_matches_daily(session, is_casual, is_artist):
+    fringes = FringeSettings()
+    daily = calculate_labor_cost(session, _request("daily", is_casual, is_artist), fringes)
+    hist = calculate_labor_cost(session, _request("histogram", is_casual, is_artist), fringes)
+
+    assert hist.total_cost == daily.total_cost
+    assert hist.fringes == daily.fringes
+    for phase in ("preProd", "shoot", "postProd"):
+        assert hist.breakdown[phase]["days"] == daily.breakdown[phase]["days"]
+        assert hist.breakdown[phase]["cost"] == daily.breakdown[phase]["cost"]
+
+def test_histogram_prices_day_classes_once(session):
+    res = calculate_labor_cost(session, _request("histogram"), FringeSettings())
+    classes = res.breakdown["postProd"]["day_classes"]
+
+    # 120 consecutive days collapse to a handful of (day type, holiday) classes
+    assert len(classes) <= 6
+    assert sum(c["days"] for c in classes) == 120
+    assert "details" not in res.breakdown["postProd"]
+
+def test_batch_mixes_modes(session):
+    reqs = [_request("daily"), _request("histogram", is_casual=True), _request("daily", is_artist=True)]
+    fringes = FringeSettings()
+    batch = calculate_labor_costs_batch(session, reqs, fringes)
+    single = [calculate_labor_cost(session, r, fringes) for r in reqs]
+    assert [r.total_cost for r in batch] == [r.total_cost for r in single]
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+from models import LineItemPhaseCost
+from phase_costs import phase_cost_rows
+
+BREAKDOWN = json.dumps({
+    "preProd": {"days": 2, "cost": 200},
+    "shoot": {"days": 5, "cost": 600, "details": []},
+    "postProd": {"days": 0, "cost": 0}
+})
+FRINGES = json.dumps({"super": 80, "total_fringes": 160})
+
+@pytest.fixture
+def env(budget_env):
+    ids = {"project": budget_env.project_id, "cat": budget_env.category_id, "grp": budget_env.grouping_id}
+    return budget_env.client, budget_env.engine, ids
+
+def test_phase_cost_rows_apportion_fringes():
+    rows = {r["phase"]: r for r in phase_cost_rows("i1", BREAKDOWN, FRINGES)}
+    assert (rows["preProd"]["days"], rows["preProd"]["gross"], rows["preProd"]["fringes"]) == (2, 200, 40)
+    assert rows["shoot"]["fringes"] == 120
+    assert rows["postProd"]["fringes"] == 0
+    assert phase_cost_rows("i1", None, None) == []
+    assert phase_cost_rows("i1", "not json", None) == []
+
+def test_saves_keep_phase_rows_in_sync(env):
+    client, engine, ids = env
+    item = {"id": "dop", "description": "DOP", "is_labor": True, "total": 960,
+            "breakdown_json": BREAKDOWN, "fringes_json": FRINGES}
+    tree = {"categories": [{"id": ids["cat"], "name": "Crew", "groupings": [
+        {"id": ids["grp"], "name": "Camera", "items": [item]}
+    ]}]}
+    assert client.post("/api/budget", json=tree).status_code == 200
+
+    res = client.get(f"/api/projects/{ids['project']}/phase-costs")
+    cells = {c["phase"]: c for c in res.json()}
+    assert cells["shoot"] == {"department": "Crew", "phase": "shoot", "days": 5, "gross": 600, "fringes": 120}
+
+    item["breakdown_json"] = json.dumps({"shoot": {"days": 1, "cost": 100}})
+    assert client.post("/api/budget", json=tree).status_code == 200
+    with Session(engine) as session:
+        rows = session.exec(select(LineItemPhaseCost)).all()
+        assert [(r.phase, r.gross, r.fringes) for r in rows] == [("shoot", 100, 160)]
+
+    client.delete("/api/budget/items/dop")
+    with Session(engine) as session:
+        assert session.exec(select(LineItemPhaseCost)).all() == []
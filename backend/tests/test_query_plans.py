@@ -0,0 +1,209 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, select
+
+import models  # noqa: F401 (registers the tables)
+from database import build_engine, run_migrations
+from main import app, get_session
+from models import (
+    Project, ProjectPhase, Budget, BudgetCategory, BudgetGrouping, LineItem,
+    ProductionCalendar, CalendarDay
+)
+from budget_tree import load_budget_tree
+from budget_save import fetch_by_ids
+from budget_rollup import refresh_grouping_rollups, ensure_project_rollups, project_category_rollups
+from budget_summary import calculate_budget_summary
+from phase_costs import sync_phase_costs, project_phase_matrix
+from role_search import find_roles
+
+# Query plans are SQLite's; the migration chain itself is checked on the same backend
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL", "sqlite://").startswith("sqlite"),
+    reason="EXPLAIN QUERY PLAN is SQLite-specific"
+)
+
+FK_INDEXES = {
+    ("projectphase", "ix_projectphase_project_id"),
+    ("budget", "ix_budget_project_id"),
+    ("budgetcategory", "ix_budgetcategory_budget_id"),
+    ("budgetgrouping", "ix_budgetgrouping_category_id"),
+    ("lineitem", "ix_lineitem_grouping_id"),
+    ("calendarday", "ix_calendarday_date"),
+}
+
+def _index_names(engine, table):
+    return {ix["name"] for ix in sa.inspect(engine).get_indexes(table)}
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'plans.db'}", echo=False)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+def test_migrations_build_the_schema_with_indexes(migrated_engine):
+    with migrated_engine.connect() as conn:
+        assert conn.execute(sa.text("SELECT version_num FROM alembic_version")).scalar() == "0007"
+    assert set(SQLModel.metadata.tables) <= set(sa.inspect(migrated_engine).get_table_names())
+    for table, index in FK_INDEXES:
+        assert index in _index_names(migrated_engine, table)
+
+def _is_model_table(name, type_, parent_names):
+    # Skips the role search FTS5 tables, as alembic/env.py does
+    return not (type_ == "table" and name.startswith("rolehistory_fts"))
+
+def test_migrations_match_the_models(migrated_engine):
+    # Revisions declare their own schema; a model change needs a revision to go with it
+    with migrated_engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": _is_model_table})
+        assert compare_metadata(context, SQLModel.metadata) == []
+
+def test_migrations_upgrade_a_pre_alembic_database(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'legacy.db'}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Shape of a database from before the chain: no FK indexes, no version, duplicate roles
+        for table, index in FK_INDEXES:
+            conn.execute(sa.text(f"DROP INDEX {index}"))
+        conn.execute(sa.text("ALTER TABLE budget DROP COLUMN version"))
+        conn.execute(sa.text("DROP INDEX ix_rolehistory_role_name"))
+        conn.execute(sa.text("CREATE INDEX ix_rolehistory_role_name ON rolehistory (role_name)"))
+        for role_id, used, count in (("r1", "2026-01-01", 2), ("r2", "2026-02-01", 3)):
+            conn.execute(sa.text(
+                "INSERT INTO rolehistory (id, role_name, base_rate, unit, project_id, last_used_at, usage_count) "
+                "VALUES (:id, 'Gaffer', 60, 'day', 'p1', :used, :count)"
+            ), {"id": role_id, "used": used, "count": count})
+        conn.execute(sa.text("INSERT INTO budget (id, name, status, total_amount) VALUES ('b1', 'v1', 'DRAFT', 0)"))
+        # An item saved before breakdowns were compacted and phase costs normalized
+        details = [
+            {"date": f"2026-03-0{d}", "day_type": "WEEKDAY", "is_holiday": False, "hours": 10,
+             "base_cost": 400.0, "total_day_cost": 400.0, "multiplier": 1.0}
+            for d in (2, 3)
+        ]
+        conn.execute(LineItem.__table__.insert().values(
+            id="i1", description="DOP", total=800,
+            breakdown_json=json.dumps({"shoot": {"days": 2, "cost": 800.0, "details": details}})
+        ))
+
+    run_migrations(engine)
+    run_migrations(engine) # Already at head: no-op
+
+    for table, index in FK_INDEXES:
+        assert index in _index_names(engine, table)
+    with engine.connect() as conn:
+        assert conn.execute(sa.text("SELECT version FROM budget WHERE id = 'b1'")).scalar() == 0
+        assert conn.execute(sa.text("SELECT id, usage_count FROM rolehistory")).all() == [("r2", 5)]
+        breakdown = json.loads(conn.execute(sa.text("SELECT breakdown_json FROM lineitem WHERE id = 'i1'")).scalar())
+        assert "details" not in breakdown["shoot"] and breakdown["shoot"]["cost"] == 800.0
+        assert conn.execute(sa.text("SELECT phase, days, gross FROM lineitemphasecost")).all() == [("shoot", 2, 800.0)]
+    # Roles saved before the search index existed are in it
+    with Session(engine) as session:
+        assert [r.id for r in find_roles(session, "gaffer")] == ["r2"]
+    engine.dispose()
+
+# --- Query plans ---
+
+# "SCAN lineitem" / "SCAN lineitem USING COVERING INDEX ..." walk the whole table;
+# "SEARCH ..." lines use an index and subquery/temp b-tree lines aren't table reads
+SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+def _full_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    tables = set(SQLModel.metadata.tables)
+    return [row[-1] for row in plan if (m := SCAN_RE.match(row[-1])) and m.group(1) in tables]
+
+@pytest.fixture
+def seeded(migrated_engine):
+    with Session(migrated_engine) as session:
+        project = Project(name="Plans")
+        session.add(project)
+        session.flush()
+        start = datetime(2026, 3, 2)
+        session.add(ProjectPhase(project_id=project.id, name="Shoot", type="SHOOT", start_date=start, end_date=start + timedelta(days=4)))
+        budget = Budget(name="v1", project_id=project.id)
+        session.add(budget)
+        session.flush()
+        category = BudgetCategory(code="C", name="Crew", budget_id=budget.id)
+        session.add(category)
+        session.flush()
+        grouping = BudgetGrouping(code="C.1", name="Camera", category_id=category.id)
+        session.add(grouping)
+        session.flush()
+        item = LineItem(
+            description="DOP", total=1150, grouping_id=grouping.id,
+            breakdown_json=json.dumps({"shoot": {"days": 2, "cost": 1000}}),
+            fringes_json=json.dumps({"total_fringes": 150})
+        )
+        session.add(item)
+        calendar = ProductionCalendar(project_id=project.id, phase="SHOOT")
+        session.add(calendar)
+        session.flush()
+        session.add_all([
+            CalendarDay(calendar_id=calendar.id, date=start + timedelta(days=n), phase="SHOOT", day_type="WEEKDAY")
+            for n in range(5)
+        ])
+        session.commit()
+        ids = {"project": project.id, "budget": budget.id, "grouping": grouping.id, "item": item.id}
+    return migrated_engine, ids
+
+def _capture(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", record)
+
+def test_core_queries_use_indexes(seeded):
+    engine, ids = seeded
+    statements, stop = _capture(engine)
+
+    def override_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    try:
+        with Session(engine) as session:
+            load_budget_tree(session, ids["budget"])
+            calculate_budget_summary(session, ids["budget"])
+            fetch_by_ids(session, LineItem, [ids["item"]])
+            refresh_grouping_rollups(session, [ids["grouping"]])
+            sync_phase_costs(session, [ids["item"]])
+            session.commit()
+            ensure_project_rollups(session, ids["project"])
+            project_category_rollups(session, ids["project"])
+            project_phase_matrix(session, ids["project"])
+            # Day lookup of calculate-schedule-cost
+            session.exec(select(CalendarDay).where(CalendarDay.date == datetime(2026, 3, 3))).first()
+
+        client = TestClient(app)
+        assert client.get(f"/api/projects/{ids['project']}/budget").status_code == 200
+        assert client.get(f"/api/projects/{ids['project']}/phases").status_code == 200
+        assert client.get(f"/api/projects/{ids['project']}/calendar").status_code == 200
+    finally:
+        stop()
+        app.dependency_overrides.clear()
+
+    assert len(statements) > 10
+    scans = {}
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            found = _full_scans(conn, statement, parameters)
+            if found:
+                scans[" ".join(statement.split())] = found
+    assert scans == {}
@@ -0,0 +1,236 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlmodel import Session, delete, select, update
+
+from models import Budget, BudgetGrouping, LineItem
+from calendar_cache import clear_calendar_cache
+from recalc_engine import RecalcGraph, build_cost_request, project_phase_dependencies, recalculate_nodes
+from labor_calculator_service import calculate_labor_costs_batch
+from parallel_recalc import bulk_write_results, cost_nodes_parallel
+from recalc_jobs import create_job, run_recalc_job
+from fringe_settings import get_global_fringe_settings
+
+FULL_OVERRIDE = {"inherit": False, "defaultHours": 9, "dates": ["2026-03-02"]}
+
+def test_dependencies_inherit_item_reads_every_phase():
+    assert project_phase_dependencies("inherit", {}, {}) == {"preProd", "shoot", "postProd"}
+
+def test_dependencies_fully_custom_item_is_independent():
+    details = {phase: dict(FULL_OVERRIDE) for phase in ("preProd", "shoot", "postProd")}
+    assert project_phase_dependencies("custom", details, {}) == frozenset()
+
+def test_dependencies_partial_override_still_reads_project():
+    # Dates only: hours still come from the project calendar
+    details = {"shoot": {"inherit": False, "dates": ["2026-03-02"]}}
+    assert "shoot" in project_phase_dependencies("custom", details, {})
+    # Hours on the grouping + dates on the item together shadow the phase
+    grp = {"shoot": {"inherit": False, "defaultHours": 12}}
+    assert project_phase_dependencies("custom", details, grp) == {"preProd", "postProd"}
+
+def test_dependencies_override_dates_disable_fallback():
+    # Grouping supplies shoot dates, so inherit-mode defaults can't kick in
+    grp = {"shoot": dict(FULL_OVERRIDE)}
+    assert project_phase_dependencies("inherit", {}, grp) == {"preProd", "postProd"}
+
+@pytest.fixture
+def env(budget_env):
+    engine = budget_env.engine
+    clear_calendar_cache()
+    with Session(engine) as session:
+        shoot_grp = BudgetGrouping(code="C.2", name="Grip", category_id=budget_env.category_id,
+                                   calendar_overrides={"shoot": dict(FULL_OVERRIDE)})
+        session.add(shoot_grp)
+        session.flush()
+        grp_id = budget_env.grouping_id
+        items = {
+            "inherit": LineItem(description="DOP", is_labor=True, base_hourly_rate=60, grouping_id=grp_id),
+            "custom": LineItem(description="Consultant", is_labor=True, base_hourly_rate=80, grouping_id=grp_id,
+                               calendar_mode="custom",
+                               phase_details={p: dict(FULL_OVERRIDE) for p in ("preProd", "shoot", "postProd")}),
+            "grip": LineItem(description="Key Grip", is_labor=True, base_hourly_rate=50, grouping_id=shoot_grp.id,
+                             phase_details={"preProd": dict(FULL_OVERRIDE)}),
+        }
+        for item in items.values():
+            session.add(item)
+        session.commit()
+        ids = {k: v.id for k, v in items.items()}
+
+    return budget_env.client, engine, budget_env.project_id, ids
+
+def _totals(engine, ids):
+    with Session(engine) as session:
+        return {k: session.get(LineItem, v).total for k, v in ids.items()}
+
+def test_calendar_change_only_touches_dependent_items(env):
+    client, engine, project_id, ids = env
+    calendar = {"phases": {
+        "preProd": {"defaultHours": 8, "dates": ["2026-05-01"]},
+        "shoot": {"defaultHours": 10, "dates": ["2026-05-11", "2026-05-12"]},
+        "postProd": {"defaultHours": 8, "dates": ["2026-06-01"]},
+    }}
+    assert client.post(f"/api/projects/{project_id}/calendar", json=calendar).status_code == 200
+    first = _totals(engine, ids)
+    # First save changes every phase: inherit + grip items recalculated, fully custom item untouched
+    assert first["inherit"] > 0 and first["grip"] > 0
+    assert first["custom"] == 0
+
+    # Only the shoot phase changes: the grip item's shoot comes from its grouping (prep from itself)
+    calendar["phases"]["shoot"]["dates"].append("2026-05-13")
+    with Session(engine) as session:
+        grip = session.get(LineItem, ids["grip"])
+        grip.total = -1
+        session.add(grip)
+        session.commit()
+    assert client.post(f"/api/projects/{project_id}/calendar", json=calendar).status_code == 200
+    second = _totals(engine, ids)
+    assert second["inherit"] > first["inherit"]
+    assert second["grip"] == -1
+
+    # full_recalc forces every calendar-driven item through the engine
+    assert client.post(f"/api/projects/{project_id}/calendar?full_recalc=true", json=calendar).status_code == 200
+    third = _totals(engine, ids)
+    assert third["grip"] == first["grip"]
+    assert third["custom"] > 0
+
+def test_calendar_recalc_runs_as_job(env):
+    client, engine, project_id, ids = env
+    calendar = {"phases": {"shoot": {"defaultHours": 10, "dates": ["2026-05-11", "2026-05-12"]}}}
+    res = client.post(f"/api/projects/{project_id}/calendar", json=calendar)
+    job_id = res.json()["job_id"]
+
+    # TestClient runs background tasks before returning the response
+    job = client.get(f"/api/jobs/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["phases_changed"] == ["shoot"]
+    assert job["total"] == job["processed"] == job["updated"] == 1
+    assert job["progress"] == 1.0
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+def test_recalc_job_commits_in_chunks(env):
+    _, engine, project_id, ids = env
+    job = create_job(project_id)
+    run_recalc_job(job.id, engine, get_global_fringe_settings(), full_recalc=True, chunk_size=1)
+
+    assert job.status == "completed"
+    assert job.total == 3 and job.chunks_committed == 3
+    assert _totals(engine, ids)["custom"] > 0
+    # Each committed chunk invalidates delta saves based on the older tree
+    with Session(engine) as session:
+        assert session.exec(select(Budget.version)).one() == 3
+
+def test_recalc_job_skips_items_deleted_mid_job(env, monkeypatch):
+    _, engine, project_id, ids = env
+    import recalc_jobs
+
+    def recalc_then_delete_others(session, project_id, nodes, *args):
+        updated = recalculate_nodes(session, project_id, nodes, *args)
+        # Another request deletes the items of the later chunks before this chunk commits
+        kept = [node.item.id for node in nodes]
+        session.exec(delete(LineItem).where(LineItem.id.not_in(kept)).execution_options(synchronize_session=False))
+        monkeypatch.setattr(recalc_jobs, "recalculate_nodes", recalculate_nodes)
+        return updated
+
+    monkeypatch.setattr(recalc_jobs, "recalculate_nodes", recalc_then_delete_others)
+    job = create_job(project_id)
+    run_recalc_job(job.id, engine, get_global_fringe_settings(), full_recalc=True, chunk_size=1)
+
+    assert job.status == "completed" and job.error is None
+    assert job.total == job.processed == 3
+    assert job.updated == 1 and job.failed == 2
+    assert job.chunks_committed == 3
+
+def test_parallel_job_costs_each_chunk_from_current_rows(env, monkeypatch):
+    _, engine, project_id, ids = env
+    import recalc_jobs
+
+    def write_then_edit_others(session, nodes, *args):
+        updated = bulk_write_results(session, nodes, *args)
+        # A save lands between chunks: the later chunks must be costed with the new rate
+        kept = [node.item.id for node in nodes]
+        session.exec(
+            update(LineItem).where(LineItem.id.not_in(kept)).values(base_hourly_rate=500)
+            .execution_options(synchronize_session=False)
+        )
+        monkeypatch.setattr(recalc_jobs, "bulk_write_results", bulk_write_results)
+        return updated
+
+    monkeypatch.setattr(recalc_jobs, "bulk_write_results", write_then_edit_others)
+    monkeypatch.setattr(recalc_jobs, "PARALLEL_MIN_ITEMS", 0)
+    job = create_job(project_id, workers=2)
+    run_recalc_job(job.id, engine, get_global_fringe_settings(), full_recalc=True, chunk_size=1)
+    assert job.status == "completed" and job.chunks_committed == 2
+    after_job = _totals(engine, ids)
+
+    again = create_job(project_id)
+    run_recalc_job(again.id, engine, get_global_fringe_settings(), full_recalc=True)
+    assert _totals(engine, ids) == after_job
+
+class RecordingPool(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        RecordingPool.submitted += 1
+        return super().submit(*args, **kwargs)
+
+def test_parallel_job_submits_chunks_to_the_pool(env, monkeypatch):
+    _, engine, project_id, ids = env
+    import recalc_jobs
+    monkeypatch.setattr(recalc_jobs, "ProcessPoolExecutor", RecordingPool)
+    RecordingPool.submitted = 0
+
+    # Fewer dirty items than the threshold: costed in-process, no pool started
+    job = create_job(project_id, workers=2)
+    run_recalc_job(job.id, engine, get_global_fringe_settings(), full_recalc=True)
+    assert job.status == "completed" and job.updated == 3
+    assert RecordingPool.submitted == 0
+    serial = _totals(engine, ids)
+
+    # At the threshold every chunk is sharded, whatever the chunk size
+    monkeypatch.setattr(recalc_jobs, "PARALLEL_MIN_ITEMS", 3)
+    job = create_job(project_id, workers=2)
+    run_recalc_job(job.id, engine, get_global_fringe_settings(), full_recalc=True)
+    assert job.status == "completed" and job.updated == 3
+    assert RecordingPool.submitted == 2
+    assert _totals(engine, ids) == serial
+
+def test_recalc_job_records_item_errors(env):
+    client, engine, project_id, ids = env
+    with Session(engine) as session:
+        item = session.get(LineItem, ids["custom"])
+        item.phase_details = {"shoot": {"inherit": False, "defaultHours": "ten"}}
+        session.add(item)
+        session.commit()
+
+    res = client.post(f"/api/projects/{project_id}/recalculate")
+    job = client.get(f"/api/jobs/{res.json()['job_id']}").json()
+    assert job["status"] == "completed"
+    assert job["updated"] == 2 and job["failed"] == 1
+    assert list(job["item_errors"]) == [ids["custom"]]
+
+def recalculate_costs(session, project_id, nodes):
+    reqs = [build_cost_request(node, project_id) for node in nodes]
+    return calculate_labor_costs_batch(session, reqs, get_global_fringe_settings())
+
+def test_parallel_costing_matches_serial(env):
+    client, engine, project_id, ids = env
+    calendar = {"phases": {"shoot": {"defaultHours": 11, "dates": ["2026-05-09", "2026-05-11", "2026-06-08"]}}}
+    client.post(f"/api/projects/{project_id}/calendar", json=calendar)
+
+    with Session(engine) as session:
+        nodes = RecalcGraph.build(session, project_id).nodes
+        serial = recalculate_costs(session, project_id, nodes)
+        parallel = cost_nodes_parallel(session, project_id, nodes, get_global_fringe_settings(), workers=2, min_items=0)
+    assert [r.model_dump() for r in parallel] == [r.model_dump() for r in serial]
+
+def test_recalculate_endpoint_bulk_writes(env):
+    client, engine, project_id, ids = env
+    res = client.post(f"/api/projects/{project_id}/recalculate?workers=2")
+    job = client.get(f"/api/jobs/{res.json()['job_id']}").json()
+    assert job["status"] == "completed" and job["updated"] == 3
+    assert all(total > 0 for total in _totals(engine, ids).values())
+    assert client.post("/api/projects/missing/recalculate").status_code == 404
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from models import RoleHistory
+from role_history import RoleUsage, upsert_role_history
+
+@pytest.fixture
+def env(budget_env):
+    ids = (budget_env.project_id, budget_env.category_id, budget_env.grouping_id)
+    return budget_env.client, budget_env.engine, ids
+
+def _roles(engine):
+    with Session(engine) as session:
+        return {r.role_name: r for r in session.exec(select(RoleHistory)).all()}
+
+def test_upsert_merges_and_accumulates(env):
+    _, engine, _ = env
+    with Session(engine) as session:
+        upsert_role_history(session, [
+            RoleUsage("Grip", 40.0, "day", "p1"),
+            RoleUsage("Gaffer", 55.0, "day", "p1"),
+            RoleUsage("Grip", 42.0, "week", "p2"),
+        ])
+        session.commit()
+        upsert_role_history(session, [RoleUsage("Grip", 45.0, "day", "p3"), RoleUsage("", 1.0, "day", "p3")])
+        session.commit()
+
+    roles = _roles(engine)
+    assert set(roles) == {"Grip", "Gaffer"}
+    assert roles["Grip"].usage_count == 3
+    assert (roles["Grip"].base_rate, roles["Grip"].unit, roles["Grip"].project_id) == (45.0, "day", "p3")
+    assert roles["Gaffer"].usage_count == 1
+
+def test_save_budget_issues_constant_role_queries(env):
+    client, engine, (project_id, cat_id, grp_id) = env
+    items = [
+        {"description": f"Role {i % 50}", "is_labor": True, "base_hourly_rate": 40 + i, "unit": "day"}
+        for i in range(150)
+    ] + [{"description": "Tape", "is_labor": False, "rate": 10, "unit": "allow"}]
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.post("/api/budget", json={"categories": [
+            {"id": cat_id, "name": "Crew", "groupings": [{"id": grp_id, "name": "Camera", "items": items}]}
+        ]})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 200
+
+    role_statements = [s for s in statements if "rolehistory" in s.lower()]
+    assert len(role_statements) == 1
+
+    roles = _roles(engine)
+    assert len(roles) == 50
+    assert roles["Role 7"].usage_count == 3
+    assert roles["Role 7"].base_rate == 40 + 107 # last item with that name wins
+    assert roles["Role 7"].project_id == project_id
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from main import app, get_session
+from models import RoleHistory
+from role_search import build_match_query, find_roles
+
+# The index is an SQLite FTS5 table; other backends only have the LIKE fallback
+sqlite_only = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL", "sqlite://").startswith("sqlite"),
+    reason="Role search index is SQLite FTS5"
+)
+
+@pytest.fixture
+def engine(db_engine):
+    engine = db_engine
+    with Session(engine) as session:
+        session.add(RoleHistory(role_name="Camera Operator", base_rate=55, unit="hour", project_id="p1", usage_count=3))
+        session.commit()
+    return engine
+
+def _names(roles):
+    return [r.role_name for r in roles]
+
+def test_match_query():
+    assert build_match_query("Key grip", "trigram") == '"key" AND "grip"'
+    assert build_match_query("1st grip", "trigram") == '"1st" AND "grip"'
+    # Trigrams can't match a 2-char token; the query goes to the LIKE fallback
+    assert build_match_query("1st AD", "trigram") is None
+    assert build_match_query("1st AD", "unicode61") == '"1st"* AND "ad"*'
+    assert build_match_query('" * -', "unicode61") is None
+    assert build_match_query('"OR"', "unicode61") == '"or"*' # quoted, not an operator
+
+@sqlite_only
+def test_token_and_substring_matching(engine):
+    with Session(engine) as session:
+        session.add(RoleHistory(role_name="Steadicam Operator", base_rate=80, unit="hour", project_id="p1"))
+        session.add(RoleHistory(role_name="Key Grip", base_rate=50, unit="hour", project_id="p1"))
+        session.commit()
+
+        assert _names(find_roles(session, "operator")) == ["Camera Operator", "Steadicam Operator"]
+        assert _names(find_roles(session, "oper camera")) == ["Camera Operator"]
+        # Substring inside a word (trigram) and short queries (LIKE fallback)
+        assert _names(find_roles(session, "dicam")) == ["Steadicam Operator"]
+        assert _names(find_roles(session, "Gr")) == ["Key Grip"]
+        assert find_roles(session, "gaffer") == []
+
+@sqlite_only
+def test_short_tokens_still_match(engine):
+    with Session(engine) as session:
+        session.add(RoleHistory(role_name="1st AD", base_rate=90, unit="hour", project_id="p1"))
+        session.add(RoleHistory(role_name="2nd AD", base_rate=70, unit="hour", project_id="p1"))
+        session.add(RoleHistory(role_name="1st AC", base_rate=60, unit="hour", project_id="p1"))
+        session.commit()
+
+        assert _names(find_roles(session, "1st AD")) == ["1st AD"]
+        assert set(_names(find_roles(session, "AD"))) == {"1st AD", "2nd AD"}
+        assert set(_names(find_roles(session, "1st"))) == {"1st AD", "1st AC"}
+
+@sqlite_only
+def test_index_stays_in_sync(engine):
+    with Session(engine) as session:
+        role = session.exec(select(RoleHistory)).first()
+        role.role_name = "Focus Puller"
+        session.add(role)
+        session.commit()
+        assert find_roles(session, "camera") == []
+        assert _names(find_roles(session, "focus")) == ["Focus Puller"]
+
+        session.delete(role)
+        session.commit()
+        assert find_roles(session, "focus") == []
+
+@sqlite_only
+def test_score_combines_usage_and_recency(engine):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.add(RoleHistory(role_name="Sound Recordist", base_rate=60, unit="hour", project_id="p1",
+                                usage_count=1, last_used_at=now - timedelta(days=700)))
+        session.add(RoleHistory(role_name="Sound Assistant", base_rate=40, unit="hour", project_id="p2",
+                                usage_count=25, last_used_at=now))
+        session.commit()
+        assert _names(find_roles(session, "sound")) == ["Sound Assistant", "Sound Recordist"]
+        # An exact name always wins
+        assert _names(find_roles(session, "sound recordist")) == ["Sound Recordist"]
+        assert _names(find_roles(session, "sound", limit=1)) == ["Sound Assistant"]
+
+@sqlite_only
+def test_search_endpoint(engine):
+    def override_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    try:
+        client = TestClient(app)
+        res = client.get("/api/roles/search", params={"q": "camera"})
+        assert res.status_code == 200
+        assert [r["role_name"] for r in res.json()] == ["Camera Operator"]
+    finally:
+        app.dependency_overrides.clear()
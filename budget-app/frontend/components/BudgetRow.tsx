@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { createPortal } from 'react-dom';
 import { motion } from 'framer-motion';
-import { Search, Lock, Unlock, Check, Trash, Info, Calendar } from 'lucide-react';
+import { Search, Lock, Unlock, Check, Trash, Info, Calendar, AlertCircle } from 'lucide-react';
 import { BudgetLineItem, CatalogItem } from '@/lib/api';
 import CasualToggle from './CasualToggle';
 import { useLaborContextSafe, CalendarData } from '@/lib/labor-context';
@@ -18,9 +18,11 @@ interface Props {
     onExpandInspector: () => void;
     // Optional: Trigger parent recalc if needed (though we try to handle it here)
     onRecalc?: (overrides?: Partial<BudgetLineItem>) => void;
+    // Why the last backend costing of this row failed, if it did
+    costError?: string;
 }
 
-export default function BudgetRow({ item, onChange, onDelete, onExpandInspector, onRecalc }: Props) {
+export default function BudgetRow({ item, onChange, onDelete, onExpandInspector, onRecalc, costError }: Props) {
     const isLabor = item.is_labor;
     const laborContext = useLaborContextSafe();
     const [isLookupOpen, setIsLookupOpen] = useState(false);
@@ -194,6 +196,12 @@ export default function BudgetRow({ item, onChange, onDelete, onExpandInspector,
                         LINKED
                     </span>
                 )}
+
+                {costError && (
+                    <span className="text-red-500 mr-1" title={`Cost not updated: ${costError}`}>
+                        <AlertCircle className="w-3 h-3" />
+                    </span>
+                )}
             </div>
 
             {/* 2. Rate & Unit (Span 2) */}
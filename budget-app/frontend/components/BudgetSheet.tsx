@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { fetchBudget, BudgetCategory, BudgetGrouping, BudgetLineItem, addBudgetLineItem, deleteBudgetLineItem, CatalogItem, calculateLaborRate, createTemplate } from "@/lib/api";
+import { fetchBudget, BudgetCategory, BudgetGrouping, BudgetLineItem, addBudgetLineItem, deleteBudgetLineItem, CatalogItem, calculateLaborRate, calculateLaborCost, calculateLaborCostBatch, createTemplate, LaborCostRequest, LaborCostResponse } from "@/lib/api";
 import { useLaborContext } from "@/lib/labor-context";
 import { motion, AnimatePresence } from "framer-motion";
 import CatalogSearch from "@/components/CatalogSearch";
@@ -51,6 +51,9 @@ export default function BudgetSheet({ projectId, activeTab: propActiveTab, categ
     const [deletedGroupingIds, setDeletedGroupingIds] = useState<string[]>([]);
     const [deletedCategoryIds, setDeletedCategoryIds] = useState<string[]>([]);
 
+    // Per-row backend costing errors (item id -> message)
+    const [costErrors, setCostErrors] = useState<Record<string, string>>({});
+
     // Collapsed Categories State
     const [collapsedCategories, setCollapsedCategories] = useState<Record<string, boolean>>({});
 
@@ -99,18 +102,21 @@ export default function BudgetSheet({ projectId, activeTab: propActiveTab, categ
         if (!groupingOverrides || Object.keys(groupingOverrides).length === 0) return;
 
         // Find items that are in 'inherit' mode and belong to a group with active overrides
+        const targets: { catIdx: number, grpIdx: number, itemIdx: number }[] = [];
         categories.forEach((cat, catIdx) => {
             cat.groupings.forEach((grp, grpIdx) => {
                 if (groupingOverrides[grp.id]) {
                     grp.items.forEach((item, itemIdx) => {
                         // If item is inheriting, it should be recalculated when its parent group changes
                         if (item.calendar_mode === 'inherit') {
-                            handleItemRecalc(catIdx, grpIdx, itemIdx);
+                            targets.push({ catIdx, grpIdx, itemIdx });
                         }
                     });
                 }
             });
         });
+        // One request for all of them rather than one per item
+        recalcItems(targets);
     }, [groupingOverrides]);
 
     const handleInitiateAdd = (groupingId: string) => {
@@ -418,154 +424,187 @@ export default function BudgetSheet({ projectId, activeTab: propActiveTab, categ
         setUnsavedChangesCount(prev => prev + 1);
     };
 
-    const handleItemRecalc = async (catIdx: number, grpIdx: number, itemIdx: number, overrides?: Partial<BudgetLineItem>) => {
-        // Use current state to get baseline, but apply overrides for calc
-        const item = categories[catIdx].groupings[grpIdx].items[itemIdx];
-        if (!item && !overrides) return;
-
-        // Merge current item with overrides for calculation parameters
-        const effectiveItem = { ...item, ...overrides };
+    // Backend costing request for an item: labor is costed in full, day/week materials only sync
+    // their phase days from the calendar. Other items are costed locally (null).
+    const buildCostRequest = (catIdx: number, item: BudgetLineItem): LaborCostRequest | null => {
+        const base = {
+            line_item_id: item.id.startsWith('temp') ? undefined : item.id,
+            calendar_mode: item.calendar_mode || 'inherit',
+            phase_details: item.phase_details,
+            grouping_id: item.grouping_id,
+            project_id: projectId
+        };
+        if (item.is_labor) {
+            return {
+                ...base,
+                base_hourly_rate: item.base_hourly_rate || item.rate || 0,
+                is_casual: item.is_casual || false,
+                is_artist: (categories[catIdx].code === 'E'), // Sync with backend logic
+                award_classification_id: item.award_classification_id
+            } as LaborCostRequest;
+        }
+        if (item.unit === 'day' || item.unit === 'week') {
+            // Reuse the same backend logic but ignore cost specifics
+            return { ...base, base_hourly_rate: 0, is_casual: false, is_artist: false } as LaborCostRequest;
+        }
+        return null;
+    };
 
+    const applyCostResult = (catIdx: number, grpIdx: number, itemIdx: number, effectiveItem: BudgetLineItem, res: LaborCostResponse, overrides?: Partial<BudgetLineItem>) => {
         // 1. Labor Items (Full Recalculation via Backend)
         if (effectiveItem.is_labor) {
-            try {
-                // Construct Request for New API
-                const req = {
-                    line_item_id: effectiveItem.id.startsWith('temp') ? undefined : effectiveItem.id,
-                    base_hourly_rate: effectiveItem.base_hourly_rate || effectiveItem.rate || 0,
-                    is_casual: effectiveItem.is_casual || false,
-                    is_artist: (categories[catIdx].code === 'E'), // Sync with backend logic
-                    calendar_mode: effectiveItem.calendar_mode || 'inherit',
-                    phase_details: effectiveItem.phase_details,
-                    grouping_id: effectiveItem.grouping_id,
-                    project_id: projectId,
-                    award_classification_id: effectiveItem.award_classification_id
-                };
+            // Calculate active total based on enabled phases (qty > 0)
+            let activeGross = 0;
+            const prepQty = Number(effectiveItem.prep_qty) || 0;
+            const shootQty = Number(effectiveItem.shoot_qty) || 0;
+            const postQty = Number(effectiveItem.post_qty) || 0;
+
+            // Sync quantities from backend resolution if in inherit mode
+            const updates: any = {
+                ...overrides,
+            };
 
-                // Call API
-                const { calculateLaborCost } = await import('@/lib/api');
+            if (res.breakdown.preProd) {
+                updates.prep_qty = prepQty > 0 ? res.breakdown.preProd.days : 0;
+                if (prepQty > 0) activeGross += res.breakdown.preProd.cost;
+            }
+            if (res.breakdown.shoot) {
+                updates.shoot_qty = shootQty > 0 ? res.breakdown.shoot.days : 0;
+                if (shootQty > 0) activeGross += res.breakdown.shoot.cost;
+            }
+            if (res.breakdown.postProd) {
+                updates.post_qty = postQty > 0 ? res.breakdown.postProd.days : 0;
+                if (postQty > 0) activeGross += res.breakdown.postProd.cost;
+            }
 
-                const res = await calculateLaborCost(req as any);
+            // Calculate Fringes proportional to ActiveGross
+            let activeFringesObj = res.fringes;
+            let activeFringeAmount = res.fringes.total_fringes || 0;
 
-                // Calculate active total based on enabled phases (qty > 0)
-                let activeGross = 0;
-                const prepQty = Number(effectiveItem.prep_qty) || 0;
-                const shootQty = Number(effectiveItem.shoot_qty) || 0;
-                const postQty = Number(effectiveItem.post_qty) || 0;
+            if (res.total_cost > 0 && activeGross !== res.total_cost) {
+                const ratio = activeGross / res.total_cost;
+                activeFringeAmount = activeFringeAmount * ratio;
 
-                // Sync quantities from backend resolution if in inherit mode
-                const updates: any = {
-                    ...overrides,
+                activeFringesObj = {
+                    super: (res.fringes.super || 0) * ratio,
+                    holiday_pay: (res.fringes.holiday_pay || 0) * ratio,
+                    payroll_tax: (res.fringes.payroll_tax || 0) * ratio,
+                    workers_comp: (res.fringes.workers_comp || 0) * ratio,
+                    total_fringes: activeFringeAmount
                 };
+            }
 
-                if (res.breakdown.preProd) {
-                    updates.prep_qty = prepQty > 0 ? res.breakdown.preProd.days : 0;
-                    if (prepQty > 0) activeGross += res.breakdown.preProd.cost;
-                }
-                if (res.breakdown.shoot) {
-                    updates.shoot_qty = shootQty > 0 ? res.breakdown.shoot.days : 0;
-                    if (shootQty > 0) activeGross += res.breakdown.shoot.cost;
-                }
-                if (res.breakdown.postProd) {
-                    updates.post_qty = postQty > 0 ? res.breakdown.postProd.days : 0;
-                    if (postQty > 0) activeGross += res.breakdown.postProd.cost;
-                }
+            updates.total = activeGross + activeFringeAmount; // INCLUSIVE TOTAL
+            updates.fringes_json = JSON.stringify(activeFringesObj);
+            updates.breakdown_json = JSON.stringify(res.breakdown);
 
-                // Calculate Fringes proportional to ActiveGross
-                let activeFringesObj = res.fringes;
-                let activeFringeAmount = res.fringes.total_fringes || 0;
-
-                if (res.total_cost > 0 && activeGross !== res.total_cost) {
-                    const ratio = activeGross / res.total_cost;
-                    activeFringeAmount = activeFringeAmount * ratio;
-
-                    activeFringesObj = {
-                        super: (res.fringes.super || 0) * ratio,
-                        holiday_pay: (res.fringes.holiday_pay || 0) * ratio,
-                        payroll_tax: (res.fringes.payroll_tax || 0) * ratio,
-                        workers_comp: (res.fringes.workers_comp || 0) * ratio,
-                        total_fringes: activeFringeAmount
-                    };
-                }
+            // For hourly units, maintain rate column as base hourly
+            if (effectiveItem.unit === 'hour') {
+                if (overrides?.base_hourly_rate) updates.rate = overrides.base_hourly_rate;
+            }
 
-                updates.total = activeGross + activeFringeAmount; // INCLUSIVE TOTAL
-                updates.fringes_json = JSON.stringify(activeFringesObj);
-                updates.breakdown_json = JSON.stringify(res.breakdown);
+            updateItemLocal(catIdx, grpIdx, itemIdx, updates);
+            return;
+        }
 
-                // For hourly units, maintain rate column as base hourly
-                if (effectiveItem.unit === 'hour') {
-                    if (overrides?.base_hourly_rate) updates.rate = overrides.base_hourly_rate;
-                }
+        // 2. Material Items (Quantity Sync via Backend)
+        const updates: any = { ...overrides };
+        if (res.breakdown.preProd) {
+            updates.prep_qty = (effectiveItem.prep_qty || 0) > 0 ? res.breakdown.preProd.days : 0;
+        }
+        if (res.breakdown.shoot) {
+            updates.shoot_qty = (effectiveItem.shoot_qty || 0) > 0 ? res.breakdown.shoot.days : 0;
+        }
+        if (res.breakdown.postProd) {
+            updates.post_qty = (effectiveItem.post_qty || 0) > 0 ? res.breakdown.postProd.days : 0;
+        }
 
-                updateItemLocal(catIdx, grpIdx, itemIdx, updates);
-            } catch (err) {
-                console.error("Error calculating labor rate", err);
-                if (overrides) updateItemLocal(catIdx, grpIdx, itemIdx, overrides);
-            }
+        // Local Recalc for Materials
+        const totalDays = (updates.prep_qty || 0) + (updates.shoot_qty || 0) + (updates.post_qty || 0);
+        if (effectiveItem.unit === 'day') {
+            updates.total = effectiveItem.rate * totalDays;
+        } else {
+            const dpw = effectiveItem.days_per_week || 5.0;
+            updates.total = effectiveItem.rate * (totalDays / dpw);
         }
-        // 2. Material Items (Quantity Sync via Backend)
-        else if (effectiveItem.unit === 'day' || effectiveItem.unit === 'week') {
-            try {
-                // Reuse the same backend logic but ignore cost specifics
-                const req = {
-                    line_item_id: effectiveItem.id.startsWith('temp') ? undefined : effectiveItem.id,
-                    base_hourly_rate: 0,
-                    is_casual: false,
-                    is_artist: false,
-                    calendar_mode: effectiveItem.calendar_mode || 'inherit',
-                    phase_details: effectiveItem.phase_details,
-                    grouping_id: effectiveItem.grouping_id,
-                    project_id: projectId
-                };
 
-                const { calculateLaborCost } = await import('@/lib/api');
-                const res = await calculateLaborCost(req as any);
+        // Construct Breakdown for persistence
+        const mat_breakdown = {
+            preProd: {
+                days: res.breakdown.preProd ? res.breakdown.preProd.days : 0,
+                cost: (res.breakdown.preProd ? res.breakdown.preProd.days : 0) * effectiveItem.rate
+            },
+            shoot: {
+                days: res.breakdown.shoot ? res.breakdown.shoot.days : 0,
+                cost: (res.breakdown.shoot ? res.breakdown.shoot.days : 0) * effectiveItem.rate
+            },
+            postProd: {
+                days: res.breakdown.postProd ? res.breakdown.postProd.days : 0,
+                cost: (res.breakdown.postProd ? res.breakdown.postProd.days : 0) * effectiveItem.rate
+            }
+        };
+        updates.breakdown_json = JSON.stringify(mat_breakdown);
 
-                const updates: any = { ...overrides };
-                if (res.breakdown.preProd) {
-                    updates.prep_qty = (effectiveItem.prep_qty || 0) > 0 ? res.breakdown.preProd.days : 0;
-                }
-                if (res.breakdown.shoot) {
-                    updates.shoot_qty = (effectiveItem.shoot_qty || 0) > 0 ? res.breakdown.shoot.days : 0;
-                }
-                if (res.breakdown.postProd) {
-                    updates.post_qty = (effectiveItem.post_qty || 0) > 0 ? res.breakdown.postProd.days : 0;
-                }
+        updateItemLocal(catIdx, grpIdx, itemIdx, updates);
+    };
 
-                // Local Recalc for Materials
-                const totalDays = (updates.prep_qty || 0) + (updates.shoot_qty || 0) + (updates.post_qty || 0);
-                if (effectiveItem.unit === 'day') {
-                    updates.total = effectiveItem.rate * totalDays;
-                } else {
-                    const dpw = effectiveItem.days_per_week || 5.0;
-                    updates.total = effectiveItem.rate * (totalDays / dpw);
-                }
+    // Record which rows the last costing failed for (ids not in `errors` are cleared)
+    const setRowCostErrors = (itemIds: string[], errors: Record<string, string>) => {
+        setCostErrors(prev => {
+            const next = { ...prev };
+            itemIds.forEach(id => delete next[id]);
+            return { ...next, ...errors };
+        });
+    };
 
-                // Construct Breakdown for persistence
-                const mat_breakdown = {
-                    preProd: {
-                        days: res.breakdown.preProd ? res.breakdown.preProd.days : 0,
-                        cost: (res.breakdown.preProd ? res.breakdown.preProd.days : 0) * effectiveItem.rate
-                    },
-                    shoot: {
-                        days: res.breakdown.shoot ? res.breakdown.shoot.days : 0,
-                        cost: (res.breakdown.shoot ? res.breakdown.shoot.days : 0) * effectiveItem.rate
-                    },
-                    postProd: {
-                        days: res.breakdown.postProd ? res.breakdown.postProd.days : 0,
-                        cost: (res.breakdown.postProd ? res.breakdown.postProd.days : 0) * effectiveItem.rate
-                    }
-                };
-                updates.breakdown_json = JSON.stringify(mat_breakdown);
+    const handleItemRecalc = async (catIdx: number, grpIdx: number, itemIdx: number, overrides?: Partial<BudgetLineItem>) => {
+        // Use current state to get baseline, but apply overrides for calc
+        const item = categories[catIdx].groupings[grpIdx].items[itemIdx];
+        if (!item && !overrides) return;
 
-                updateItemLocal(catIdx, grpIdx, itemIdx, updates);
-            } catch (err) {
-                console.error("Error syncing material calendar", err);
-                if (overrides) updateItemLocal(catIdx, grpIdx, itemIdx, overrides);
-            }
-        } else {
+        // Merge current item with overrides for calculation parameters
+        const effectiveItem = { ...item, ...overrides };
+        const req = buildCostRequest(catIdx, effectiveItem);
+        if (!req) {
             // Passthrough for flat rates etc
             if (overrides) updateItemLocal(catIdx, grpIdx, itemIdx, overrides);
+            return;
+        }
+
+        try {
+            const res = await calculateLaborCost(req);
+            applyCostResult(catIdx, grpIdx, itemIdx, effectiveItem, res, overrides);
+            setRowCostErrors([effectiveItem.id], {});
+        } catch (err) {
+            console.error(effectiveItem.is_labor ? "Error calculating labor rate" : "Error syncing material calendar", err);
+            if (overrides) updateItemLocal(catIdx, grpIdx, itemIdx, overrides);
+        }
+    };
+
+    // Re-cost many rows in one batch request; a row the backend couldn't cost keeps its values and shows the error
+    const recalcItems = async (targets: { catIdx: number, grpIdx: number, itemIdx: number }[]) => {
+        const rows = targets
+            .map(t => {
+                const item = categories[t.catIdx].groupings[t.grpIdx].items[t.itemIdx];
+                return { ...t, item, req: buildCostRequest(t.catIdx, item) };
+            })
+            .filter(row => row.req !== null);
+        if (rows.length === 0) return;
+
+        try {
+            const results = await calculateLaborCostBatch(projectId, rows.map(row => row.req as LaborCostRequest));
+            const errors: Record<string, string> = {};
+            results.forEach((res, i) => {
+                const { catIdx, grpIdx, itemIdx, item } = rows[i];
+                if (res.error) {
+                    errors[item.id] = res.error;
+                } else {
+                    applyCostResult(catIdx, grpIdx, itemIdx, item, res);
+                }
+            });
+            setRowCostErrors(rows.map(row => row.item.id), errors);
+        } catch (err) {
+            console.error("Error recalculating items", err);
         }
     };
 
@@ -753,6 +792,7 @@ export default function BudgetSheet({ projectId, activeTab: propActiveTab, categ
                                                                         onDelete={() => handleDelete(item.id)}
                                                                         onExpandInspector={() => setInspectorItem({ catIdx: catGlobalIdx, grpIdx, itemIdx })}
                                                                         onRecalc={(overrides) => handleItemRecalc(catGlobalIdx, grpIdx, itemIdx, overrides)}
+                                                                        costError={costErrors[item.id]}
                                                                     />
                                                                 ))}
                                                             </AnimatePresence>
@@ -84,7 +84,8 @@ export interface BudgetSummary {
   btl_total: number;
   fringes_total: number;
   contingency_total: number;
-  grand_total: number;
+  grand_total: number; // ATL + BTL, before contingency
+  total_with_contingency: number;
   fringe_breakdown: Record<string, number>;
 }
 // ...
@@ -174,6 +175,7 @@ export interface LaborCostResponse {
   total_cost: number;
   breakdown: Record<string, any>;
   fringes: FringeBreakdown;
+  error?: string; // Set on a batch result the backend couldn't cost; the other fields are empty
 }
 
 
@@ -313,6 +315,18 @@ export async function calculateLaborCost(req: LaborCostRequest): Promise<LaborCo
   return res.json();
 }
 
+// Costs many lines in one round trip (e.g. every inheriting row of a grouping). Results are in request order;
+// a row that couldn't be costed has `error` set instead of failing the batch.
+export async function calculateLaborCostBatch(projectId: string, reqs: LaborCostRequest[]): Promise<LaborCostResponse[]> {
+  const res = await fetch(`${API_URL}/projects/${projectId}/calculate-labor-cost/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(reqs),
+  });
+  if (!res.ok) throw new Error('Failed to calculate labor batch');
+  return res.json();
+}
+
 
 /**
  * @deprecated Use calculateLaborCost instead